@@ -0,0 +1,50 @@
+"""
+Smart Marketing Automation System
+نظام التسويق الآلي الذكي
+
+Logging configuration shared by run.py and the gunicorn entrypoint (wsgi.py)
+إعدادات السجلات المشتركة
+"""
+
+import os
+import sys
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+def setup() -> QueueListener:
+    """Configure the root logger and return the running queue listener
+    
+    Records go to a rotating file and stdout through a background listener,
+    so request threads never block on handler I/O.
+    """
+    log_file = os.getenv('LOG_FILE', 'logs/app.log')
+    log_dir = os.path.dirname(log_file)
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+    
+    logging.basicConfig(
+        level=getattr(logging, os.getenv('LOG_LEVEL', 'INFO')),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            RotatingFileHandler(
+                log_file,
+                maxBytes=int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024)),
+                backupCount=int(os.getenv('LOG_BACKUP_COUNT', 5)),
+                encoding='utf-8',
+                delay=True
+            ),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+    
+    # Hand log records to a background listener
+    root_logger = logging.getLogger()
+    log_queue = queue.Queue(-1)
+    queue_listener = QueueListener(log_queue, *root_logger.handlers, respect_handler_level=True)
+    root_logger.handlers = [QueueHandler(log_queue)]
+    queue_listener.start()
+    atexit.register(queue_listener.stop)
+    
+    return queue_listener
@@ -6,6 +6,7 @@ from flask import Flask, send_from_directory, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from models.base import db
+from services.json_provider import ORJSONProvider
 from routes.user import user_bp
 from routes.admin import admin_bp
 from routes.ai_assistant import ai_assistant_bp
@@ -19,11 +20,12 @@ from routes.webhooks import webhooks_bp
 from routes.oauth import oauth_bp
 from routes.support import support_bp
 from routes.marketing_strategies import marketing_strategies_bp
-from routes.video_generation import video_generation_bp
+from routes.video_generation import video_generation_bp, init_processors
 from routes.prompt_analyzer import prompt_analyzer_bp
 
 def create_app():
     app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.json = ORJSONProvider(app)
     
     # Basic Configuration
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'marketing-automation-system-secret-key-2024')
@@ -32,8 +34,16 @@ def create_app():
     
     # Database Configuration
     database_path = os.path.join(os.path.dirname(__file__), 'database', 'app.db')
-    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{database_path}"
+    # Use postgresql+psycopg:// in production so batched writes can share a pipeline
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', f"sqlite:///{database_path}")
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Connections are only held for short transactions (never across external
+    # HTTP calls), so a small pool behind a connection pooler is enough
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_pre_ping': True,
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    }
     
     # CORS Configuration - Allow all origins for development
     CORS(app, origins="*", allow_headers=["Content-Type", "Authorization"], methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
@@ -61,6 +71,9 @@ def create_app():
     app.register_blueprint(video_generation_bp, url_prefix='/api/video-generation')
     app.register_blueprint(prompt_analyzer_bp, url_prefix='/api/prompt-analyzer')
     
+    # Register background task processors
+    init_processors()
+    
     # Create database tables
     with app.app_context():
         db.create_all()
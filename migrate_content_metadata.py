@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Smart Marketing Automation System
+نظام التسويق الآلي الذكي
+
+One-off migration of content metadata from JSON text to MessagePack
+ترحيل بيانات المحتوى الوصفية من JSON إلى MessagePack
+
+Converts contents.content_metadata to a binary column on PostgreSQL and
+rewrites every row still holding JSON as MessagePack bytes. SQLite columns
+are untyped, so only the rows are rewritten there. Safe to run again.
+
+    python migrate_content_metadata.py
+"""
+
+import os
+import sys
+import json
+import logging
+
+import msgspec
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.main import create_app
+from src.models.base import db
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+def migrate():
+    """Convert the column type, then rewrite JSON rows in batches"""
+    if db.engine.dialect.name == 'postgresql':
+        column_type = db.session.execute(db.text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_name = 'contents' AND column_name = 'content_metadata'"
+        )).scalar()
+        if column_type != 'bytea':
+            db.session.execute(db.text(
+                "ALTER TABLE contents ALTER COLUMN content_metadata TYPE BYTEA "
+                "USING convert_to(content_metadata, 'UTF8')"
+            ))
+            db.session.commit()
+
+    converted = 0
+    last_id = ''
+    while True:
+        rows = db.session.execute(db.text(
+            "SELECT id, content_metadata FROM contents "
+            "WHERE content_metadata IS NOT NULL AND id > :last_id ORDER BY id LIMIT :limit"
+        ), {'last_id': last_id, 'limit': BATCH_SIZE}).all()
+        if not rows:
+            break
+
+        updates = []
+        for content_id, value in rows:
+            if isinstance(value, memoryview):
+                value = value.tobytes()
+            if isinstance(value, str) or value[:1] == b'{':
+                try:
+                    updates.append({'id': content_id, 'value': msgspec.msgpack.encode(json.loads(value))})
+                except ValueError:
+                    logger.warning(f"Skipping content {content_id} with invalid JSON metadata")
+
+        if updates:
+            db.session.execute(
+                db.text("UPDATE contents SET content_metadata = :value WHERE id = :id"),
+                updates
+            )
+            db.session.commit()
+            converted += len(updates)
+
+        last_id = rows[-1][0]
+
+    logger.info(f"Converted metadata of {converted} content rows to MessagePack")
+
+if __name__ == '__main__':
+    with create_app().app_context():
+        migrate()
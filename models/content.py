@@ -2,6 +2,7 @@ from src.models.base import db, BaseModel
 from datetime import datetime
 import json
 import os
+import msgspec
 
 class Content(BaseModel):
     """Content model for managing generated content"""
@@ -22,8 +23,8 @@ class Content(BaseModel):
     file_path = db.Column(db.String(500), nullable=True)  # For file-based content
     file_size = db.Column(db.Integer, nullable=True)  # File size in bytes
 
-    # Content Metadata (JSON)
-    content_metadata = db.Column(db.Text, nullable=True)  # JSON with additional content metadata
+    # Content Metadata (MessagePack)
+    content_metadata = db.Column(db.LargeBinary, nullable=True)  # MessagePack map with additional content metadata
 
     # Generation Details
     generation_prompt = db.Column(db.Text, nullable=True)  # Original prompt used
@@ -51,18 +52,26 @@ class Content(BaseModel):
     task = db.relationship('Task', backref='contents')
     campaign = db.relationship('Campaign', backref='contents')
 
+    # Composite index for per-user content listings ordered by recency
+    __table_args__ = (
+        db.Index('idx_content_user_created', 'user_id', 'created_at'),
+    )
+
     def get_metadata(self):
         """Get metadata as dictionary"""
         if self.content_metadata:
             try:
-                return json.loads(self.content_metadata)
+                # Rows written before the MessagePack switch still hold JSON text
+                if isinstance(self.content_metadata, str) or self.content_metadata[:1] == b'{':
+                    return json.loads(self.content_metadata)
+                return msgspec.msgpack.decode(self.content_metadata)
             except:
                 return {}
         return {}
 
     def set_metadata(self, metadata_dict):
         """Set metadata from dictionary"""
-        self.content_metadata = json.dumps(metadata_dict)
+        self.content_metadata = msgspec.msgpack.encode(metadata_dict)
 
     def get_generation_parameters(self):
         """Get generation parameters as dictionary"""
@@ -195,6 +204,7 @@ class Content(BaseModel):
     def to_dict(self):
         """Convert to dictionary"""
         data = super().to_dict()
+        del data['content_metadata']
         data['metadata'] = self.get_metadata()
         data['generation_parameters'] = self.get_generation_parameters()
         data['platforms_used'] = self.get_platforms_used()
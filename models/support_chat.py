@@ -4,6 +4,16 @@ from src.models.base import db
 class SupportChat(db.Model):
     """Support chat sessions model"""
     __tablename__ = 'support_chats'
+    __table_args__ = (
+        # Period filters of the analytics dashboard
+        db.Index('ix_chat_analytics', 'started_at', 'status', 'ai_handled'),
+        # Only open chats are indexed, keeping the active chat count small
+        db.Index(
+            'ix_chat_active', 'status',
+            postgresql_where=db.text("status IN ('active', 'transferred')"),
+            sqlite_where=db.text("status IN ('active', 'transferred')")
+        ),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.String(100), unique=True, nullable=False, index=True)
@@ -72,6 +82,10 @@ class SupportChat(db.Model):
 class SupportMessage(db.Model):
     """Support chat messages model"""
     __tablename__ = 'support_messages'
+    __table_args__ = (
+        # Chat history is read per chat in send order
+        db.Index('ix_message_chat_sent', 'chat_id', 'sent_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     chat_id = db.Column(db.Integer, db.ForeignKey('support_chats.id'), nullable=False)
@@ -26,6 +26,9 @@ class Task(BaseModel):
     started_at = db.Column(db.DateTime, nullable=True)
     completed_at = db.Column(db.DateTime, nullable=True)
 
+    # Background execution
+    celery_task_id = db.Column(db.String(155), nullable=True, index=True)  # Celery job that runs the task
+
     # Relationships
     user = db.relationship('User', backref='tasks')
 
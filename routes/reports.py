@@ -1,6 +1,10 @@
-from flask import Blueprint, request, jsonify, render_template
+from flask import Blueprint, request, jsonify, render_template, Response
 from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, List
 import logging
+import time
+import msgspec
 from src.services.analytics_engine import analytics_engine
 from src.models.user import User
 from src.services.api_manager import api_manager
@@ -9,6 +13,91 @@ logger = logging.getLogger(__name__)
 
 reports_bp = Blueprint('reports', __name__, url_prefix='/api/reports')
 
+# Fixed-shape response models, encoded directly to JSON bytes by msgspec
+class OverviewResponse(msgspec.Struct):
+    success: bool
+    user_id: int
+    date_range: Dict
+    overview: Dict
+
+class ContentPerformanceResponse(msgspec.Struct):
+    success: bool
+    user_id: int
+    filters: Dict
+    performance_analysis: Dict
+
+class AudienceInsightsResponse(msgspec.Struct):
+    success: bool
+    user_id: int
+    date_range: Dict
+    audience_insights: Dict
+
+class PlatformAnalysisResponse(msgspec.Struct):
+    success: bool
+    user_id: int
+    date_range: Dict
+    platform_analysis: Dict
+
+class GrowthTrendsResponse(msgspec.Struct):
+    success: bool
+    user_id: int
+    date_range: Dict
+    growth_analysis: Dict
+
+class RecommendationsResponse(msgspec.Struct):
+    success: bool
+    user_id: int
+    date_range: Dict
+    recommendations: List[Dict]
+
+class ChartsDataResponse(msgspec.Struct):
+    success: bool
+    user_id: int
+    report_type: str
+    date_range: Dict
+    charts_data: Dict
+
+class ExportResponse(msgspec.Struct):
+    success: bool
+    export_id: str
+    format: str
+    download_url: str
+    expires_at: str
+    file_size: str
+    status: str
+
+class ScheduledReportsResponse(msgspec.Struct):
+    success: bool
+    user_id: int
+    scheduled_reports: List[Dict]
+
+class ScheduledReportCreatedResponse(msgspec.Struct):
+    success: bool
+    message: str
+    scheduled_report: Dict
+
+# Date ranges are anchored to 5-minute buckets so their ISO strings can be
+# cached; the end is the next bucket boundary so recent activity stays inside
+DATE_RANGE_BUCKET_SECONDS = 300
+
+@lru_cache(maxsize=512)
+def epoch_to_iso(epoch_seconds: int) -> str:
+    """Convert epoch seconds to a naive UTC ISO string"""
+    return datetime.utcfromtimestamp(epoch_seconds).isoformat()
+
+def build_date_range(days: int) -> Dict:
+    """Build a date range covering the last `days` days"""
+    now_ts = int(time.time())
+    end_ts = now_ts - (now_ts % DATE_RANGE_BUCKET_SECONDS) + DATE_RANGE_BUCKET_SECONDS
+    return {
+        'start_date': epoch_to_iso(end_ts - days * 86400),
+        'end_date': epoch_to_iso(end_ts)
+    }
+
+def struct_response(payload: msgspec.Struct) -> Response:
+    """Encode a response struct to a JSON response"""
+    return Response(msgspec.json.encode(payload), mimetype='application/json')
+
 @reports_bp.route('/dashboard')
 def reports_dashboard():
     """Serve the reports dashboard HTML page"""
@@ -41,18 +130,7 @@ def generate_report():
         
         # Generate date range if not provided
         if not date_range:
-            end_date = datetime.utcnow()
-            if report_type == 'weekly':
-                start_date = end_date - timedelta(days=7)
-            elif report_type == 'monthly':
-                start_date = end_date - timedelta(days=30)
-            else:
-                start_date = end_date - timedelta(days=7)
-            
-            date_range = {
-                'start_date': start_date.isoformat(),
-                'end_date': end_date.isoformat()
-            }
+            date_range = build_date_range(30 if report_type == 'monthly' else 7)
         
         # Generate report
         report = analytics_engine.generate_comprehensive_report(
@@ -80,13 +158,7 @@ def get_overview_metrics(user_id):
     try:
         # Get date range from query parameters
         days = request.args.get('days', 7, type=int)
-        end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=days)
-        
-        date_range = {
-            'start_date': start_date.isoformat(),
-            'end_date': end_date.isoformat()
-        }
+        date_range = build_date_range(days)
         
         # Get user analytics data
         user_data = analytics_engine.get_user_analytics_data(user_id, date_range)
@@ -97,12 +169,7 @@ def get_overview_metrics(user_id):
         # Generate overview metrics
         overview = analytics_engine.generate_overview_metrics(user_data)
         
-        return jsonify({
-            'success': True,
-            'user_id': user_id,
-            'date_range': date_range,
-            'overview': overview
-        })
+        return struct_response(OverviewResponse(True, user_id, date_range, overview))
         
     except Exception as e:
         logger.error(f"Error getting overview metrics: {str(e)}")
@@ -117,13 +184,7 @@ def get_content_performance(user_id):
         platform = request.args.get('platform', 'all')
         content_type = request.args.get('content_type', 'all')
         
-        end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=days)
-        
-        date_range = {
-            'start_date': start_date.isoformat(),
-            'end_date': end_date.isoformat()
-        }
+        date_range = build_date_range(days)
         
         # Get user analytics data
         user_data = analytics_engine.get_user_analytics_data(user_id, date_range)
@@ -147,16 +208,16 @@ def get_content_performance(user_id):
         # Analyze content performance
         performance_analysis = analytics_engine.analyze_content_performance(user_data)
         
-        return jsonify({
-            'success': True,
-            'user_id': user_id,
-            'filters': {
+        return struct_response(ContentPerformanceResponse(
+            success=True,
+            user_id=user_id,
+            filters={
                 'platform': platform,
                 'content_type': content_type,
                 'days': days
             },
-            'performance_analysis': performance_analysis
-        })
+            performance_analysis=performance_analysis
+        ))
         
     except Exception as e:
         logger.error(f"Error getting content performance: {str(e)}")
@@ -167,13 +228,7 @@ def get_audience_insights(user_id):
     """Get audience insights and demographics"""
     try:
         days = request.args.get('days', 30, type=int)
-        end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=days)
-        
-        date_range = {
-            'start_date': start_date.isoformat(),
-            'end_date': end_date.isoformat()
-        }
+        date_range = build_date_range(days)
         
         # Get user analytics data
         user_data = analytics_engine.get_user_analytics_data(user_id, date_range)
@@ -184,12 +239,7 @@ def get_audience_insights(user_id):
         # Analyze audience insights
         audience_insights = analytics_engine.analyze_audience_insights(user_data)
         
-        return jsonify({
-            'success': True,
-            'user_id': user_id,
-            'date_range': date_range,
-            'audience_insights': audience_insights
-        })
+        return struct_response(AudienceInsightsResponse(True, user_id, date_range, audience_insights))
         
     except Exception as e:
         logger.error(f"Error getting audience insights: {str(e)}")
@@ -200,13 +250,7 @@ def get_platform_analysis(user_id):
     """Get platform performance analysis"""
     try:
         days = request.args.get('days', 7, type=int)
-        end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=days)
-        
-        date_range = {
-            'start_date': start_date.isoformat(),
-            'end_date': end_date.isoformat()
-        }
+        date_range = build_date_range(days)
         
         # Get user analytics data
         user_data = analytics_engine.get_user_analytics_data(user_id, date_range)
@@ -217,12 +261,7 @@ def get_platform_analysis(user_id):
         # Analyze platform performance
         platform_analysis = analytics_engine.analyze_platform_performance(user_data)
         
-        return jsonify({
-            'success': True,
-            'user_id': user_id,
-            'date_range': date_range,
-            'platform_analysis': platform_analysis
-        })
+        return struct_response(PlatformAnalysisResponse(True, user_id, date_range, platform_analysis))
         
     except Exception as e:
         logger.error(f"Error getting platform analysis: {str(e)}")
@@ -233,13 +272,7 @@ def get_growth_trends(user_id):
     """Get growth trends analysis"""
     try:
         days = request.args.get('days', 30, type=int)
-        end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=days)
-        
-        date_range = {
-            'start_date': start_date.isoformat(),
-            'end_date': end_date.isoformat()
-        }
+        date_range = build_date_range(days)
         
         # Get user analytics data
         user_data = analytics_engine.get_user_analytics_data(user_id, date_range)
@@ -250,12 +283,7 @@ def get_growth_trends(user_id):
         # Analyze growth trends
         growth_analysis = analytics_engine.analyze_growth_trends(user_data)
         
-        return jsonify({
-            'success': True,
-            'user_id': user_id,
-            'date_range': date_range,
-            'growth_analysis': growth_analysis
-        })
+        return struct_response(GrowthTrendsResponse(True, user_id, date_range, growth_analysis))
         
     except Exception as e:
         logger.error(f"Error getting growth trends: {str(e)}")
@@ -266,13 +294,7 @@ def get_recommendations(user_id):
     """Get personalized recommendations"""
     try:
         days = request.args.get('days', 7, type=int)
-        end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=days)
-        
-        date_range = {
-            'start_date': start_date.isoformat(),
-            'end_date': end_date.isoformat()
-        }
+        date_range = build_date_range(days)
         
         # Get user analytics data
         user_data = analytics_engine.get_user_analytics_data(user_id, date_range)
@@ -283,12 +305,7 @@ def get_recommendations(user_id):
         # Generate recommendations
         recommendations = analytics_engine.generate_recommendations(user_data)
         
-        return jsonify({
-            'success': True,
-            'user_id': user_id,
-            'date_range': date_range,
-            'recommendations': recommendations
-        })
+        return struct_response(RecommendationsResponse(True, user_id, date_range, recommendations))
         
     except Exception as e:
         logger.error(f"Error getting recommendations: {str(e)}")
@@ -301,13 +318,7 @@ def get_charts_data(user_id):
         report_type = request.args.get('report_type', 'weekly')
         days = request.args.get('days', 7, type=int)
         
-        end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=days)
-        
-        date_range = {
-            'start_date': start_date.isoformat(),
-            'end_date': end_date.isoformat()
-        }
+        date_range = build_date_range(days)
         
         # Get user analytics data
         user_data = analytics_engine.get_user_analytics_data(user_id, date_range)
@@ -318,13 +329,7 @@ def get_charts_data(user_id):
         # Generate charts data
         charts_data = analytics_engine.generate_charts_data(user_data, report_type)
         
-        return jsonify({
-            'success': True,
-            'user_id': user_id,
-            'report_type': report_type,
-            'date_range': date_range,
-            'charts_data': charts_data
-        })
+        return struct_response(ChartsDataResponse(True, user_id, report_type, date_range, charts_data))
         
     except Exception as e:
         logger.error(f"Error getting charts data: {str(e)}")
@@ -350,17 +355,17 @@ def export_report():
         
         # For now, return a mock response
         # In a real implementation, this would generate the actual file
-        export_result = {
-            'success': True,
-            'export_id': f"export_{user_id}_{report_id}_{int(datetime.utcnow().timestamp())}",
-            'format': export_format,
-            'download_url': f"/api/reports/download/{user_id}/{report_id}.{export_format}",
-            'expires_at': (datetime.utcnow() + timedelta(hours=24)).isoformat(),
-            'file_size': '2.5 MB',
-            'status': 'ready'
-        }
-        
-        return jsonify(export_result)
+        export_result = ExportResponse(
+            success=True,
+            export_id=f"export_{user_id}_{report_id}_{int(datetime.utcnow().timestamp())}",
+            format=export_format,
+            download_url=f"/api/reports/download/{user_id}/{report_id}.{export_format}",
+            expires_at=(datetime.utcnow() + timedelta(hours=24)).isoformat(),
+            file_size='2.5 MB',
+            status='ready'
+        )
+        
+        return struct_response(export_result)
         
     except Exception as e:
         logger.error(f"Error exporting report: {str(e)}")
@@ -416,11 +421,7 @@ def manage_scheduled_reports():
                 }
             ]
             
-            return jsonify({
-                'success': True,
-                'user_id': user_id,
-                'scheduled_reports': scheduled_reports
-            })
+            return struct_response(ScheduledReportsResponse(True, user_id, scheduled_reports))
         
         elif request.method == 'POST':
             # Create new scheduled report
@@ -446,11 +447,11 @@ def manage_scheduled_reports():
                 'status': 'active'
             }
             
-            return jsonify({
-                'success': True,
-                'message': 'Scheduled report created successfully',
-                'scheduled_report': new_report
-            })
+            return struct_response(ScheduledReportCreatedResponse(
+                success=True,
+                message='Scheduled report created successfully',
+                scheduled_report=new_report
+            ))
         
     except Exception as e:
         logger.error(f"Error managing scheduled reports: {str(e)}")
@@ -1,10 +1,26 @@
-from flask import Blueprint, request, jsonify, current_app
-from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify, current_app, Response
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime, timedelta, timezone
+from typing import Tuple
+import base64
+import binascii
 import logging
+import orjson
+import ciso8601
+import fastjsonschema
+from fastjsonschema import JsonSchemaException
 from src.services.social_media_publisher import social_media_publisher
 from src.services.free_ai_generator import free_ai_generator
 from src.services.credit_manager import credit_manager
-from src.models.user import User
+from src.services.cache_manager import cached_response
+from src.services.celery_tasks import (
+    celery_app, publish_task, generate_and_publish_task, enqueue_campaign,
+    create_queued_task, content_title, MAX_SCHEDULE_AHEAD
+)
+from sqlalchemy import tuple_, update
+from sqlalchemy.exc import SQLAlchemyError
+from kombu.exceptions import OperationalError as BrokerOperationalError
+from src.models.base import db
 from src.models.task import Task
 from src.models.content import Content
 
@@ -12,7 +28,124 @@ logger = logging.getLogger(__name__)
 
 social_media_bp = Blueprint('social_media', __name__, url_prefix='/api/social-media')
 
+# Request validators, compiled once at import time
+SUPPORTED_PLATFORMS = ['facebook', 'instagram', 'twitter', 'linkedin', 'tiktok', 'youtube']
+
+_user_id_schema = {'type': ['string', 'integer']}
+_platforms_schema = {
+    'type': 'array',
+    'minItems': 1,
+    'uniqueItems': True,
+    'items': {'enum': SUPPORTED_PLATFORMS}
+}
+
+PUBLISH_SCHEMA = fastjsonschema.compile({
+    'type': 'object',
+    'required': ['user_id', 'content', 'platforms'],
+    'properties': {
+        'user_id': _user_id_schema,
+        'content': {'type': 'object'},
+        'platforms': _platforms_schema,
+        'platform_configs': {'type': 'object'}
+    }
+})
+
+SCHEDULE_SCHEMA = fastjsonschema.compile({
+    'type': 'object',
+    'required': ['user_id', 'content', 'platforms', 'scheduled_time'],
+    'properties': {
+        'user_id': _user_id_schema,
+        'content': {'type': 'object'},
+        'platforms': _platforms_schema,
+        'scheduled_time': {'type': 'string'},
+        'platform_configs': {'type': 'object'}
+    }
+})
+
+GENERATE_SCHEMA = fastjsonschema.compile({
+    'type': 'object',
+    'required': ['user_id', 'product_service', 'platforms'],
+    'properties': {
+        'user_id': _user_id_schema,
+        'product_service': {'type': 'string', 'minLength': 1},
+        'platforms': _platforms_schema,
+        'strategy': {'type': 'string'},
+        'language': {'type': 'string'},
+        'target_audience': {'type': 'string'},
+        'include_video': {'type': 'boolean'},
+        'platform_configs': {'type': 'object'}
+    }
+})
+
+CAMPAIGN_SCHEMA = fastjsonschema.compile({
+    'type': 'object',
+    'required': ['user_id', 'items'],
+    'properties': {
+        'user_id': _user_id_schema,
+        'items': {
+            'type': 'array',
+            'minItems': 1,
+            'maxItems': 100,
+            'items': {
+                'type': 'object',
+                'required': ['product_service', 'platforms'],
+                'properties': {
+                    'product_service': {'type': 'string', 'minLength': 1},
+                    'platforms': _platforms_schema,
+                    'strategy': {'type': 'string'},
+                    'language': {'type': 'string'},
+                    'target_audience': {'type': 'string'},
+                    'include_video': {'type': 'boolean'},
+                    'platform_configs': {'type': 'object'}
+                }
+            }
+        }
+    }
+})
+
+VALIDATE_SCHEMA = fastjsonschema.compile({
+    'type': 'object',
+    'required': ['content', 'platforms'],
+    'properties': {
+        'content': {'type': 'string', 'minLength': 1},
+        'platforms': {'type': 'array', 'minItems': 1, 'items': {'type': 'string'}}
+    }
+})
+
+# Serialized bodies of error responses, keyed by (message, status)
+_ERROR_CACHE = {}
+_ERROR_CACHE_MAX_SIZE = 256
+
+def make_error(message: str, status: int) -> Response:
+    """Build a JSON error response, reusing the serialized body of known errors"""
+    key = (message, status)
+    body = _ERROR_CACHE.get(key)
+    if body is None:
+        body = orjson.dumps({'success': False, 'error': message})
+        if len(_ERROR_CACHE) < _ERROR_CACHE_MAX_SIZE:
+            _ERROR_CACHE[key] = body
+    return Response(body, status=status, mimetype='application/json')
+
+def insufficient_credits_response(user_id, required: int):
+    """Build the error response for a charge that did not go through"""
+    credits_balance = credit_manager.get_credits_balance(user_id)
+    if credits_balance is None:
+        return make_error('User not found', 404)
+    
+    return jsonify({
+        'success': False,
+        'error': f'Insufficient credits. Required: {required}, Available: {credits_balance}'
+    }), 400
+
+def release_queued_task(task, user_id, amount: int) -> None:
+    """Fail the record of a task that never reached the queue and refund its credits"""
+    db.session.rollback()
+    if task is not None:
+        task.mark_failed('Task queue unavailable')
+    credit_manager.refund_credits(user_id, amount)
+
 @social_media_bp.route('/platforms', methods=['GET'])
+@cached_response(ttl=60, namespace='social_media')
 def get_platforms():
     """Get all available social media platforms and their status"""
     try:
@@ -25,126 +158,122 @@ def get_platforms():
         })
         
     except Exception as e:
-        logger.error(f"Error getting platforms: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+        logger.error("Error getting platforms: %s", e)
+        return make_error('Internal server error', 500)
 
 @social_media_bp.route('/publish', methods=['POST'])
 def publish_content():
     """Publish content to selected social media platforms"""
     try:
-        data = request.get_json()
+        data = orjson.loads(request.get_data())
         
-        # Validate required fields
-        required_fields = ['user_id', 'content', 'platforms']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({
-                    'success': False,
-                    'error': f'Missing required field: {field}'
-                }), 400
+        # Validate request body
+        try:
+            PUBLISH_SCHEMA(data)
+        except JsonSchemaException as e:
+            return jsonify({
+                'success': False,
+                'error': e.message
+            }), 400
         
         user_id = data['user_id']
         content = data['content']
         platforms = data['platforms']
         platform_configs = data.get('platform_configs', {})
         
-        # Check user credits
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({
-                'success': False,
-                'error': 'User not found'
-            }), 404
-        
-        # Calculate credit cost (1 credit per platform)
+        # Charge credits up front (1 credit per platform), failed posts are refunded
         total_cost = len(platforms)
         
-        if user.credits < total_cost:
-            return jsonify({
-                'success': False,
-                'error': f'Insufficient credits. Required: {total_cost}, Available: {user.credits}'
-            }), 400
-        
-        # Publish to platforms
-        publish_result = social_media_publisher.publish_to_multiple_platforms(
-            content, platforms, platform_configs
-        )
+        if credit_manager.charge_credits(user_id, total_cost) is None:
+            return insufficient_credits_response(user_id, total_cost)
         
-        if publish_result['success']:
-            # Deduct credits only for successful posts
-            successful_posts = publish_result['successful_posts']
-            credit_result = credit_manager.deduct_credits(
-                user_id, successful_posts, 'social_media_publishing'
+        # Record the task before handing publishing off to a worker
+        task = None
+        try:
+            task = create_queued_task(
+                user_id,
+                'social_media_publishing',
+                content_title(content, 'Social media publishing'),
+                {
+                    'platforms': platforms,
+                    'content_preview': content.get('text', '')[:100]
+                },
+                total_cost
             )
-            
-            if not credit_result['success']:
-                logger.warning(f"Failed to deduct credits: {credit_result['error']}")
-        
-        # Create task record
-        task = Task(
-            user_id=user_id,
-            task_type='social_media_publishing',
-            status='completed' if publish_result['success'] else 'failed',
-            input_data={
-                'platforms': platforms,
-                'content_preview': content.get('text', '')[:100]
-            },
-            output_data=publish_result,
-            credits_used=publish_result.get('successful_posts', 0)
-        )
-        task.save()
-        
-        # Save content records
-        for platform, result in publish_result.get('results', {}).items():
-            if result['success']:
-                content_record = Content(
-                    user_id=user_id,
-                    task_id=task.id,
-                    content_type='social_media_post',
-                    platform=platform,
-                    content_data={
-                        'text': content.get('text', ''),
-                        'hashtags': content.get('hashtags', []),
-                        'image_url': content.get('image_url'),
-                        'video_url': content.get('video_url')
-                    },
-                    post_id=result.get('post_id'),
-                    status='published'
-                )
-                content_record.save()
+            publish_task.apply_async(
+                args=[task.id, user_id, content, platforms, platform_configs],
+                task_id=task.celery_task_id
+            )
+        except (BrokerOperationalError, SQLAlchemyError):
+            release_queued_task(task, user_id, total_cost)
+            raise
         
         return jsonify({
             'success': True,
-            'data': publish_result,
-            'task_id': task.id,
-            'credits_used': publish_result.get('successful_posts', 0),
-            'message': f'Published to {publish_result["successful_posts"]}/{len(platforms)} platforms'
-        })
+            'task_id': task.celery_task_id,
+            'status': 'queued',
+            'message': f'Publishing to {len(platforms)} platforms has been queued'
+        }), 202
+        
+    except orjson.JSONDecodeError:
+        return make_error('Invalid JSON body', 400)
+    except BrokerOperationalError as e:
+        logger.error("Task queue unavailable while publishing content: %s", e)
+        return make_error('Task queue unavailable', 503)
+    except SQLAlchemyError as e:
+        logger.error("Database error publishing content: %s", e)
+        return make_error('Database error', 500)
+    except Exception as e:
+        logger.error("Error publishing content: %s", e)
+        return make_error('Internal server error', 500)
+
+@social_media_bp.route('/publish/status/<task_id>', methods=['GET'])
+@jwt_required()
+def get_publish_status(task_id):
+    """Get the status of a queued publishing task owned by the caller"""
+    try:
+        # Only jobs recorded on one of the caller's tasks are visible
+        task = Task.query.filter_by(
+            celery_task_id=task_id,
+            user_id=str(get_jwt_identity())
+        ).first()
+        if not task:
+            return make_error('Task not found', 404)
+        
+        async_result = celery_app.AsyncResult(task_id)
+        
+        response = {
+            'success': True,
+            'task_id': task_id,
+            'status': task.status,
+            'state': async_result.state
+        }
+        
+        if async_result.successful():
+            response['result'] = async_result.result
+        elif async_result.failed():
+            response['error'] = str(async_result.result)
+        
+        return jsonify(response)
         
     except Exception as e:
-        logger.error(f"Error publishing content: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+        logger.error("Error getting publish status: %s", e)
+        return make_error('Internal server error', 500)
 
 @social_media_bp.route('/schedule', methods=['POST'])
 def schedule_content():
     """Schedule content for future publishing"""
     try:
-        data = request.get_json()
+        data = orjson.loads(request.get_data())
         
-        # Validate required fields
-        required_fields = ['user_id', 'content', 'platforms', 'scheduled_time']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({
-                    'success': False,
-                    'error': f'Missing required field: {field}'
-                }), 400
+        # Validate request body
+        try:
+            SCHEDULE_SCHEMA(data)
+        except JsonSchemaException as e:
+            return jsonify({
+                'success': False,
+                'error': e.message
+            }), 400
         
         user_id = data['user_id']
         content = data['content']
@@ -154,97 +283,149 @@ def schedule_content():
         
         # Parse scheduled time
         try:
-            scheduled_time = datetime.fromisoformat(scheduled_time_str.replace('Z', '+00:00'))
+            scheduled_time = ciso8601.parse_datetime(scheduled_time_str)
         except ValueError:
-            return jsonify({
-                'success': False,
-                'error': 'Invalid scheduled_time format. Use ISO format.'
-            }), 400
+            return make_error('Invalid scheduled_time format. Use ISO format.', 400)
+        
+        # Times without an offset are taken as UTC, matching the Celery clock
+        if scheduled_time.tzinfo is None:
+            scheduled_time = scheduled_time.replace(tzinfo=timezone.utc)
         
         # Check if scheduled time is in the future
-        if scheduled_time <= datetime.now():
-            return jsonify({
-                'success': False,
-                'error': 'Scheduled time must be in the future'
-            }), 400
+        now = datetime.now(timezone.utc)
+        if scheduled_time <= now:
+            return make_error('Scheduled time must be in the future', 400)
         
-        # Check user credits
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({
-                'success': False,
-                'error': 'User not found'
-            }), 404
+        if scheduled_time - now > MAX_SCHEDULE_AHEAD:
+            return make_error(f'Scheduled time must be within {MAX_SCHEDULE_AHEAD.days} days', 400)
         
-        # Calculate credit cost
+        # Reserve credits (1 credit per platform)
         total_cost = len(platforms)
         
-        if user.credits < total_cost:
-            return jsonify({
-                'success': False,
-                'error': f'Insufficient credits. Required: {total_cost}, Available: {user.credits}'
-            }), 400
+        if credit_manager.charge_credits(user_id, total_cost) is None:
+            return insufficient_credits_response(user_id, total_cost)
         
         # Schedule posts
         schedule_result = social_media_publisher.schedule_post(
             content, platforms, scheduled_time, platform_configs
         )
         
-        if schedule_result['success']:
-            # Reserve credits for scheduled posts
-            scheduled_posts = schedule_result['scheduled_posts']
-            credit_result = credit_manager.deduct_credits(
-                user_id, scheduled_posts, 'scheduled_social_media_publishing'
+        scheduled_platforms = [
+            platform for platform, result in schedule_result.get('results', {}).items()
+            if result['success']
+        ]
+        credits_reserved = len(scheduled_platforms)
+        
+        # Release credits reserved for platforms that could not be scheduled
+        credit_manager.refund_credits(user_id, total_cost - credits_reserved)
+        
+        # Record the task before enqueueing, the worker claims it when it publishes
+        task = None
+        try:
+            task = create_queued_task(
+                user_id,
+                'scheduled_social_media_publishing',
+                content_title(content, 'Scheduled social media publishing'),
+                {
+                    'platforms': scheduled_platforms,
+                    'scheduled_time': scheduled_time.isoformat(),
+                    'content_preview': content.get('text', '')[:100]
+                },
+                credits_reserved,
+                status='scheduled' if scheduled_platforms else 'failed',
+                result_data=schedule_result
             )
             
-            if not credit_result['success']:
-                logger.warning(f"Failed to reserve credits: {credit_result['error']}")
-        
-        # Create task record
-        task = Task(
-            user_id=user_id,
-            task_type='scheduled_social_media_publishing',
-            status='scheduled',
-            input_data={
-                'platforms': platforms,
-                'scheduled_time': scheduled_time_str,
-                'content_preview': content.get('text', '')[:100]
-            },
-            output_data=schedule_result,
-            credits_used=schedule_result.get('scheduled_posts', 0),
-            scheduled_time=scheduled_time
-        )
-        task.save()
+            # Let the broker fire the publish at the scheduled time
+            if scheduled_platforms:
+                publish_task.apply_async(
+                    args=[task.id, user_id, content, scheduled_platforms, platform_configs],
+                    eta=scheduled_time,
+                    task_id=task.celery_task_id,
+                    queue='publishing_queue'
+                )
+        except (BrokerOperationalError, SQLAlchemyError):
+            release_queued_task(task, user_id, credits_reserved)
+            raise
         
         return jsonify({
             'success': True,
             'data': schedule_result,
             'task_id': task.id,
-            'credits_reserved': schedule_result.get('scheduled_posts', 0),
-            'message': f'Scheduled posts for {schedule_result["scheduled_posts"]} platforms'
+            'credits_reserved': credits_reserved,
+            'message': f'Scheduled posts for {credits_reserved} platforms'
         })
         
+    except orjson.JSONDecodeError:
+        return make_error('Invalid JSON body', 400)
+    except BrokerOperationalError as e:
+        logger.error("Task queue unavailable while scheduling content: %s", e)
+        return make_error('Task queue unavailable', 503)
+    except SQLAlchemyError as e:
+        logger.error("Database error scheduling content: %s", e)
+        return make_error('Database error', 500)
     except Exception as e:
-        logger.error(f"Error scheduling content: {str(e)}")
+        logger.error("Error scheduling content: %s", e)
+        return make_error('Internal server error', 500)
+
+@social_media_bp.route('/schedule/<task_id>/cancel', methods=['POST'])
+@jwt_required()
+def cancel_scheduled_content(task_id):
+    """Cancel scheduled content owned by the caller before it is published"""
+    try:
+        task = Task.get_by_id(task_id)
+        if (not task or task.task_type != 'scheduled_social_media_publishing'
+                or task.user_id != str(get_jwt_identity())):
+            return make_error('Scheduled task not found', 404)
+        
+        # Only a task the worker has not claimed yet can be cancelled
+        cancelled = db.session.execute(
+            update(Task)
+            .where(Task.id == task.id, Task.status == 'scheduled')
+            .values(status='cancelled', completed_at=datetime.utcnow())
+        ).rowcount
+        if not cancelled:
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'error': f'Task cannot be cancelled in status: {task.status}'
+            }), 400
+        
+        # Return the reserved credits with the status change
+        credit_manager.refund_credits(task.user_id, task.credits_cost, commit=False)
+        db.session.commit()
+        
+        if task.celery_task_id:
+            celery_app.control.revoke(task.celery_task_id)
+        
         return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+            'success': True,
+            'task_id': task.id,
+            'credits_refunded': task.credits_cost,
+            'message': 'Scheduled content cancelled successfully'
+        })
+        
+    except SQLAlchemyError as e:
+        logger.error("Database error cancelling scheduled content: %s", e)
+        return make_error('Database error', 500)
+    except Exception as e:
+        logger.error("Error cancelling scheduled content: %s", e)
+        return make_error('Internal server error', 500)
 
 @social_media_bp.route('/generate-and-publish', methods=['POST'])
 def generate_and_publish():
     """Generate content with AI and publish to social media platforms"""
     try:
-        data = request.get_json()
+        data = orjson.loads(request.get_data())
         
-        # Validate required fields
-        required_fields = ['user_id', 'product_service', 'platforms']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({
-                    'success': False,
-                    'error': f'Missing required field: {field}'
-                }), 400
+        # Validate request body
+        try:
+            GENERATE_SCHEMA(data)
+        except JsonSchemaException as e:
+            return jsonify({
+                'success': False,
+                'error': e.message
+            }), 400
         
         user_id = data['user_id']
         product_service = data['product_service']
@@ -255,14 +436,6 @@ def generate_and_publish():
         include_video = data.get('include_video', False)
         platform_configs = data.get('platform_configs', {})
         
-        # Check user credits
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({
-                'success': False,
-                'error': 'User not found'
-            }), 404
-        
         # Calculate total credit cost (generation + publishing)
         generation_cost = 2  # 2 credits for AI generation
         publishing_cost = len(platforms)  # 1 credit per platform
@@ -271,13 +444,11 @@ def generate_and_publish():
         
         total_cost = generation_cost + publishing_cost
         
-        if user.credits < total_cost:
-            return jsonify({
-                'success': False,
-                'error': f'Insufficient credits. Required: {total_cost}, Available: {user.credits}'
-            }), 400
+        # Charge credits up front, the worker refunds whatever goes unused
+        if credit_manager.charge_credits(user_id, total_cost) is None:
+            return insufficient_credits_response(user_id, total_cost)
         
-        # Generate content with AI
+        # Generate content with AI and publish in a worker
         task_data = {
             'strategy': strategy,
             'language': language,
@@ -286,91 +457,125 @@ def generate_and_publish():
             'include_video': include_video
         }
         
-        generation_result = free_ai_generator.generate_marketing_content(task_data)
-        
-        if not generation_result['success']:
-            return jsonify({
-                'success': False,
-                'error': f'Content generation failed: {generation_result["error"]}'
-            }), 500
-        
-        generated_content = generation_result['content']
+        task = None
+        try:
+            task = create_queued_task(
+                user_id,
+                'ai_content_generation_and_publishing',
+                f'AI content for {product_service}'[:200],
+                {
+                    'product_service': product_service,
+                    'strategy': strategy,
+                    'language': language,
+                    'platforms': platforms,
+                    'include_video': include_video
+                },
+                total_cost
+            )
+            generate_and_publish_task.apply_async(
+                args=[task.id, user_id, task_data, platforms, platform_configs, generation_cost],
+                task_id=task.celery_task_id
+            )
+        except (BrokerOperationalError, SQLAlchemyError):
+            release_queued_task(task, user_id, total_cost)
+            raise
         
-        # Publish to platforms
-        publish_result = social_media_publisher.publish_to_multiple_platforms(
-            generated_content, platforms, platform_configs
-        )
+        return jsonify({
+            'success': True,
+            'task_id': task.celery_task_id,
+            'status': 'queued',
+            'message': f'Content generation and publishing to {len(platforms)} platforms has been queued'
+        }), 202
+        
+    except orjson.JSONDecodeError:
+        return make_error('Invalid JSON body', 400)
+    except BrokerOperationalError as e:
+        logger.error("Task queue unavailable while generating and publishing content: %s", e)
+        return make_error('Task queue unavailable', 503)
+    except SQLAlchemyError as e:
+        logger.error("Database error generating and publishing content: %s", e)
+        return make_error('Database error', 500)
+    except Exception as e:
+        logger.error("Error generating and publishing content: %s", e)
+        return make_error('Internal server error', 500)
+
+@social_media_bp.route('/campaign/generate-and-publish', methods=['POST'])
+def generate_and_publish_campaign():
+    """Generate and publish content for several items as one campaign"""
+    try:
+        data = orjson.loads(request.get_data())
         
-        # Calculate actual credits used
-        credits_used = generation_cost  # Always charge for generation
-        if publish_result['success']:
-            credits_used += publish_result['successful_posts']
+        # Validate request body
+        try:
+            CAMPAIGN_SCHEMA(data)
+        except JsonSchemaException as e:
+            return make_error(e.message, 400)
         
-        # Deduct credits
-        credit_result = credit_manager.deduct_credits(
-            user_id, credits_used, 'ai_content_generation_and_publishing'
-        )
+        user_id = data['user_id']
+        items = []
+        total_cost = 0
         
-        if not credit_result['success']:
-            logger.warning(f"Failed to deduct credits: {credit_result['error']}")
-        
-        # Create task record
-        task = Task(
-            user_id=user_id,
-            task_type='ai_content_generation_and_publishing',
-            status='completed' if publish_result['success'] else 'partial',
-            input_data={
-                'product_service': product_service,
-                'strategy': strategy,
-                'language': language,
-                'platforms': platforms,
-                'include_video': include_video
-            },
-            output_data={
-                'generated_content': generated_content,
-                'publish_result': publish_result
-            },
-            credits_used=credits_used
-        )
-        task.save()
-        
-        # Save content records
-        for platform, result in publish_result.get('results', {}).items():
-            if result['success']:
-                content_record = Content(
-                    user_id=user_id,
-                    task_id=task.id,
-                    content_type='ai_generated_social_media_post',
-                    platform=platform,
-                    content_data=generated_content,
-                    post_id=result.get('post_id'),
-                    status='published'
-                )
-                content_record.save()
+        for item in data['items']:
+            include_video = item.get('include_video', False)
+            generation_cost = 5 if include_video else 2  # 2 credits for AI generation, 3 more for video
+            total_cost += generation_cost + len(item['platforms'])
+            
+            items.append({
+                'task_data': {
+                    'strategy': item.get('strategy', 'social_media_marketing'),
+                    'language': item.get('language', 'ar'),
+                    'product_service': item['product_service'],
+                    'target_audience': item.get('target_audience', ''),
+                    'include_video': include_video
+                },
+                'platforms': item['platforms'],
+                'platform_configs': item.get('platform_configs', {}),
+                'generation_cost': generation_cost
+            })
+        
+        # Charge the whole campaign once, the worker refunds whatever goes unused
+        if credit_manager.charge_credits(user_id, total_cost) is None:
+            return insufficient_credits_response(user_id, total_cost)
+        
+        task = None
+        try:
+            task = create_queued_task(
+                user_id,
+                'ai_campaign_generation_and_publishing',
+                f'Campaign with {len(items)} items',
+                {'items': [item['task_data'] for item in items]},
+                total_cost
+            )
+            enqueue_campaign(task, items)
+        except (BrokerOperationalError, SQLAlchemyError):
+            release_queued_task(task, user_id, total_cost)
+            raise
         
         return jsonify({
             'success': True,
-            'data': {
-                'generated_content': generated_content,
-                'publish_result': publish_result,
-                'task_id': task.id,
-                'credits_used': credits_used
-            },
-            'message': f'Generated content and published to {publish_result["successful_posts"]}/{len(platforms)} platforms'
-        })
-        
+            'campaign_id': task.celery_task_id,
+            'status': 'queued',
+            'credits_reserved': total_cost,
+            'message': f'Campaign with {len(items)} items has been queued'
+        }), 202
+        
+    except orjson.JSONDecodeError:
+        return make_error('Invalid JSON body', 400)
+    except BrokerOperationalError as e:
+        logger.error("Task queue unavailable while queueing campaign: %s", e)
+        return make_error('Task queue unavailable', 503)
+    except SQLAlchemyError as e:
+        logger.error("Database error queueing campaign: %s", e)
+        return make_error('Database error', 500)
     except Exception as e:
-        logger.error(f"Error generating and publishing content: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+        logger.error("Error queueing campaign: %s", e)
+        return make_error('Internal server error', 500)
 
 @social_media_bp.route('/analytics/<platform>/<post_id>', methods=['GET'])
 def get_post_analytics(platform, post_id):
     """Get analytics for a specific post"""
     try:
-        analytics_result = social_media_publisher.get_posting_analytics(platform, post_id)
+        analytics_result = social_media_publisher.get_cached_posting_analytics(platform, post_id)
         
         return jsonify({
             'success': True,
@@ -379,13 +584,11 @@ def get_post_analytics(platform, post_id):
         })
         
     except Exception as e:
-        logger.error(f"Error getting post analytics: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+        logger.error("Error getting post analytics: %s", e)
+        return make_error('Internal server error', 500)
 
 @social_media_bp.route('/optimal-times/<platform>', methods=['GET'])
+@cached_response(ttl=3600, namespace='social_media')
 def get_optimal_posting_times(platform):
     """Get optimal posting times for a platform"""
     try:
@@ -400,65 +603,131 @@ def get_optimal_posting_times(platform):
         })
         
     except Exception as e:
-        logger.error(f"Error getting optimal times: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+        logger.error("Error getting optimal times: %s", e)
+        return make_error('Internal server error', 500)
+
+def encode_content_cursor(created_at: datetime, content_id: str) -> str:
+    """Encode a content listing position as an opaque cursor"""
+    raw = f"{created_at.isoformat()}|{content_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_content_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a cursor produced by encode_content_cursor"""
+    try:
+        created_at, content_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|', 1)
+        return datetime.fromisoformat(created_at), content_id
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(f'Invalid cursor: {e}')
 
 @social_media_bp.route('/user-content/<int:user_id>', methods=['GET'])
 def get_user_content(user_id):
-    """Get all published content for a user"""
+    """Get all published content for a user
+    
+    Pass the returned `next_cursor` as `?cursor=` to fetch the next page
+    with keyset pagination; `?page=` is still accepted.
+    """
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         platform = request.args.get('platform')
         
-        query = Content.query.filter_by(user_id=user_id)
+        include = request.args.get('include', '').split(',')
+        include_content_data = 'content_data' in include
+        
+        # Only select the listed columns, the content payload is opt-in
+        columns = [
+            Content.id,
+            Content.title,
+            Content.content_type,
+            Content.platforms_used,
+            Content.status,
+            Content.created_at,
+            Content.updated_at
+        ]
+        if include_content_data:
+            columns.extend([Content.text_content, Content.content_metadata])
+        
+        query = db.session.query(*columns).filter(Content.user_id == str(user_id))
         
         if platform:
-            query = query.filter_by(platform=platform)
+            # platforms_used holds a JSON array of platform names
+            query = query.filter(Content.platforms_used.contains(f'"{platform}"'))
+        
+        cursor = request.args.get('cursor')
+        if cursor:
+            # Keyset pagination: seek past the last row of the previous page
+            try:
+                cursor_created_at, cursor_id = decode_content_cursor(cursor)
+            except ValueError:
+                return make_error('Invalid cursor', 400)
+            
+            rows = query.filter(
+                tuple_(Content.created_at, Content.id) < (cursor_created_at, cursor_id)
+            ).order_by(Content.created_at.desc(), Content.id.desc()).limit(per_page + 1).all()
+            
+            has_next = len(rows) > per_page
+            rows = rows[:per_page]
+            pagination = {
+                'per_page': per_page,
+                'has_next': has_next
+            }
+        else:
+            # Offset pagination, kept for backwards compatibility
+            content_records = query.order_by(Content.created_at.desc(), Content.id.desc()).paginate(
+                page=page, per_page=per_page, error_out=False
+            )
+            
+            rows = content_records.items
+            has_next = content_records.has_next
+            pagination = {
+                'page': page,
+                'per_page': per_page,
+                'total': content_records.total,
+                'pages': content_records.pages,
+                'has_next': has_next,
+                'has_prev': content_records.has_prev
+            }
         
-        content_records = query.order_by(Content.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+        pagination['next_cursor'] = (
+            encode_content_cursor(rows[-1].created_at, rows[-1].id) if rows and has_next else None
         )
         
         content_list = []
-        for content in content_records.items:
+        for content in rows:
             content_data = {
                 'id': content.id,
-                'platform': content.platform,
+                'title': content.title,
                 'content_type': content.content_type,
-                'content_data': content.content_data,
-                'post_id': content.post_id,
+                'platforms': orjson.loads(content.platforms_used) if content.platforms_used else [],
                 'status': content.status,
                 'created_at': content.created_at.isoformat(),
                 'updated_at': content.updated_at.isoformat()
             }
+            if include_content_data:
+                # The row carries content_metadata, which is all get_metadata reads
+                metadata = Content.get_metadata(content)
+                content_data['post_id'] = metadata.get('post_id')
+                content_data['content_data'] = {
+                    'text': content.text_content,
+                    'metadata': metadata
+                }
             content_list.append(content_data)
         
         return jsonify({
             'success': True,
             'data': {
                 'content': content_list,
-                'pagination': {
-                    'page': page,
-                    'per_page': per_page,
-                    'total': content_records.total,
-                    'pages': content_records.pages,
-                    'has_next': content_records.has_next,
-                    'has_prev': content_records.has_prev
-                }
+                'pagination': pagination
             },
             'message': 'User content retrieved successfully'
         })
         
+    except SQLAlchemyError as e:
+        logger.error("Database error getting user content: %s", e)
+        return make_error('Database error', 500)
     except Exception as e:
-        logger.error(f"Error getting user content: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+        logger.error("Error getting user content: %s", e)
+        return make_error('Internal server error', 500)
 
 @social_media_bp.route('/validate-content', methods=['POST'])
 def validate_content():
@@ -466,20 +735,15 @@ def validate_content():
     try:
         data = request.get_json()
         
-        content = data.get('content', '')
-        platforms = data.get('platforms', [])
-        
-        if not content or not platforms:
-            return jsonify({
-                'success': False,
-                'error': 'Content and platforms are required'
-            }), 400
+        try:
+            VALIDATE_SCHEMA(data)
+        except JsonSchemaException:
+            return make_error('Content and platforms are required', 400)
         
-        validation_results = {}
+        content = data['content']
+        platforms = data['platforms']
         
-        for platform in platforms:
-            validation = social_media_publisher.validate_content_for_platform(content, platform)
-            validation_results[platform] = validation
+        validation_results = social_media_publisher.validate_content_for_platforms(content, platforms)
         
         return jsonify({
             'success': True,
@@ -488,13 +752,11 @@ def validate_content():
         })
         
     except Exception as e:
-        logger.error(f"Error validating content: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+        logger.error("Error validating content: %s", e)
+        return make_error('Internal server error', 500)
 
 @social_media_bp.route('/setup-check', methods=['GET'])
+@cached_response(ttl=300, namespace='social_media')
 def check_setup():
     """Check if free AI models are properly set up"""
     try:
@@ -507,9 +769,6 @@ def check_setup():
         })
         
     except Exception as e:
-        logger.error(f"Error checking setup: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+        logger.error("Error checking setup: %s", e)
+        return make_error('Internal server error', 500)
 
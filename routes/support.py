@@ -1,17 +1,111 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, Response, stream_with_context
 import logging
 import uuid
+import time
+import orjson
+import threading
+from itertools import chain
+from cachetools import TTLCache
 from datetime import datetime
 from src.services.smart_support_bot import smart_support_bot
 from src.services.support_escalation import support_escalation_manager
+from src.services.semantic_cache import support_response_cache
 from src.models.support_chat import SupportChat, SupportMessage, SupportKnowledgeBase, SupportAgent
 from src.models.user import User
 from src.models.base import db
+from src.services.json_provider import ORJSONProvider
 
 logger = logging.getLogger(__name__)
 
 support_bp = Blueprint('support', __name__, url_prefix='/support')
 
+# session_id -> chat id, so repeat lookups in a live chat go through the primary key
+_SESSION_TO_CHAT_ID = TTLCache(maxsize=10000, ttl=3600)
+_SESSION_TO_CHAT_ID_LOCK = threading.Lock()
+
+def get_chat_by_session(session_id: str):
+    """Get the chat for a session, by primary key when the id is already known"""
+    with _SESSION_TO_CHAT_ID_LOCK:
+        chat_id = _SESSION_TO_CHAT_ID.get(session_id)
+    
+    if chat_id is not None:
+        chat = db.session.get(SupportChat, chat_id)
+        if chat and chat.session_id == session_id:
+            return chat
+    
+    chat = SupportChat.query.filter_by(session_id=session_id).first()
+    if chat:
+        with _SESSION_TO_CHAT_ID_LOCK:
+            _SESSION_TO_CHAT_ID[session_id] = chat.id
+    return chat
+
+# Chat message limits, checked before any database work
+MAX_MESSAGE_PAYLOAD_BYTES = 8 * 1024
+MAX_MESSAGE_LENGTH = 4000
+
+# Dashboard analytics per period, dropped whenever a chat is closed
+_ANALYTICS_CACHE = {}
+_ANALYTICS_CACHE_TTL = 60
+_ANALYTICS_CACHE_MAX_SIZE = 64
+
+# Static chat messages by key and language, only the welcome takes a name
+TR = {
+    'welcome': {
+        'ar': "مرحباً {name}! 👋 أنا مساعدك الذكي في نظام التسويق الآلي. كيف يمكنني مساعدتك اليوم؟",
+        'en': "Hello {name}! 👋 I'm your smart assistant for the Marketing Automation System. How can I help you today?"
+    },
+    'welcome_default_name': {'ar': 'بك', 'en': 'there'},
+    'transfer_ack': {'ar': 'تم إرسال رسالتك للموظف المختص', 'en': 'Your message has been sent to our support agent'},
+    'agent_name': {'ar': 'موظف الدعم', 'en': 'Support Agent'},
+    'auto_escalated': {'ar': 'تم تحويل محادثتك للدعم البشري تلقائياً', 'en': 'Your chat has been automatically transferred to human support'},
+    'closed_system': {'ar': 'تم إغلاق المحادثة', 'en': 'Chat session closed'},
+    'closed': {'ar': 'تم إغلاق المحادثة بنجاح', 'en': 'Chat closed successfully'}
+}
+
+def tr(key: str, lang: str, default: str = 'en', **fmt) -> str:
+    """Get a chat message in the given language, formatted when arguments are passed"""
+    messages = TR[key]
+    text = messages.get(lang) or messages[default]
+    return text.format(**fmt) if fmt else text
+
+# Columns returned by the listing endpoints, matching the models' to_dict()
+_KNOWLEDGE_BASE_COLUMNS = (
+    SupportKnowledgeBase.id, SupportKnowledgeBase.question, SupportKnowledgeBase.answer,
+    SupportKnowledgeBase.category, SupportKnowledgeBase.language, SupportKnowledgeBase.keywords,
+    SupportKnowledgeBase.intent, SupportKnowledgeBase.usage_count, SupportKnowledgeBase.success_rate,
+    SupportKnowledgeBase.is_active, SupportKnowledgeBase.priority,
+    SupportKnowledgeBase.created_at, SupportKnowledgeBase.updated_at
+)
+_AGENT_COLUMNS = (
+    SupportAgent.id, SupportAgent.name, SupportAgent.email, SupportAgent.phone,
+    SupportAgent.is_active, SupportAgent.is_online, SupportAgent.status,
+    SupportAgent.languages, SupportAgent.specialties, SupportAgent.max_concurrent_chats,
+    SupportAgent.total_chats_handled, SupportAgent.average_response_time,
+    SupportAgent.satisfaction_rating, SupportAgent.last_activity, SupportAgent.created_at
+)
+
+# The widget configuration is static, serialize it once at import time
+_WIDGET_CONFIG_BYTES = orjson.dumps({
+    'success': True,
+    'config': {
+        'enabled': True,
+        'position': 'bottom-right',
+        'theme': 'blue',
+        'languages': ['ar', 'en'],
+        'default_language': 'ar',
+        'greeting_message': {
+            'ar': 'مرحباً! كيف يمكنني مساعدتك؟',
+            'en': 'Hello! How can I help you?'
+        },
+        'quick_actions': [
+            {'type': 'pricing', 'label_ar': 'الأسعار', 'label_en': 'Pricing'},
+            {'type': 'features', 'label_ar': 'الميزات', 'label_en': 'Features'},
+            {'type': 'support', 'label_ar': 'الدعم', 'label_en': 'Support'},
+            {'type': 'demo', 'label_ar': 'عرض توضيحي', 'label_en': 'Demo'}
+        ]
+    }
+})
+
 @support_bp.route('/chat/start', methods=['POST'])
 def start_chat():
     """Start a new support chat session"""
@@ -40,15 +134,13 @@ def start_chat():
         )
         
         db.session.add(chat)
-        db.session.commit()
+        db.session.flush()  # Assign chat.id, committed together with the welcome message
         
         # Generate welcome message
-        welcome_messages = {
-            'ar': f"مرحباً {visitor_name or 'بك'}! 👋 أنا مساعدك الذكي في نظام التسويق الآلي. كيف يمكنني مساعدتك اليوم؟",
-            'en': f"Hello {visitor_name or 'there'}! 👋 I'm your smart assistant for the Marketing Automation System. How can I help you today?"
-        }
-        
-        welcome_message = welcome_messages.get(language, welcome_messages['ar'])
+        welcome_message = tr(
+            'welcome', language, default='ar',
+            name=visitor_name or tr('welcome_default_name', language, default='ar')
+        )
         
         # Add welcome message to chat
         bot_message = SupportMessage(
@@ -62,6 +154,9 @@ def start_chat():
         db.session.add(bot_message)
         db.session.commit()
         
+        with _SESSION_TO_CHAT_ID_LOCK:
+            _SESSION_TO_CHAT_ID[session_id] = chat.id
+        
         return jsonify({
             'success': True,
             'session_id': session_id,
@@ -82,7 +177,20 @@ def start_chat():
 def send_message():
     """Send message to support chat"""
     try:
-        data = request.get_json()
+        # Reject oversized and malformed payloads before touching the database
+        if request.content_length and request.content_length > MAX_MESSAGE_PAYLOAD_BYTES:
+            return jsonify({
+                'success': False,
+                'error': 'Request body too large'
+            }), 413
+        
+        data = request.get_json(silent=True, cache=False)
+        if not isinstance(data, dict):
+            return jsonify({
+                'success': False,
+                'error': 'Request body must be a JSON object'
+            }), 400
+        
         session_id = data.get('session_id')
         message = data.get('message')
         
@@ -92,42 +200,60 @@ def send_message():
                 'error': 'session_id and message are required'
             }), 400
         
+        if not isinstance(session_id, str) or not isinstance(message, str):
+            return jsonify({
+                'success': False,
+                'error': 'session_id and message must be strings'
+            }), 400
+        
+        if len(message) > MAX_MESSAGE_LENGTH:
+            return jsonify({
+                'success': False,
+                'error': f'message must be at most {MAX_MESSAGE_LENGTH} characters'
+            }), 400
+        
         # Find chat session
-        chat = SupportChat.query.filter_by(session_id=session_id).first()
+        chat = get_chat_by_session(session_id)
         if not chat:
             return jsonify({
                 'success': False,
                 'error': 'Chat session not found'
             }), 404
         
+        # One timestamp for the whole request
+        now = datetime.utcnow()
+        
         # Update chat activity
-        chat.last_activity = datetime.utcnow()
+        chat.last_activity = now
         chat.total_messages += 1
         
-        # Add user message
-        user_message = SupportMessage(
-            chat_id=chat.id,
-            message_type='user',
-            content=message,
-            language=chat.language,
-            sent_at=datetime.utcnow()
-        )
-        db.session.add(user_message)
+        # Messages are written as plain rows, they are never read back in this request
+        user_message = {
+            'chat_id': chat.id,
+            'message_type': 'user',
+            'content': message,
+            'language': chat.language,
+            'sent_at': now
+        }
         
         # Check if chat is handled by human agent
         if chat.status == 'transferred' and chat.human_agent_id:
             # Notify human agent (in real implementation, this would be via WebSocket)
+            db.session.execute(db.insert(SupportMessage), [user_message])
             db.session.commit()
             return jsonify({
                 'success': True,
-                'message': 'تم إرسال رسالتك للموظف المختص' if chat.language == 'ar' else 'Your message has been sent to our support agent',
+                'message': tr('transfer_ack', chat.language),
                 'status': 'transferred',
-                'agent_name': 'موظف الدعم' if chat.language == 'ar' else 'Support Agent'
+                'agent_name': tr('agent_name', chat.language)
             }), 200
         
-        # Generate AI response
-        bot_response = smart_support_bot.generate_response(
-            message, chat.user_id, session_id
+        # Generate AI response, reusing the answer to a similar earlier question.
+        # Responses can be personalized, so visitors and each user get their own scope
+        bot_response = support_response_cache.get_or_generate(
+            message,
+            lambda: smart_support_bot.generate_response(message, chat.user_id, session_id),
+            scope=(chat.language, chat.user_id)
         )
         
         if not bot_response.get('success', False):
@@ -136,17 +262,19 @@ def send_message():
         # Update AI resolution attempts
         chat.ai_resolution_attempts += 1
         
-        # Add bot response message
-        bot_message = SupportMessage(
-            chat_id=chat.id,
-            message_type='ai',
-            content=bot_response['response'],
-            language=bot_response.get('language', 'ar'),
-            ai_confidence=bot_response.get('confidence', 0.0),
-            ai_intent=bot_response.get('intent', 'unknown'),
-            sent_at=datetime.utcnow()
-        )
-        db.session.add(bot_message)
+        # Insert the user message and bot response in one statement, before a
+        # possible escalation reads the conversation history
+        bot_message = {
+            'chat_id': chat.id,
+            'message_type': 'ai',
+            'content': bot_response['response'],
+            'language': bot_response.get('language', 'ar'),
+            'ai_confidence': bot_response.get('confidence', 0.0),
+            'ai_intent': bot_response.get('intent', 'unknown'),
+            'sent_at': now
+        }
+        db.session.execute(db.insert(SupportMessage), [user_message, bot_message])
+        chat.total_messages += 1
         
         # Check if escalation is needed
         escalation_check = support_escalation_manager.should_escalate(
@@ -168,21 +296,20 @@ def send_message():
             escalation_result = support_escalation_manager.escalate_to_human(
                 chat.id, 
                 ', '.join(escalation_check['reasons']),
-                escalation_check['priority']
+                escalation_check['priority'],
+                commit=False
             )
             
             if escalation_result['success']:
                 response_data.update({
                     'auto_escalated': True,
-                    'escalation_message': 'تم تحويل محادثتك للدعم البشري تلقائياً' if chat.language == 'ar' else 'Your chat has been automatically transferred to human support',
+                    'escalation_message': tr('auto_escalated', chat.language),
                     'ticket_id': escalation_result.get('ticket_id')
                 })
         
+        # Both messages are already recorded on the chat, commit everything at once
         db.session.commit()
         
-        # Log interaction for analytics
-        smart_support_bot.log_interaction(session_id, message, bot_response, chat.user_id)
-        
         return jsonify(response_data), 200
         
     except Exception as e:
@@ -209,7 +336,7 @@ def escalate_chat():
             }), 400
         
         # Find chat session
-        chat = SupportChat.query.filter_by(session_id=session_id).first()
+        chat = get_chat_by_session(session_id)
         if not chat:
             return jsonify({
                 'success': False,
@@ -232,33 +359,55 @@ def escalate_chat():
 def get_chat_history(session_id):
     """Get chat history for a session"""
     try:
-        chat = SupportChat.query.filter_by(session_id=session_id).first()
-        if not chat:
+        # Chat and messages in one query, read in batches while streaming
+        rows = iter(db.session.query(
+            SupportChat,
+            SupportMessage.id,
+            SupportMessage.message_type,
+            SupportMessage.content,
+            SupportMessage.sender_name,
+            SupportMessage.sent_at,
+            SupportMessage.ai_confidence,
+            SupportMessage.ai_intent
+        ).outerjoin(
+            SupportMessage, SupportMessage.chat_id == SupportChat.id
+        ).filter(
+            SupportChat.session_id == session_id
+        ).order_by(SupportMessage.sent_at, SupportMessage.id).yield_per(200))
+        
+        first_row = next(rows, None)
+        if first_row is None:
             return jsonify({
                 'success': False,
                 'error': 'Chat session not found'
             }), 404
         
-        messages = SupportMessage.query.filter_by(chat_id=chat.id).order_by(SupportMessage.sent_at).all()
+        chat = first_row[0]
         
-        history = []
-        for msg in messages:
-            history.append({
-                'id': msg.id,
-                'type': msg.message_type,
-                'content': msg.content,
-                'sender_name': msg.sender_name,
-                'sent_at': msg.sent_at.isoformat() if msg.sent_at else None,
-                'confidence': msg.ai_confidence,
-                'intent': msg.ai_intent
-            })
+        def generate():
+            yield b'{"success":true,"chat_info":' + orjson.dumps(chat.to_dict()) + b',"messages":['
+            
+            total_messages = 0
+            for row in chain([first_row], rows):
+                # A chat without messages still yields one row from the outer join
+                if row.id is None:
+                    continue
+                
+                message = orjson.dumps({
+                    'id': row.id,
+                    'type': row.message_type,
+                    'content': row.content,
+                    'sender_name': row.sender_name,
+                    'sent_at': row.sent_at,
+                    'confidence': row.ai_confidence,
+                    'intent': row.ai_intent
+                }, option=ORJSONProvider.option)
+                yield b',' + message if total_messages else message
+                total_messages += 1
+            
+            yield b'],"total_messages":%d}' % total_messages
         
-        return jsonify({
-            'success': True,
-            'chat_info': chat.to_dict(),
-            'messages': history,
-            'total_messages': len(history)
-        }), 200
+        return Response(stream_with_context(generate()), mimetype='application/json')
         
     except Exception as e:
         logger.error(f"Error getting chat history: {str(e)}")
@@ -283,39 +432,47 @@ def close_chat():
             }), 400
         
         # Find chat session
-        chat = SupportChat.query.filter_by(session_id=session_id).first()
+        chat = get_chat_by_session(session_id)
         if not chat:
             return jsonify({
                 'success': False,
                 'error': 'Chat session not found'
             }), 404
         
+        # One timestamp for the whole request
+        now = datetime.utcnow()
+        
         # Update chat status
         chat.status = 'closed'
-        chat.closed_at = datetime.utcnow()
+        chat.closed_at = now
         chat.satisfaction_rating = satisfaction_rating
         chat.feedback = feedback
         
         # Calculate resolution time
         if chat.started_at:
-            resolution_time = (datetime.utcnow() - chat.started_at).total_seconds() / 60
+            resolution_time = (now - chat.started_at).total_seconds() / 60
             chat.resolution_time_minutes = int(resolution_time)
         
         # Add closing message
         closing_message = SupportMessage(
             chat_id=chat.id,
             message_type='system',
-            content='تم إغلاق المحادثة' if chat.language == 'ar' else 'Chat session closed',
+            content=tr('closed_system', chat.language),
             language=chat.language,
-            sent_at=datetime.utcnow()
+            sent_at=now
         )
         db.session.add(closing_message)
         
         db.session.commit()
         
+        # Resolution metrics changed
+        _ANALYTICS_CACHE.clear()
+        with _SESSION_TO_CHAT_ID_LOCK:
+            _SESSION_TO_CHAT_ID.pop(session_id, None)
+        
         return jsonify({
             'success': True,
-            'message': 'تم إغلاق المحادثة بنجاح' if chat.language == 'ar' else 'Chat closed successfully',
+            'message': tr('closed', chat.language),
             'resolution_time_minutes': chat.resolution_time_minutes
         }), 200
         
@@ -334,19 +491,22 @@ def get_knowledge_base():
         language = request.args.get('language', 'ar')
         category = request.args.get('category')
         
-        query = SupportKnowledgeBase.query.filter(
+        # Plain rows with the to_dict() fields, serialized without ORM objects
+        query = db.select(*_KNOWLEDGE_BASE_COLUMNS).where(
             SupportKnowledgeBase.language == language,
             SupportKnowledgeBase.is_active == True
         )
         
         if category:
-            query = query.filter(SupportKnowledgeBase.category == category)
+            query = query.where(SupportKnowledgeBase.category == category)
         
-        entries = query.order_by(SupportKnowledgeBase.priority.desc()).all()
+        entries = db.session.execute(
+            query.order_by(SupportKnowledgeBase.priority.desc())
+        ).mappings().all()
         
         return jsonify({
             'success': True,
-            'entries': [entry.to_dict() for entry in entries],
+            'entries': entries,
             'total': len(entries)
         }), 200
         
@@ -401,11 +561,23 @@ def add_knowledge_base_entry():
 def get_support_agents():
     """Get list of support agents"""
     try:
-        agents = SupportAgent.query.filter_by(is_active=True).all()
+        rows = db.session.execute(
+            db.select(*_AGENT_COLUMNS).where(SupportAgent.is_active == True)
+        ).mappings().all()
+        
+        # Comma-separated columns are returned as lists, as in SupportAgent.to_dict()
+        agents = [
+            {
+                **row,
+                'languages': row['languages'].split(',') if row['languages'] else [],
+                'specialties': row['specialties'].split(',') if row['specialties'] else []
+            }
+            for row in rows
+        ]
         
         return jsonify({
             'success': True,
-            'agents': [agent.to_dict() for agent in agents],
+            'agents': agents,
             'total': len(agents)
         }), 200
         
@@ -424,47 +596,42 @@ def get_support_analytics():
         
         # Get date range
         days = int(request.args.get('days', 7))
-        end_date = date.today()
-        start_date = end_date - timedelta(days=days)
         
-        # Basic metrics
-        total_chats = SupportChat.query.filter(
-            SupportChat.started_at >= start_date
-        ).count()
-        
-        ai_resolved = SupportChat.query.filter(
-            SupportChat.started_at >= start_date,
-            SupportChat.ai_handled == True,
-            SupportChat.status == 'closed'
-        ).count()
+        cached = _ANALYTICS_CACHE.get(days)
+        if cached and cached[0] > time.time():
+            return jsonify(cached[1]), 200
         
-        human_resolved = SupportChat.query.filter(
-            SupportChat.started_at >= start_date,
-            SupportChat.ai_handled == False,
-            SupportChat.status == 'closed'
-        ).count()
+        end_date = date.today()
+        start_date = end_date - timedelta(days=days)
         
-        active_chats = SupportChat.query.filter(
+        # All metrics in one pass, active chats are counted regardless of the period
+        active_chats_query = db.select(db.func.count(SupportChat.id)).where(
             SupportChat.status.in_(['active', 'transferred'])
-        ).count()
-        
-        # Average satisfaction
-        avg_satisfaction = db.session.query(
-            db.func.avg(SupportChat.satisfaction_rating)
-        ).filter(
-            SupportChat.started_at >= start_date,
-            SupportChat.satisfaction_rating.isnot(None)
-        ).scalar() or 0
-        
-        # Response time
-        avg_resolution_time = db.session.query(
+        ).correlate(None).scalar_subquery()
+        
+        metrics = db.session.query(
+            db.func.count(SupportChat.id),
+            db.func.sum(db.case(
+                ((SupportChat.ai_handled == True) & (SupportChat.status == 'closed'), 1), else_=0
+            )),
+            db.func.sum(db.case(
+                ((SupportChat.ai_handled == False) & (SupportChat.status == 'closed'), 1), else_=0
+            )),
+            active_chats_query,
+            db.func.avg(SupportChat.satisfaction_rating),
             db.func.avg(SupportChat.resolution_time_minutes)
         ).filter(
-            SupportChat.started_at >= start_date,
-            SupportChat.resolution_time_minutes.isnot(None)
-        ).scalar() or 0
+            SupportChat.started_at >= start_date
+        ).one()
         
-        return jsonify({
+        total_chats = metrics[0]
+        ai_resolved = metrics[1] or 0
+        human_resolved = metrics[2] or 0
+        active_chats = metrics[3] or 0
+        avg_satisfaction = metrics[4] or 0
+        avg_resolution_time = metrics[5] or 0
+        
+        analytics = {
             'success': True,
             'analytics': {
                 'total_chats': total_chats,
@@ -476,7 +643,13 @@ def get_support_analytics():
                 'average_resolution_time_minutes': round(avg_resolution_time, 2),
                 'period_days': days
             }
-        }), 200
+        }
+        
+        if len(_ANALYTICS_CACHE) >= _ANALYTICS_CACHE_MAX_SIZE:
+            _ANALYTICS_CACHE.clear()
+        _ANALYTICS_CACHE[days] = (time.time() + _ANALYTICS_CACHE_TTL, analytics)
+        
+        return jsonify(analytics), 200
         
     except Exception as e:
         logger.error(f"Error getting support analytics: {str(e)}")
@@ -488,36 +661,7 @@ def get_support_analytics():
 @support_bp.route('/widget/config', methods=['GET'])
 def get_widget_config():
     """Get support widget configuration"""
-    try:
-        config = {
-            'enabled': True,
-            'position': 'bottom-right',
-            'theme': 'blue',
-            'languages': ['ar', 'en'],
-            'default_language': 'ar',
-            'greeting_message': {
-                'ar': 'مرحباً! كيف يمكنني مساعدتك؟',
-                'en': 'Hello! How can I help you?'
-            },
-            'quick_actions': [
-                {'type': 'pricing', 'label_ar': 'الأسعار', 'label_en': 'Pricing'},
-                {'type': 'features', 'label_ar': 'الميزات', 'label_en': 'Features'},
-                {'type': 'support', 'label_ar': 'الدعم', 'label_en': 'Support'},
-                {'type': 'demo', 'label_ar': 'عرض توضيحي', 'label_en': 'Demo'}
-            ]
-        }
-        
-        return jsonify({
-            'success': True,
-            'config': config
-        }), 200
-        
-    except Exception as e:
-        logger.error(f"Error getting widget config: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+    return Response(_WIDGET_CONFIG_BYTES, mimetype='application/json')
 
 @support_bp.route('/health', methods=['GET'])
 def support_health_check():
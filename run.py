@@ -18,26 +18,17 @@ load_dotenv()
 # Add src directory to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
+import logging_config
 from src.main import create_app
 
-# Configure logging
-logging.basicConfig(
-    level=getattr(logging, os.getenv('LOG_LEVEL', 'INFO')),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(os.getenv('LOG_FILE', 'logs/app.log')),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Configure logging (wsgi.py does the same for gunicorn workers)
+queue_listener = logging_config.setup()
 
 logger = logging.getLogger(__name__)
 
 def main():
     """Main application entry point"""
     try:
-        # Create Flask application
-        app = create_app()
-        
         # Get configuration from environment
         host = os.getenv('HOST', '0.0.0.0')
         port = int(os.getenv('PORT', 5000))
@@ -49,17 +40,36 @@ def main():
         logger.info(f"Port: {port}")
         logger.info(f"Debug: {debug}")
         
-        # Create logs directory if it doesn't exist
-        os.makedirs('logs', exist_ok=True)
+        # Create the logs, uploads and backups directories if they don't exist
+        required_dirs = ['logs', os.getenv('UPLOAD_FOLDER', 'uploads')]
+        if os.getenv('BACKUP_ENABLED', 'True').lower() == 'true':
+            required_dirs.append(os.getenv('BACKUP_LOCATION', 'backups'))
+        
+        with os.scandir('.') as entries:
+            existing_dirs = {entry.name for entry in entries if entry.is_dir()}
+        for directory in required_dirs:
+            if directory not in existing_dirs:
+                os.makedirs(directory, exist_ok=True)
         
-        # Create uploads directory if it doesn't exist
-        os.makedirs(os.getenv('UPLOAD_FOLDER', 'uploads'), exist_ok=True)
+        # Outside development, serve through gunicorn gevent workers (see wsgi.py)
+        if not debug:
+            workers = os.getenv('WEB_CONCURRENCY', str(os.cpu_count() or 1))
+            logger.info(f"Workers: {workers}")
+            queue_listener.stop()
+            os.execvp('gunicorn', [
+                'gunicorn',
+                '-k', 'gevent',
+                '-w', workers,
+                '--worker-connections', '1000',
+                '--chdir', os.path.dirname(os.path.abspath(__file__)),
+                f'--bind={host}:{port}',
+                'wsgi:app'
+            ])
         
-        # Create backups directory if it doesn't exist
-        if os.getenv('BACKUP_ENABLED', 'True').lower() == 'true':
-            os.makedirs(os.getenv('BACKUP_LOCATION', 'backups'), exist_ok=True)
+        # Create Flask application
+        app = create_app()
         
-        # Start the application
+        # Start the development server
         app.run(
             host=host,
             port=port,
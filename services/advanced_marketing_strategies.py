@@ -1,172 +1,279 @@
+import re
+import string
+import copy
+import asyncio
+import threading
+import concurrent.futures
+import itertools
 import logging
+import orjson
+import numpy as np
+from functools import lru_cache, wraps
+from dataclasses import dataclass
+from cachetools import TTLCache
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from types import MappingProxyType
+from typing import Dict, List, Optional, Any, AsyncIterator, Mapping, Tuple, Callable
 import google.generativeai as genai
 import os
 from src.services.ai_content_generator import ai_content_generator
 from src.services.external_api_integration import api_integration
+from src.services.cache_manager import cache_manager
 
 logger = logging.getLogger(__name__)
 
-class AdvancedMarketingStrategies:
-    """Advanced Marketing Strategies System with 20 Comprehensive Strategies"""
+# Maximum content idea requests in flight at once, per API key
+CONTENT_IDEAS_CONCURRENCY = int(os.getenv('CONTENT_IDEAS_CONCURRENCY', 8))
+
+# Extra Gemini API keys that content idea requests are spread across
+GEMINI_API_KEYS = [key.strip() for key in os.getenv('GOOGLE_GEMINI_API_KEYS', '').split(',') if key.strip()]
+
+# Lines of an optimization plan that mention a numbered or ordinal step
+_PRIORITY_LINE_RE = re.compile(
+    r'^.*(?:[123]\.|أولاً|ثانياً|ثالثاً|first|second|third).*$',
+    re.IGNORECASE | re.MULTILINE
+)
+
+# Successful AI results are reused for a day
+STRATEGY_RESULT_TTL = 86400
+
+@dataclass(slots=True, frozen=True)
+class StrategyResult:
+    """Outcome of a strategy operation"""
+    success: bool
+    data: Optional[Mapping[str, Any]] = None
+    error: Optional[str] = None
     
-    def __init__(self):
-        self.gemini_api_key = os.getenv('GOOGLE_GEMINI_API_KEY')
-        if self.gemini_api_key:
-            genai.configure(api_key=self.gemini_api_key)
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to the flat response dictionary"""
+        if self.success:
+            return {'success': True, **(self.data or {})}
+        return {'success': False, 'error': self.error}
+    
+    @classmethod
+    def from_dict(cls, response: Dict[str, Any]) -> 'StrategyResult':
+        """Rebuild a result from its flat response dictionary"""
+        data = dict(response)
+        success = data.pop('success', False)
+        if success:
+            return cls(True, data=data)
+        return cls(False, error=data.get('error'))
+
+_STRATEGY_NOT_FOUND = StrategyResult(False, error='Strategy not found')
+
+def cached_strategy_result(fn):
+    """Reuse successful results of an async strategy method for identical input
+    
+    Results are kept in memory and in the cache manager, which persists them
+    in Redis or on disk across restarts and workers. Memory is checked first.
+    Concurrent calls with the same input share one generation; they may run
+    on different event loops, so the shared future is a thread-safe one.
+    """
+    memory = TTLCache(maxsize=512, ttl=STRATEGY_RESULT_TTL)
+    inflight: Dict[bytes, concurrent.futures.Future] = {}
+    inflight_lock = threading.Lock()
+    
+    async def load(self, data: Dict, args: tuple, params: Dict, key: bytes) -> StrategyResult:
+        cached = cache_manager.get_cached_api_response('advanced_marketing_strategies', fn.__name__, params)
+        if cached is None:
+            result = await fn(self, data, *args)
+            if not result.success:
+                return result
+            cache_manager.cache_api_response(
+                'advanced_marketing_strategies', fn.__name__, params, result.to_dict(), STRATEGY_RESULT_TTL
+            )
+        else:
+            result = StrategyResult.from_dict(cached)
+        memory[key] = result
+        return result
+    
+    @wraps(fn)
+    async def wrapper(self, data: Dict, *args) -> StrategyResult:
+        params = {'data': data, 'args': list(args)}
+        key = orjson.dumps(params, option=orjson.OPT_SORT_KEYS)
         
-        # Comprehensive Marketing Strategies Database (20 Advanced Strategies)
-        self.marketing_strategies = {
-            # Core Strategies (1-5)
-            'content_marketing': {
-                'name_ar': 'تسويق المحتوى',
-                'name_en': 'Content Marketing',
-                'description_ar': 'إنشاء محتوى قيم وتعليمي يجذب العملاء ويبني الثقة',
-                'description_en': 'Creating valuable and educational content that attracts customers and builds trust',
-                'focus': 'valuable_educational_content',
-                'tone': 'educational_helpful',
-                'cta_style': 'soft_educational',
-                'content_types': ['blog_posts', 'tutorials', 'guides', 'infographics', 'ebooks'],
-                'best_for': ['all_businesses', 'b2b', 'education', 'consulting'],
-                'target_audience': ['professionals', 'learners', 'decision_makers'],
-                'platforms': ['website', 'linkedin', 'youtube', 'medium'],
-                'kpis': ['engagement_rate', 'time_on_page', 'lead_generation', 'brand_awareness']
-            },
-            'social_media_marketing': {
-                'name_ar': 'التسويق عبر وسائل التواصل الاجتماعي',
-                'name_en': 'Social Media Marketing',
-                'description_ar': 'بناء مجتمع وتفاعل مع العملاء عبر منصات التواصل',
-                'description_en': 'Building community and engaging with customers across social platforms',
-                'focus': 'engagement_community_building',
-                'tone': 'conversational_friendly',
-                'cta_style': 'interactive_engaging',
-                'content_types': ['posts', 'stories', 'reels', 'polls', 'live_streams'],
-                'best_for': ['b2c', 'lifestyle', 'entertainment', 'retail', 'restaurants'],
-                'target_audience': ['general_public', 'millennials', 'gen_z'],
-                'platforms': ['facebook', 'instagram', 'tiktok', 'twitter', 'snapchat'],
-                'kpis': ['followers_growth', 'engagement_rate', 'reach', 'shares']
-            },
-            'viral_marketing': {
-                'name_ar': 'التسويق الفيروسي',
-                'name_en': 'Viral Marketing',
-                'description_ar': 'إنشاء محتوى قابل للانتشار السريع والواسع',
-                'description_en': 'Creating content designed for rapid and wide spread',
-                'focus': 'shareability_rapid_spread',
-                'tone': 'entertaining_memorable',
-                'cta_style': 'share_encouraging',
-                'content_types': ['memes', 'challenges', 'trending_content', 'viral_videos', 'hashtag_campaigns'],
-                'best_for': ['youth_brands', 'entertainment', 'social_causes', 'apps'],
-                'target_audience': ['young_adults', 'social_media_users', 'trend_followers'],
-                'platforms': ['tiktok', 'instagram', 'twitter', 'youtube_shorts'],
-                'kpis': ['viral_coefficient', 'shares', 'mentions', 'reach_growth']
-            },
-            'influencer_marketing': {
-                'name_ar': 'تسويق المؤثرين',
-                'name_en': 'Influencer Marketing',
-                'description_ar': 'الشراكة مع المؤثرين لبناء الثقة والوصول لجمهور أوسع',
-                'description_en': 'Partnering with influencers to build trust and reach wider audiences',
-                'focus': 'authenticity_trust_building',
-                'tone': 'personal_relatable',
-                'cta_style': 'recommendation_based',
-                'content_types': ['testimonials', 'reviews', 'collaborations', 'takeovers', 'sponsored_content'],
-                'best_for': ['fashion', 'beauty', 'lifestyle', 'tech', 'fitness'],
-                'target_audience': ['followers_of_influencers', 'niche_communities'],
-                'platforms': ['instagram', 'youtube', 'tiktok', 'twitch'],
-                'kpis': ['engagement_rate', 'conversion_rate', 'brand_mentions', 'follower_growth']
-            },
-            'paid_advertising': {
-                'name_ar': 'الإعلانات المدفوعة',
-                'name_en': 'Paid Advertising',
-                'description_ar': 'استخدام الإعلانات المدفوعة لتحقيق نتائج سريعة ومحددة',
-                'description_en': 'Using paid ads to achieve quick and targeted results',
-                'focus': 'conversion_roi_optimization',
-                'tone': 'persuasive_urgent',
-                'cta_style': 'strong_direct',
-                'content_types': ['ad_copy', 'headlines', 'display_ads', 'video_ads', 'search_ads'],
-                'best_for': ['ecommerce', 'saas', 'high_value_products', 'lead_generation'],
-                'target_audience': ['potential_customers', 'lookalike_audiences', 'retargeting'],
-                'platforms': ['google_ads', 'facebook_ads', 'linkedin_ads', 'youtube_ads'],
-                'kpis': ['roas', 'cpc', 'conversion_rate', 'ctr']
-            },
-            
-            # Advanced Strategies (6-10)
-            'email_marketing': {
-                'name_ar': 'التسويق بالبريد الإلكتروني',
-                'name_en': 'Email Marketing',
-                'description_ar': 'التواصل المباشر والشخصي مع العملاء عبر البريد الإلكتروني',
-                'description_en': 'Direct and personal communication with customers via email',
-                'focus': 'personalization_nurturing',
-                'tone': 'direct_personal',
-                'cta_style': 'clear_actionable',
-                'content_types': ['newsletters', 'promotions', 'sequences', 'welcome_series', 'abandoned_cart'],
-                'best_for': ['ecommerce', 'saas', 'b2b', 'subscription_services'],
-                'target_audience': ['existing_customers', 'subscribers', 'leads'],
-                'platforms': ['email_platforms', 'crm_systems'],
-                'kpis': ['open_rate', 'click_rate', 'conversion_rate', 'unsubscribe_rate']
-            },
-            'seo_marketing': {
-                'name_ar': 'تحسين محركات البحث',
-                'name_en': 'SEO Marketing',
-                'description_ar': 'تحسين المحتوى والموقع للظهور في نتائج البحث الأولى',
-                'description_en': 'Optimizing content and website to appear in top search results',
-                'focus': 'search_visibility_organic_traffic',
-                'tone': 'informative_authoritative',
-                'cta_style': 'keyword_optimized',
-                'content_types': ['articles', 'landing_pages', 'meta_content', 'schema_markup'],
-                'best_for': ['all_businesses', 'local_businesses', 'content_sites'],
-                'target_audience': ['searchers', 'information_seekers'],
-                'platforms': ['google', 'bing', 'website'],
-                'kpis': ['organic_traffic', 'keyword_rankings', 'click_through_rate', 'domain_authority']
-            },
-            'brand_storytelling': {
-                'name_ar': 'سرد العلامة التجارية',
-                'name_en': 'Brand Storytelling',
-                'description_ar': 'بناء هوية العلامة التجارية من خلال القصص المؤثرة',
-                'description_en': 'Building brand identity through compelling stories',
-                'focus': 'narrative_emotional_connection',
-                'tone': 'inspiring_authentic',
-                'cta_style': 'journey_based',
-                'content_types': ['stories', 'case_studies', 'testimonials', 'behind_scenes', 'founder_story'],
-                'best_for': ['premium_brands', 'startups', 'personal_brands', 'nonprofits'],
-                'target_audience': ['brand_enthusiasts', 'emotional_buyers'],
-                'platforms': ['all_platforms', 'website', 'social_media'],
-                'kpis': ['brand_awareness', 'emotional_engagement', 'brand_loyalty', 'story_shares']
-            },
-            'community_marketing': {
-                'name_ar': 'تسويق المجتمع',
-                'name_en': 'Community Marketing',
-                'description_ar': 'بناء مجتمع قوي حول العلامة التجارية',
-                'description_en': 'Building a strong community around the brand',
-                'focus': 'community_building_loyalty',
-                'tone': 'inclusive_supportive',
-                'cta_style': 'community_driven',
-                'content_types': ['discussions', 'events', 'user_content', 'forums', 'groups'],
-                'best_for': ['tech_companies', 'gaming', 'fitness', 'education'],
-                'target_audience': ['enthusiasts', 'power_users', 'advocates'],
-                'platforms': ['discord', 'reddit', 'facebook_groups', 'slack'],
-                'kpis': ['community_size', 'engagement_depth', 'user_retention', 'advocacy_rate']
-            },
-            'partnership_marketing': {
-                'name_ar': 'تسويق الشراكات',
-                'name_en': 'Partnership Marketing',
-                'description_ar': 'التعاون مع شركات أخرى لتوسيع الوصول',
-                'description_en': 'Collaborating with other companies to expand reach',
-                'focus': 'collaboration_mutual_benefit',
-                'tone': 'professional_collaborative',
-                'cta_style': 'partnership_focused',
-                'content_types': ['joint_content', 'co_marketing', 'cross_promotions', 'webinars'],
-                'best_for': ['b2b', 'saas', 'complementary_services'],
-                'target_audience': ['partner_audiences', 'shared_customers'],
-                'platforms': ['linkedin', 'industry_events', 'webinars'],
-                'kpis': ['partnership_roi', 'shared_leads', 'cross_sales', 'brand_reach']
-            }
-        }
+        result = memory.get(key)
+        if result is not None:
+            return copy.deepcopy(result)
         
-        # Language-specific strategy templates
-        self.strategy_templates = {
-            'ar': {
-                'strategy_analysis': """تحليل استراتيجية التسويق:
+        with inflight_lock:
+            pending = inflight.get(key)
+            leader = pending is None
+            if leader:
+                pending = inflight[key] = concurrent.futures.Future()
+        
+        if not leader:
+            return copy.deepcopy(await asyncio.wrap_future(pending))
+        
+        try:
+            result = await load(self, data, args, params, key)
+            pending.set_result(result)
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with inflight_lock:
+                del inflight[key]
+        
+        return copy.deepcopy(result)
+    
+    return wrapper
+
+# Strategies that get the budget bonus at each end of the budget range
+_LOW_BUDGET_STRATEGIES = frozenset({'content_marketing', 'social_media_marketing', 'seo_marketing'})
+_HIGH_BUDGET_STRATEGIES = frozenset({'paid_advertising', 'influencer_marketing'})
+
+# Comprehensive Marketing Strategies Database (20 Advanced Strategies)
+_MARKETING_STRATEGIES: Mapping[str, Mapping] = MappingProxyType({
+    # Core Strategies (1-5)
+    'content_marketing': {
+        'name_ar': 'تسويق المحتوى',
+        'name_en': 'Content Marketing',
+        'description_ar': 'إنشاء محتوى قيم وتعليمي يجذب العملاء ويبني الثقة',
+        'description_en': 'Creating valuable and educational content that attracts customers and builds trust',
+        'focus': 'valuable_educational_content',
+        'tone': 'educational_helpful',
+        'cta_style': 'soft_educational',
+        'content_types': ['blog_posts', 'tutorials', 'guides', 'infographics', 'ebooks'],
+        'best_for': ['all_businesses', 'b2b', 'education', 'consulting'],
+        'target_audience': ['professionals', 'learners', 'decision_makers'],
+        'platforms': ['website', 'linkedin', 'youtube', 'medium'],
+        'kpis': ['engagement_rate', 'time_on_page', 'lead_generation', 'brand_awareness']
+    },
+    'social_media_marketing': {
+        'name_ar': 'التسويق عبر وسائل التواصل الاجتماعي',
+        'name_en': 'Social Media Marketing',
+        'description_ar': 'بناء مجتمع وتفاعل مع العملاء عبر منصات التواصل',
+        'description_en': 'Building community and engaging with customers across social platforms',
+        'focus': 'engagement_community_building',
+        'tone': 'conversational_friendly',
+        'cta_style': 'interactive_engaging',
+        'content_types': ['posts', 'stories', 'reels', 'polls', 'live_streams'],
+        'best_for': ['b2c', 'lifestyle', 'entertainment', 'retail', 'restaurants'],
+        'target_audience': ['general_public', 'millennials', 'gen_z'],
+        'platforms': ['facebook', 'instagram', 'tiktok', 'twitter', 'snapchat'],
+        'kpis': ['followers_growth', 'engagement_rate', 'reach', 'shares']
+    },
+    'viral_marketing': {
+        'name_ar': 'التسويق الفيروسي',
+        'name_en': 'Viral Marketing',
+        'description_ar': 'إنشاء محتوى قابل للانتشار السريع والواسع',
+        'description_en': 'Creating content designed for rapid and wide spread',
+        'focus': 'shareability_rapid_spread',
+        'tone': 'entertaining_memorable',
+        'cta_style': 'share_encouraging',
+        'content_types': ['memes', 'challenges', 'trending_content', 'viral_videos', 'hashtag_campaigns'],
+        'best_for': ['youth_brands', 'entertainment', 'social_causes', 'apps'],
+        'target_audience': ['young_adults', 'social_media_users', 'trend_followers'],
+        'platforms': ['tiktok', 'instagram', 'twitter', 'youtube_shorts'],
+        'kpis': ['viral_coefficient', 'shares', 'mentions', 'reach_growth']
+    },
+    'influencer_marketing': {
+        'name_ar': 'تسويق المؤثرين',
+        'name_en': 'Influencer Marketing',
+        'description_ar': 'الشراكة مع المؤثرين لبناء الثقة والوصول لجمهور أوسع',
+        'description_en': 'Partnering with influencers to build trust and reach wider audiences',
+        'focus': 'authenticity_trust_building',
+        'tone': 'personal_relatable',
+        'cta_style': 'recommendation_based',
+        'content_types': ['testimonials', 'reviews', 'collaborations', 'takeovers', 'sponsored_content'],
+        'best_for': ['fashion', 'beauty', 'lifestyle', 'tech', 'fitness'],
+        'target_audience': ['followers_of_influencers', 'niche_communities'],
+        'platforms': ['instagram', 'youtube', 'tiktok', 'twitch'],
+        'kpis': ['engagement_rate', 'conversion_rate', 'brand_mentions', 'follower_growth']
+    },
+    'paid_advertising': {
+        'name_ar': 'الإعلانات المدفوعة',
+        'name_en': 'Paid Advertising',
+        'description_ar': 'استخدام الإعلانات المدفوعة لتحقيق نتائج سريعة ومحددة',
+        'description_en': 'Using paid ads to achieve quick and targeted results',
+        'focus': 'conversion_roi_optimization',
+        'tone': 'persuasive_urgent',
+        'cta_style': 'strong_direct',
+        'content_types': ['ad_copy', 'headlines', 'display_ads', 'video_ads', 'search_ads'],
+        'best_for': ['ecommerce', 'saas', 'high_value_products', 'lead_generation'],
+        'target_audience': ['potential_customers', 'lookalike_audiences', 'retargeting'],
+        'platforms': ['google_ads', 'facebook_ads', 'linkedin_ads', 'youtube_ads'],
+        'kpis': ['roas', 'cpc', 'conversion_rate', 'ctr']
+    },
+    
+    # Advanced Strategies (6-10)
+    'email_marketing': {
+        'name_ar': 'التسويق بالبريد الإلكتروني',
+        'name_en': 'Email Marketing',
+        'description_ar': 'التواصل المباشر والشخصي مع العملاء عبر البريد الإلكتروني',
+        'description_en': 'Direct and personal communication with customers via email',
+        'focus': 'personalization_nurturing',
+        'tone': 'direct_personal',
+        'cta_style': 'clear_actionable',
+        'content_types': ['newsletters', 'promotions', 'sequences', 'welcome_series', 'abandoned_cart'],
+        'best_for': ['ecommerce', 'saas', 'b2b', 'subscription_services'],
+        'target_audience': ['existing_customers', 'subscribers', 'leads'],
+        'platforms': ['email_platforms', 'crm_systems'],
+        'kpis': ['open_rate', 'click_rate', 'conversion_rate', 'unsubscribe_rate']
+    },
+    'seo_marketing': {
+        'name_ar': 'تحسين محركات البحث',
+        'name_en': 'SEO Marketing',
+        'description_ar': 'تحسين المحتوى والموقع للظهور في نتائج البحث الأولى',
+        'description_en': 'Optimizing content and website to appear in top search results',
+        'focus': 'search_visibility_organic_traffic',
+        'tone': 'informative_authoritative',
+        'cta_style': 'keyword_optimized',
+        'content_types': ['articles', 'landing_pages', 'meta_content', 'schema_markup'],
+        'best_for': ['all_businesses', 'local_businesses', 'content_sites'],
+        'target_audience': ['searchers', 'information_seekers'],
+        'platforms': ['google', 'bing', 'website'],
+        'kpis': ['organic_traffic', 'keyword_rankings', 'click_through_rate', 'domain_authority']
+    },
+    'brand_storytelling': {
+        'name_ar': 'سرد العلامة التجارية',
+        'name_en': 'Brand Storytelling',
+        'description_ar': 'بناء هوية العلامة التجارية من خلال القصص المؤثرة',
+        'description_en': 'Building brand identity through compelling stories',
+        'focus': 'narrative_emotional_connection',
+        'tone': 'inspiring_authentic',
+        'cta_style': 'journey_based',
+        'content_types': ['stories', 'case_studies', 'testimonials', 'behind_scenes', 'founder_story'],
+        'best_for': ['premium_brands', 'startups', 'personal_brands', 'nonprofits'],
+        'target_audience': ['brand_enthusiasts', 'emotional_buyers'],
+        'platforms': ['all_platforms', 'website', 'social_media'],
+        'kpis': ['brand_awareness', 'emotional_engagement', 'brand_loyalty', 'story_shares']
+    },
+    'community_marketing': {
+        'name_ar': 'تسويق المجتمع',
+        'name_en': 'Community Marketing',
+        'description_ar': 'بناء مجتمع قوي حول العلامة التجارية',
+        'description_en': 'Building a strong community around the brand',
+        'focus': 'community_building_loyalty',
+        'tone': 'inclusive_supportive',
+        'cta_style': 'community_driven',
+        'content_types': ['discussions', 'events', 'user_content', 'forums', 'groups'],
+        'best_for': ['tech_companies', 'gaming', 'fitness', 'education'],
+        'target_audience': ['enthusiasts', 'power_users', 'advocates'],
+        'platforms': ['discord', 'reddit', 'facebook_groups', 'slack'],
+        'kpis': ['community_size', 'engagement_depth', 'user_retention', 'advocacy_rate']
+    },
+    'partnership_marketing': {
+        'name_ar': 'تسويق الشراكات',
+        'name_en': 'Partnership Marketing',
+        'description_ar': 'التعاون مع شركات أخرى لتوسيع الوصول',
+        'description_en': 'Collaborating with other companies to expand reach',
+        'focus': 'collaboration_mutual_benefit',
+        'tone': 'professional_collaborative',
+        'cta_style': 'partnership_focused',
+        'content_types': ['joint_content', 'co_marketing', 'cross_promotions', 'webinars'],
+        'best_for': ['b2b', 'saas', 'complementary_services'],
+        'target_audience': ['partner_audiences', 'shared_customers'],
+        'platforms': ['linkedin', 'industry_events', 'webinars'],
+        'kpis': ['partnership_roi', 'shared_leads', 'cross_sales', 'brand_reach']
+    }
+})
+
+# Language-specific strategy templates
+_STRATEGY_TEMPLATES: Mapping[str, Mapping] = MappingProxyType({
+    'ar': {
+        'strategy_analysis': """تحليل استراتيجية التسويق:
 
 الاستراتيجية: {strategy_name}
 نوع العمل: {business_type}
@@ -181,8 +288,8 @@ class AdvancedMarketingStrategies:
 5. الخطوات التنفيذية المحددة
 
 قدم تحليلاً شاملاً ومفصلاً:""",
-                
-                'content_strategy': """إنشاء استراتيجية محتوى:
+        
+        'content_strategy': """إنشاء استراتيجية محتوى:
 
 الاستراتيجية: {strategy_name}
 المنصة: {platform}
@@ -197,8 +304,8 @@ class AdvancedMarketingStrategies:
 5. نصائح للتفاعل والمشاركة
 
 اكتب الخطة بالتفصيل:""",
-                
-                'campaign_optimization': """تحسين الحملة التسويقية:
+        
+        'campaign_optimization': """تحسين الحملة التسويقية:
 
 الحملة الحالية: {current_campaign}
 الأداء الحالي: {current_performance}
@@ -212,9 +319,9 @@ class AdvancedMarketingStrategies:
 5. توقعات النتائج المحسنة
 
 قدم خطة تحسين شاملة:"""
-            },
-            'en': {
-                'strategy_analysis': """Marketing Strategy Analysis:
+    },
+    'en': {
+        'strategy_analysis': """Marketing Strategy Analysis:
 
 Strategy: {strategy_name}
 Business Type: {business_type}
@@ -229,8 +336,8 @@ Required Analysis:
 5. Specific implementation steps
 
 Provide comprehensive and detailed analysis:""",
-                
-                'content_strategy': """Content Strategy Creation:
+        
+        'content_strategy': """Content Strategy Creation:
 
 Strategy: {strategy_name}
 Platform: {platform}
@@ -245,8 +352,8 @@ Requirements:
 5. Tips for engagement and sharing
 
 Write the detailed plan:""",
-                
-                'campaign_optimization': """Campaign Optimization:
+        
+        'campaign_optimization': """Campaign Optimization:
 
 Current Campaign: {current_campaign}
 Current Performance: {current_performance}
@@ -260,10 +367,78 @@ Required Optimizations:
 5. Expected improved results
 
 Provide comprehensive optimization plan:"""
+    }
+})
+
+def _compile_template(template: str) -> Callable[..., str]:
+    """Parse a prompt template once into a renderer taking its fields as keywords"""
+    parts = [(literal, field) for literal, field, _, _ in string.Formatter().parse(template)]
+    
+    def render(**fields: Any) -> str:
+        return ''.join(
+            literal if field is None else f"{literal}{fields[field]}"
+            for literal, field in parts
+        )
+    
+    return render
+
+# Prompt templates parsed ahead of time, rendered without re-parsing per call
+_PROMPT_RENDERERS: Mapping[str, Mapping[str, Callable[..., str]]] = MappingProxyType({
+    language: MappingProxyType({name: _compile_template(template) for name, template in templates.items()})
+    for language, templates in _STRATEGY_TEMPLATES.items()
+})
+
+class AdvancedMarketingStrategies:
+    """Advanced Marketing Strategies System with 20 Comprehensive Strategies"""
+    
+    def __init__(self):
+        self.gemini_api_key = os.getenv('GOOGLE_GEMINI_API_KEY')
+        if self.gemini_api_key:
+            genai.configure(api_key=self.gemini_api_key)
+        
+        # Shared read-only strategies database
+        self.marketing_strategies = _MARKETING_STRATEGIES
+        
+        # Lowercased scoring fields per strategy, computed once
+        self._strategy_index = {
+            strategy_id: {
+                'best_for_lc': frozenset(bf.lower() for bf in strategy['best_for']),
+                'target_audience_lc': frozenset(ta.lower() for ta in strategy['target_audience']),
+                'focus_lc': strategy['focus'].lower(),
+                'all_businesses': 'all_businesses' in strategy['best_for'],
+                'budget_scores': {
+                    'low': 20 if strategy_id in _LOW_BUDGET_STRATEGIES else 10,
+                    'high': 20 if strategy_id in _HIGH_BUDGET_STRATEGIES else 10
+                },
+                'summary': {
+                    'strategy_name': strategy['name_ar'],
+                    'description': strategy['description_ar'],
+                    'focus': strategy['focus'],
+                    'platforms': strategy['platforms'],
+                    'kpis': strategy['kpis']
+                }
             }
+            for strategy_id, strategy in self.marketing_strategies.items()
+        }
+        
+        # Round-robin over the configured API keys, None uses the stored credentials
+        self._key_pool = itertools.cycle(GEMINI_API_KEYS or [None])
+        
+        # Content types of each strategy as they appear in prompts
+        self._content_types_joined = {
+            strategy_id: ', '.join(strategy['content_types'])
+            for strategy_id, strategy in self.marketing_strategies.items()
         }
+        
+        # Strategy listings and details per language, built on first use
+        self._strategy_views = {}
+        
+        # Shared read-only language-specific strategy templates
+        self.strategy_templates = _STRATEGY_TEMPLATES
+        self._prompt_renderers = _PROMPT_RENDERERS
     
-    async def analyze_strategy_fit(self, business_data: Dict) -> Dict:
+    @cached_strategy_result
+    async def analyze_strategy_fit(self, business_data: Dict) -> StrategyResult:
         """Analyze which marketing strategies best fit the business"""
         
         try:
@@ -316,25 +491,24 @@ Provide detailed and professional analysis:"""
                 service='google_gemini'
             )
             
-            if result['success']:
-                analysis_text = result['data'].get('text', '')
-                
-                # Score strategies based on business fit
-                strategy_scores = self.calculate_strategy_scores(business_data)
-                
-                return {
-                    'success': True,
-                    'analysis': analysis_text,
-                    'recommended_strategies': strategy_scores[:5],
-                    'business_type': business_type,
-                    'language': language
-                }
-            else:
-                return {'success': False, 'error': result.get('error')}
+            if not result['success']:
+                return StrategyResult(False, error=result.get('error'))
+            
+            analysis_text = result['data'].get('text', '')
+            
+            # Score strategies based on business fit
+            strategy_scores = self.calculate_strategy_scores(business_data)
+            
+            return StrategyResult(True, data={
+                'analysis': analysis_text,
+                'recommended_strategies': strategy_scores[:5],
+                'business_type': business_type,
+                'language': language
+            })
             
         except Exception as e:
-            logger.error(f"Error analyzing strategy fit: {str(e)}")
-            return {'success': False, 'error': str(e)}
+            logger.error("Error analyzing strategy fit: %s", e)
+            return StrategyResult(False, error=str(e))
     
     def calculate_strategy_scores(self, business_data: Dict) -> List[Dict]:
         """Calculate fit scores for each strategy"""
@@ -342,51 +516,49 @@ Provide detailed and professional analysis:"""
         business_type = business_data.get('business_type', '').lower()
         target_audience = business_data.get('target_audience', '').lower()
         budget = business_data.get('budget', 'medium').lower()
-        goals = [goal.lower() for goal in business_data.get('goals', [])]
+        goals = tuple(sorted({goal.lower() for goal in business_data.get('goals', [])}))
+        
+        # Copies, so callers can't alter the memoized scores
+        return [dict(scored) for scored in self._score_strategies(business_type, target_audience, budget, goals)]
+    
+    @lru_cache(maxsize=512)
+    def _score_strategies(self, business_type: str, target_audience: str,
+                          budget: str, goals: tuple) -> tuple:
+        """Score every strategy for a normalized business profile, memoized"""
         
         scored_strategies = []
         
-        for strategy_id, strategy in self.marketing_strategies.items():
+        # Empty profile fields can't match any keyword, skip their scans entirely
+        match_business = bool(business_type)
+        match_audience = bool(target_audience)
+        
+        for strategy_id, index in self._strategy_index.items():
             score = 0
             
             # Business type fit
-            best_for = [bf.lower() for bf in strategy['best_for']]
-            if any(bt in business_type for bt in best_for) or 'all_businesses' in best_for:
+            if index['all_businesses'] or (match_business and any(bt in business_type for bt in index['best_for_lc'])):
                 score += 30
             
             # Target audience fit
-            target_audiences = [ta.lower() for ta in strategy['target_audience']]
-            if any(ta in target_audience for ta in target_audiences):
+            if match_audience and any(ta in target_audience for ta in index['target_audience_lc']):
                 score += 25
             
             # Budget considerations
-            if budget == 'low' and strategy_id in ['content_marketing', 'social_media_marketing', 'seo_marketing']:
-                score += 20
-            elif budget == 'high' and strategy_id in ['paid_advertising', 'influencer_marketing']:
-                score += 20
-            else:
-                score += 10
+            score += index['budget_scores'].get(budget, 10)
             
             # Goals alignment
-            strategy_focus = strategy['focus'].lower()
-            if any(goal in strategy_focus for goal in goals):
+            strategy_focus = index['focus_lc']
+            if goals and any(goal in strategy_focus for goal in goals):
                 score += 25
             
-            scored_strategies.append({
-                'strategy_id': strategy_id,
-                'strategy_name': strategy['name_ar'],
-                'score': score,
-                'description': strategy['description_ar'],
-                'focus': strategy['focus'],
-                'platforms': strategy['platforms'],
-                'kpis': strategy['kpis']
-            })
+            scored_strategies.append({'strategy_id': strategy_id, 'score': score, **index['summary']})
         
         # Sort by score
         scored_strategies.sort(key=lambda x: x['score'], reverse=True)
-        return scored_strategies
+        return tuple(scored_strategies)
     
-    async def create_content_strategy(self, strategy_data: Dict) -> Dict:
+    @cached_strategy_result
+    async def create_content_strategy(self, strategy_data: Dict) -> StrategyResult:
         """Create detailed content strategy"""
         
         try:
@@ -398,14 +570,14 @@ Provide detailed and professional analysis:"""
             
             strategy = self.marketing_strategies.get(strategy_id)
             if not strategy:
-                return {'success': False, 'error': 'Strategy not found'}
+                return _STRATEGY_NOT_FOUND
             
             # Build content strategy prompt
-            template = self.strategy_templates[language]['content_strategy']
-            prompt = template.format(
+            render_prompt = self._prompt_renderers[language]['content_strategy']
+            prompt = render_prompt(
                 strategy_name=strategy['name_ar'] if language == 'ar' else strategy['name_en'],
                 platform=platform,
-                content_type=', '.join(strategy['content_types']),
+                content_type=self._content_types_joined[strategy_id],
                 language=language
             )
             
@@ -422,23 +594,34 @@ Provide detailed and professional analysis:"""
                 # Generate specific content ideas
                 content_ideas = await self.generate_content_ideas(strategy_data, duration)
                 
-                return {
-                    'success': True,
+                return StrategyResult(True, data={
                     'content_strategy': content_plan,
                     'content_ideas': content_ideas,
                     'strategy_id': strategy_id,
                     'platform': platform,
                     'duration': duration
-                }
+                })
             else:
-                return {'success': False, 'error': result.get('error')}
+                return StrategyResult(False, error=result.get('error'))
             
         except Exception as e:
-            logger.error(f"Error creating content strategy: {str(e)}")
-            return {'success': False, 'error': str(e)}
+            logger.error("Error creating content strategy: %s", e)
+            return StrategyResult(False, error=str(e))
     
     async def generate_content_ideas(self, strategy_data: Dict, duration: int) -> List[Dict]:
-        """Generate specific content ideas for the strategy"""
+        """Generate specific content ideas for the strategy, ordered by day"""
+        
+        content_ideas = [idea async for idea in self.stream_content_ideas(strategy_data, duration)]
+        content_ideas.sort(key=lambda idea: idea['day'])
+        return content_ideas
+    
+    async def stream_content_ideas(self, strategy_data: Dict, duration: int) -> AsyncIterator[Dict]:
+        """Yield content ideas for the strategy as soon as each one is ready
+        
+        All days are requested in one call returning a JSON array; when that
+        answer can't be parsed, each day is generated separately and ideas
+        are yielded in completion order.
+        """
         
         try:
             strategy_id = strategy_data.get('strategy_id', 'content_marketing')
@@ -449,8 +632,110 @@ Provide detailed and professional analysis:"""
             strategy = self.marketing_strategies.get(strategy_id)
             content_types = strategy['content_types']
             
-            content_ideas = []
+            days = min(duration, 30)  # Limit to 30 ideas
+            # Rotate through content types
+            day_types = [content_types[i % len(content_types)] for i in range(days)]
+            schedule = '\n'.join(f"{i + 1}: {content_type}" for i, content_type in enumerate(day_types))
+            
+            if language == 'ar':
+                prompt = f"""أنشئ {days} فكرة محتوى محددة، فكرة لكل يوم:
+
+نوع العمل: {business_type}
+المنتج/الخدمة: {product_service}
+
+نوع المحتوى لكل يوم:
+{schedule}
+
+أعد مصفوفة JSON فقط بدون أي نص آخر، عنصر لكل يوم بالشكل:
+{{"day": رقم اليوم, "title": "عنوان جذاب", "description": "وصف المحتوى (2-3 جمل)", "hashtags": ["3 هاشتاجات مناسبة"], "tip": "نصيحة للتفاعل"}}"""
+            else:
+                prompt = f"""Create {days} specific content ideas, one per day:
+
+Business Type: {business_type}
+Product/Service: {product_service}
+
+Content type for each day:
+{schedule}
+
+Return only a JSON array with no other text, one item per day shaped as:
+{{"day": day number, "title": "catchy title", "description": "content description (2-3 sentences)", "hashtags": ["3 relevant hashtags"], "tip": "engagement tip"}}"""
+            
+            result = await api_integration.generate_text(
+                prompt=prompt,
+                max_tokens=200 * days,
+                temperature=0.9,
+                service='google_gemini',
+                api_key=next(self._key_pool)
+            )
+            
+            ideas = self._parse_content_ideas(result, day_types) if result['success'] else None
+            if ideas is None:
+                logger.warning("Batched content ideas unavailable, generating each day separately")
+                ideas = self._stream_content_ideas_per_day(strategy_data, duration)
+                async for idea in ideas:
+                    yield idea
+            else:
+                for idea in ideas:
+                    yield idea
+            
+        except Exception as e:
+            logger.error("Error generating content ideas: %s", e)
+    
+    def _parse_content_ideas(self, result: Dict, day_types: List[str]) -> Optional[List[Dict]]:
+        """Parse a batched JSON answer into content ideas, None when unusable"""
+        text = result['data'].get('text', '')
+        start = text.find('[')
+        end = text.rfind(']') + 1
+        if start == -1 or end <= start:
+            return None
+        
+        try:
+            items = orjson.loads(text[start:end])
+        except orjson.JSONDecodeError:
+            return None
+        
+        generated_at = datetime.utcnow()
+        content_ideas = []
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            day = item.get('day')
+            if not isinstance(day, int) or not 1 <= day <= len(day_types):
+                continue
+            
+            title = item.get('title', '')
+            description = item.get('description', '')
+            content_ideas.append({
+                'day': day,
+                'content_type': day_types[day - 1],
+                'idea': f"{title}\n{description}".strip(),
+                'title': title,
+                'description': description,
+                'hashtags': item.get('hashtags', []),
+                'tip': item.get('tip', ''),
+                'generated_at': generated_at
+            })
+        
+        if not content_ideas:
+            return None
+        
+        content_ideas.sort(key=lambda idea: idea['day'])
+        return content_ideas
+    
+    async def _stream_content_ideas_per_day(self, strategy_data: Dict, duration: int) -> AsyncIterator[Dict]:
+        """Yield content ideas with one request per day, in completion order"""
+        
+        try:
+            strategy_id = strategy_data.get('strategy_id', 'content_marketing')
+            language = strategy_data.get('language', 'ar')
+            business_type = strategy_data.get('business_type', '')
+            product_service = strategy_data.get('product_service', '')
+            
+            strategy = self.marketing_strategies.get(strategy_id)
+            content_types = strategy['content_types']
             
+            # Build every day's prompt first, then generate them concurrently
+            prompts = []
             for i in range(min(duration, 30)):  # Limit to 30 ideas
                 # Rotate through content types
                 content_type = content_types[i % len(content_types)]
@@ -486,29 +771,53 @@ Required:
 
 Write the idea concisely and specifically:"""
                 
-                result = await api_integration.generate_text(
-                    prompt=prompt,
-                    max_tokens=200,
-                    temperature=0.9,
-                    service='google_gemini'
-                )
+                prompts.append((i, content_type, prompt))
+            
+            # Bound in-flight requests per key to respect the provider's rate limits
+            semaphores = {key: asyncio.Semaphore(CONTENT_IDEAS_CONCURRENCY) for key in GEMINI_API_KEYS or [None]}
+            # Every idea of one request shares the same timestamp
+            generated_at = datetime.utcnow()
+            
+            async def generate_idea(i: int, content_type: str, prompt: str, api_key: Optional[str]) -> Optional[Dict]:
+                try:
+                    async with semaphores[api_key]:
+                        result = await api_integration.generate_text(
+                            prompt=prompt,
+                            max_tokens=200,
+                            temperature=0.9,
+                            service='google_gemini',
+                            api_key=api_key
+                        )
+                except Exception as e:
+                    logger.warning("Content idea generation failed for day %d: %s", i + 1, e)
+                    return None
+                
+                if not result['success']:
+                    return None
                 
-                if result['success']:
-                    idea_text = result['data'].get('text', '')
-                    content_ideas.append({
-                        'day': i + 1,
-                        'content_type': content_type,
-                        'idea': idea_text,
-                        'generated_at': datetime.now().isoformat()
-                    })
+                return {
+                    'day': i + 1,
+                    'content_type': content_type,
+                    'idea': result['data'].get('text', ''),
+                    'generated_at': generated_at
+                }
             
-            return content_ideas
+            tasks = [asyncio.ensure_future(generate_idea(*day, next(self._key_pool))) for day in prompts]
+            try:
+                for next_idea in asyncio.as_completed(tasks):
+                    idea = await next_idea
+                    if idea is not None:
+                        yield idea
+            finally:
+                # The consumer may stop early, don't leave requests running
+                for task in tasks:
+                    task.cancel()
             
         except Exception as e:
-            logger.error(f"Error generating content ideas: {str(e)}")
-            return []
+            logger.error("Error generating content ideas: %s", e)
     
-    async def optimize_campaign(self, campaign_data: Dict) -> Dict:
+    @cached_strategy_result
+    async def optimize_campaign(self, campaign_data: Dict) -> StrategyResult:
         """Optimize existing marketing campaign"""
         
         try:
@@ -518,8 +827,8 @@ Write the idea concisely and specifically:"""
             language = campaign_data.get('language', 'ar')
             
             # Build optimization prompt
-            template = self.strategy_templates[language]['campaign_optimization']
-            prompt = template.format(
+            render_prompt = self._prompt_renderers[language]['campaign_optimization']
+            prompt = render_prompt(
                 current_campaign=campaign_name,
                 current_performance=str(current_metrics),
                 target_goal=str(target_metrics)
@@ -538,19 +847,18 @@ Write the idea concisely and specifically:"""
                 # Calculate improvement potential
                 improvement_analysis = self.analyze_improvement_potential(current_metrics, target_metrics)
                 
-                return {
-                    'success': True,
+                return StrategyResult(True, data={
                     'optimization_plan': optimization_plan,
                     'improvement_analysis': improvement_analysis,
                     'campaign_name': campaign_name,
                     'priority_actions': self.extract_priority_actions(optimization_plan)
-                }
+                })
             else:
-                return {'success': False, 'error': result.get('error')}
+                return StrategyResult(False, error=result.get('error'))
             
         except Exception as e:
-            logger.error(f"Error optimizing campaign: {str(e)}")
-            return {'success': False, 'error': str(e)}
+            logger.error("Error optimizing campaign: %s", e)
+            return StrategyResult(False, error=str(e))
     
     def analyze_improvement_potential(self, current_metrics: Dict, target_metrics: Dict) -> Dict:
         """Analyze improvement potential based on metrics"""
@@ -562,25 +870,36 @@ Write the idea concisely and specifically:"""
             'success_probability': 70
         }
         
-        for metric, target_value in target_metrics.items():
-            current_value = current_metrics.get(metric, 0)
-            
-            if isinstance(target_value, (int, float)) and isinstance(current_value, (int, float)):
-                if target_value > current_value:
-                    improvement_needed = ((target_value - current_value) / current_value) * 100
-                    
-                    analysis['improvement_areas'].append({
-                        'metric': metric,
-                        'current': current_value,
-                        'target': target_value,
-                        'improvement_needed': f"{improvement_needed:.1f}%"
-                    })
-                    
-                    # Adjust priority based on improvement needed
-                    if improvement_needed > 50:
-                        analysis['priority_level'] = 'high'
-                        analysis['estimated_timeline'] = '4-8 weeks'
-                        analysis['success_probability'] = 60
+        numeric = [
+            (metric, target_value, current_metrics.get(metric, 0))
+            for metric, target_value in target_metrics.items()
+            if isinstance(target_value, (int, float)) and isinstance(current_metrics.get(metric, 0), (int, float))
+        ]
+        if not numeric:
+            return analysis
+        
+        # Compute every metric's gap in one vectorized pass
+        metrics, targets, currents = zip(*numeric)
+        target = np.array(targets, dtype=np.float64)
+        current = np.array(currents, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # A metric starting from zero needs unbounded improvement
+            improvement_needed = np.where(current != 0, (target - current) / current * 100, np.inf)
+        needs_improvement = target > current
+        
+        for i in np.flatnonzero(needs_improvement):
+            analysis['improvement_areas'].append({
+                'metric': metrics[i],
+                'current': currents[i],
+                'target': targets[i],
+                'improvement_needed': f"{improvement_needed[i]:.1f}%"
+            })
+        
+        # Adjust priority based on improvement needed
+        if (improvement_needed[needs_improvement] > 50).any():
+            analysis['priority_level'] = 'high'
+            analysis['estimated_timeline'] = '4-8 weeks'
+            analysis['success_probability'] = 60
         
         return analysis
     
@@ -589,54 +908,69 @@ Write the idea concisely and specifically:"""
         
         # Simple extraction based on common patterns
         actions = []
-        lines = optimization_plan.split('\n')
         
-        for line in lines:
-            line = line.strip()
-            if any(keyword in line.lower() for keyword in ['1.', '2.', '3.', 'أولاً', 'ثانياً', 'ثالثاً', 'first', 'second', 'third']):
-                if len(line) > 10:  # Avoid very short lines
-                    actions.append(line)
+        for match in _PRIORITY_LINE_RE.finditer(optimization_plan):
+            line = match.group(0).strip()
+            if len(line) > 10:  # Avoid very short lines
+                actions.append(line)
+                if len(actions) == 5:
+                    break
         
-        return actions[:5]  # Return top 5 actions
-    
-    def get_strategy_details(self, strategy_id: str, language: str = 'ar') -> Dict:
-        """Get detailed information about a specific strategy"""
-        
-        strategy = self.marketing_strategies.get(strategy_id)
-        if not strategy:
-            return {'success': False, 'error': 'Strategy not found'}
-        
-        return {
-            'success': True,
-            'strategy_id': strategy_id,
-            'name': strategy['name_ar'] if language == 'ar' else strategy['name_en'],
-            'description': strategy['description_ar'] if language == 'ar' else strategy['description_en'],
-            'focus': strategy['focus'],
-            'tone': strategy['tone'],
-            'cta_style': strategy['cta_style'],
-            'content_types': strategy['content_types'],
-            'best_for': strategy['best_for'],
-            'target_audience': strategy['target_audience'],
-            'platforms': strategy['platforms'],
-            'kpis': strategy['kpis']
-        }
+        return actions  # Return top 5 actions
     
-    def get_all_strategies(self, language: str = 'ar') -> List[Dict]:
-        """Get list of all available strategies"""
+    def _build_strategy_views(self, language: str) -> Dict[str, Any]:
+        """Build the listing and details of every strategy in one language"""
+        localized = 'ar' if language == 'ar' else 'en'
         
-        strategies = []
+        # Read-only views are shared by every caller, nothing is copied per request
+        details = {
+            strategy_id: StrategyResult(True, data=MappingProxyType({
+                'strategy_id': strategy_id,
+                'name': strategy[f'name_{localized}'],
+                'description': strategy[f'description_{localized}'],
+                'focus': strategy['focus'],
+                'tone': strategy['tone'],
+                'cta_style': strategy['cta_style'],
+                'content_types': tuple(strategy['content_types']),
+                'best_for': tuple(strategy['best_for']),
+                'target_audience': tuple(strategy['target_audience']),
+                'platforms': tuple(strategy['platforms']),
+                'kpis': tuple(strategy['kpis'])
+            }))
+            for strategy_id, strategy in self.marketing_strategies.items()
+        }
         
-        for strategy_id, strategy in self.marketing_strategies.items():
-            strategies.append({
+        listing = tuple(
+            MappingProxyType({
                 'strategy_id': strategy_id,
-                'name': strategy['name_ar'] if language == 'ar' else strategy['name_en'],
-                'description': strategy['description_ar'] if language == 'ar' else strategy['description_en'],
+                'name': strategy[f'name_{localized}'],
+                'description': strategy[f'description_{localized}'],
                 'focus': strategy['focus'],
-                'best_for': strategy['best_for'],
-                'platforms': strategy['platforms']
+                'best_for': tuple(strategy['best_for']),
+                'platforms': tuple(strategy['platforms'])
             })
+            for strategy_id, strategy in self.marketing_strategies.items()
+        )
+        
+        return {'details': details, 'listing': listing}
+    
+    def _get_strategy_views(self, language: str) -> Dict[str, Any]:
+        """Get the per-language strategy views, built on first use"""
+        localized = 'ar' if language == 'ar' else 'en'
+        views = self._strategy_views.get(localized)
+        if views is None:
+            views = self._strategy_views[localized] = self._build_strategy_views(localized)
+        return views
+    
+    def get_strategy_details(self, strategy_id: str, language: str = 'ar') -> StrategyResult:
+        """Get detailed information about a specific strategy, read-only"""
+        
+        return self._get_strategy_views(language)['details'].get(strategy_id, _STRATEGY_NOT_FOUND)
+    
+    def get_all_strategies(self, language: str = 'ar') -> Tuple[Mapping[str, Any], ...]:
+        """Get list of all available strategies, read-only"""
         
-        return strategies
+        return self._get_strategy_views(language)['listing']
 
 
 # Global instance
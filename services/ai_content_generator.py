@@ -1,16 +1,24 @@
+import re
+import asyncio
+import copy
+import hashlib
+import threading
 import google.generativeai as genai
 import requests
 import json
 import os
 import logging
-from typing import Dict, List, Optional, Any
+from types import MappingProxyType
+from typing import Dict, List, Optional, Any, Tuple, Mapping
 from datetime import datetime
+from collections import Counter
+from cachetools import TTLCache
 import base64
 from io import BytesIO
 from PIL import Image
 import subprocess
 import tempfile
-import uuid
+import secrets
 from src.models.content import Content
 from src.models.task import Task
 from src.services.credit_manager import credit_manager
@@ -18,6 +26,197 @@ from src.services.external_api_integration import api_integration
 
 logger = logging.getLogger(__name__)
 
+# Maximum content generations in flight at once for a batch
+GEMINI_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', 8))
+
+# Generated content per normalized task, and reusable text templates per task
+# structure with the business specific fields replaced by slots
+_CONTENT_CACHE = TTLCache(maxsize=2048, ttl=3600)
+_CONTENT_TEMPLATE_CACHE = TTLCache(maxsize=2048, ttl=3600)
+_CONTENT_CACHE_LOCK = threading.Lock()
+
+# Task fields substituted into a cached text template
+_SLOT_FIELDS = ('product_service', 'target_audience', 'business_type')
+
+def _content_cache_key(fields: Dict[str, Any]) -> str:
+    """Hash normalized task fields into a cache key"""
+    normalized = {
+        name: value.strip().casefold() if isinstance(value, str) else value
+        for name, value in fields.items()
+    }
+    return hashlib.blake2b(json.dumps(normalized, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+def _to_text_template(text: str, fields: Dict[str, str]) -> Optional[str]:
+    """Replace the business specific values in generated text with slots
+    
+    Returns None unless the product appears in the text, as the text is then
+    too loosely tied to the task to be reused for another product.
+    """
+    # Longest values first, so a value contained in another one isn't split
+    for name in sorted(_SLOT_FIELDS, key=lambda name: len(fields[name]), reverse=True):
+        if fields[name]:
+            text = text.replace(fields[name], f"{{{name.upper()}}}")
+    return text if '{PRODUCT_SERVICE}' in text else None
+
+def _from_text_template(template: str, fields: Dict[str, str]) -> str:
+    """Fill the slots of a text template with the task's values"""
+    for name in _SLOT_FIELDS:
+        template = template.replace(f"{{{name.upper()}}}", fields[name])
+    return template
+
+def _keyword_scanner(keywords: Tuple[str, ...]) -> 're.Pattern[str]':
+    """Compile keywords into one pattern that finds them anywhere, overlapping or not"""
+    alternation = '|'.join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True))
+    return re.compile(f"(?=({alternation}))")
+
+def _count_keywords(scanner: 're.Pattern[str]', text: str) -> int:
+    """Count the distinct keywords of a scanner that occur in text"""
+    return len(set(scanner.findall(text)))
+
+# Keyword scanners for content scoring, each a single pass over the text
+_ENGAGEMENT_SCANNER = _keyword_scanner((
+    'اكتشف', 'تعلم', 'شارك', 'احجز', 'انضم', 'ابدأ',
+    'discover', 'learn', 'share', 'book', 'join', 'start',
+    'new', 'free', 'exclusive', 'limited', 'now', 'today'
+))
+_EMOJI_SCANNER = _keyword_scanner(('😊', '🎉', '💡', '🔥', '❤️', '👍'))
+_POSITIVE_SCANNER = _keyword_scanner((
+    'رائع', 'ممتاز', 'جيد', 'مفيد', 'مذهل', 'أحب',
+    'great', 'excellent', 'good', 'useful', 'amazing', 'love',
+    'best', 'perfect', 'wonderful', 'fantastic', 'awesome'
+))
+_NEGATIVE_SCANNER = _keyword_scanner((
+    'سيء', 'فظيع', 'مشكلة', 'صعب', 'مستحيل',
+    'bad', 'terrible', 'problem', 'difficult', 'impossible',
+    'hate', 'worst', 'awful', 'horrible', 'disappointing'
+))
+
+# Marketing Strategies Database
+_MARKETING_STRATEGIES: Mapping[str, Mapping[str, Any]] = MappingProxyType({
+    'content_marketing': {
+        'focus': 'valuable_content',
+        'tone': 'educational_helpful',
+        'cta_style': 'soft_educational',
+        'content_types': ['blog_posts', 'tutorials', 'guides', 'infographics']
+    },
+    'social_media_marketing': {
+        'focus': 'engagement_community',
+        'tone': 'conversational_friendly',
+        'cta_style': 'interactive_engaging',
+        'content_types': ['posts', 'stories', 'reels', 'polls']
+    },
+    'influencer_marketing': {
+        'focus': 'authenticity_trust',
+        'tone': 'personal_relatable',
+        'cta_style': 'recommendation_based',
+        'content_types': ['testimonials', 'reviews', 'collaborations']
+    },
+    'email_marketing': {
+        'focus': 'personalization_value',
+        'tone': 'direct_personal',
+        'cta_style': 'clear_actionable',
+        'content_types': ['newsletters', 'promotions', 'sequences']
+    },
+    'seo_marketing': {
+        'focus': 'search_optimization',
+        'tone': 'informative_authoritative',
+        'cta_style': 'keyword_optimized',
+        'content_types': ['articles', 'landing_pages', 'meta_content']
+    },
+    'paid_advertising': {
+        'focus': 'conversion_roi',
+        'tone': 'persuasive_urgent',
+        'cta_style': 'strong_direct',
+        'content_types': ['ad_copy', 'headlines', 'descriptions']
+    },
+    'viral_marketing': {
+        'focus': 'shareability_emotion',
+        'tone': 'entertaining_memorable',
+        'cta_style': 'share_encouraging',
+        'content_types': ['memes', 'challenges', 'trending_content']
+    },
+    'brand_storytelling': {
+        'focus': 'narrative_emotion',
+        'tone': 'inspiring_authentic',
+        'cta_style': 'journey_based',
+        'content_types': ['stories', 'case_studies', 'testimonials']
+    }
+})
+
+# Language-specific prompts and styles
+_LANGUAGE_STYLES: Mapping[str, Mapping[str, Any]] = MappingProxyType({
+    'ar': {
+        'formal_tone': 'استخدم أسلوباً رسمياً ومهنياً',
+        'casual_tone': 'استخدم أسلوباً ودوداً وقريباً من القارئ',
+        'persuasive_tone': 'استخدم أسلوباً مقنعاً ومؤثراً',
+        'educational_tone': 'استخدم أسلوباً تعليمياً وواضحاً',
+        'emotional_tone': 'استخدم أسلوباً عاطفياً ومؤثراً',
+        'cta_phrases': ['اكتشف المزيد', 'ابدأ الآن', 'احجز مكانك', 'لا تفوت الفرصة', 'انضم إلينا']
+    },
+    'en': {
+        'formal_tone': 'Use a formal and professional tone',
+        'casual_tone': 'Use a friendly and approachable tone',
+        'persuasive_tone': 'Use a persuasive and compelling tone',
+        'educational_tone': 'Use an educational and clear tone',
+        'emotional_tone': 'Use an emotional and touching tone',
+        'cta_phrases': ['Learn More', 'Get Started', 'Book Now', 'Don\'t Miss Out', 'Join Us']
+    },
+    'fr': {
+        'formal_tone': 'Utilisez un ton formel et professionnel',
+        'casual_tone': 'Utilisez un ton amical et accessible',
+        'persuasive_tone': 'Utilisez un ton persuasif et convaincant',
+        'educational_tone': 'Utilisez un ton éducatif et clair',
+        'emotional_tone': 'Utilisez un ton émotionnel et touchant',
+        'cta_phrases': ['En Savoir Plus', 'Commencer', 'Réserver', 'Ne Ratez Pas', 'Rejoignez-Nous']
+    },
+    'es': {
+        'formal_tone': 'Usa un tono formal y profesional',
+        'casual_tone': 'Usa un tono amigable y cercano',
+        'persuasive_tone': 'Usa un tono persuasivo y convincente',
+        'educational_tone': 'Usa un tono educativo y claro',
+        'emotional_tone': 'Usa un tono emocional y conmovedor',
+        'cta_phrases': ['Saber Más', 'Empezar', 'Reservar', 'No Te Pierdas', 'Únete']
+    },
+    'de': {
+        'formal_tone': 'Verwenden Sie einen formellen und professionellen Ton',
+        'casual_tone': 'Verwenden Sie einen freundlichen und zugänglichen Ton',
+        'persuasive_tone': 'Verwenden Sie einen überzeugenden Ton',
+        'educational_tone': 'Verwenden Sie einen lehrreichen und klaren Ton',
+        'emotional_tone': 'Verwenden Sie einen emotionalen und berührenden Ton',
+        'cta_phrases': ['Mehr Erfahren', 'Jetzt Starten', 'Buchen', 'Verpassen Sie Nicht', 'Mitmachen']
+    }
+})
+
+# Maximum post length per platform
+_PLATFORM_LIMITS: Mapping[str, int] = MappingProxyType({
+    'twitter': 280,
+    'instagram': 2200,
+    'facebook': 63206,
+    'linkedin': 3000,
+    'tiktok': 150,
+    'youtube': 5000
+})
+
+# Call to action appended to content truncated for a platform
+_PLATFORM_CTAS: Mapping[str, Mapping[str, str]] = MappingProxyType({
+    'ar': MappingProxyType({
+        'twitter': 'تابعنا للمزيد',
+        'instagram': 'اكتشف المزيد في البايو',
+        'facebook': 'شاركنا رأيك في التعليقات',
+        'linkedin': 'تواصل معنا للمزيد من التفاصيل',
+        'tiktok': 'تابع للمزيد',
+        'youtube': 'اشترك في القناة'
+    }),
+    'en': MappingProxyType({
+        'twitter': 'Follow for more',
+        'instagram': 'Link in bio for more',
+        'facebook': 'Share your thoughts in comments',
+        'linkedin': 'Connect for more details',
+        'tiktok': 'Follow for more',
+        'youtube': 'Subscribe to our channel'
+    })
+})
+
 class AIContentGenerator:
     """Advanced AI Content Generator with Google Gemini API integration"""
     
@@ -31,101 +230,18 @@ class AIContentGenerator:
         self.hf_api_key = os.getenv('HUGGINGFACE_API_KEY', '')
         self.hf_api_url = 'https://api-inference.huggingface.co/models'
         
-        # Marketing Strategies Database
-        self.marketing_strategies = {
-            'content_marketing': {
-                'focus': 'valuable_content',
-                'tone': 'educational_helpful',
-                'cta_style': 'soft_educational',
-                'content_types': ['blog_posts', 'tutorials', 'guides', 'infographics']
-            },
-            'social_media_marketing': {
-                'focus': 'engagement_community',
-                'tone': 'conversational_friendly',
-                'cta_style': 'interactive_engaging',
-                'content_types': ['posts', 'stories', 'reels', 'polls']
-            },
-            'influencer_marketing': {
-                'focus': 'authenticity_trust',
-                'tone': 'personal_relatable',
-                'cta_style': 'recommendation_based',
-                'content_types': ['testimonials', 'reviews', 'collaborations']
-            },
-            'email_marketing': {
-                'focus': 'personalization_value',
-                'tone': 'direct_personal',
-                'cta_style': 'clear_actionable',
-                'content_types': ['newsletters', 'promotions', 'sequences']
-            },
-            'seo_marketing': {
-                'focus': 'search_optimization',
-                'tone': 'informative_authoritative',
-                'cta_style': 'keyword_optimized',
-                'content_types': ['articles', 'landing_pages', 'meta_content']
-            },
-            'paid_advertising': {
-                'focus': 'conversion_roi',
-                'tone': 'persuasive_urgent',
-                'cta_style': 'strong_direct',
-                'content_types': ['ad_copy', 'headlines', 'descriptions']
-            },
-            'viral_marketing': {
-                'focus': 'shareability_emotion',
-                'tone': 'entertaining_memorable',
-                'cta_style': 'share_encouraging',
-                'content_types': ['memes', 'challenges', 'trending_content']
-            },
-            'brand_storytelling': {
-                'focus': 'narrative_emotion',
-                'tone': 'inspiring_authentic',
-                'cta_style': 'journey_based',
-                'content_types': ['stories', 'case_studies', 'testimonials']
-            }
-        }
+        # Generated images are saved here, created once at startup
+        self._image_dir = os.path.abspath('src/static/generated_images')
+        os.makedirs(self._image_dir, exist_ok=True)
         
-        # Language-specific prompts and styles
-        self.language_styles = {
-            'ar': {
-                'formal_tone': 'استخدم أسلوباً رسمياً ومهنياً',
-                'casual_tone': 'استخدم أسلوباً ودوداً وقريباً من القارئ',
-                'persuasive_tone': 'استخدم أسلوباً مقنعاً ومؤثراً',
-                'educational_tone': 'استخدم أسلوباً تعليمياً وواضحاً',
-                'emotional_tone': 'استخدم أسلوباً عاطفياً ومؤثراً',
-                'cta_phrases': ['اكتشف المزيد', 'ابدأ الآن', 'احجز مكانك', 'لا تفوت الفرصة', 'انضم إلينا']
-            },
-            'en': {
-                'formal_tone': 'Use a formal and professional tone',
-                'casual_tone': 'Use a friendly and approachable tone',
-                'persuasive_tone': 'Use a persuasive and compelling tone',
-                'educational_tone': 'Use an educational and clear tone',
-                'emotional_tone': 'Use an emotional and touching tone',
-                'cta_phrases': ['Learn More', 'Get Started', 'Book Now', 'Don\'t Miss Out', 'Join Us']
-            },
-            'fr': {
-                'formal_tone': 'Utilisez un ton formel et professionnel',
-                'casual_tone': 'Utilisez un ton amical et accessible',
-                'persuasive_tone': 'Utilisez un ton persuasif et convaincant',
-                'educational_tone': 'Utilisez un ton éducatif et clair',
-                'emotional_tone': 'Utilisez un ton émotionnel et touchant',
-                'cta_phrases': ['En Savoir Plus', 'Commencer', 'Réserver', 'Ne Ratez Pas', 'Rejoignez-Nous']
-            },
-            'es': {
-                'formal_tone': 'Usa un tono formal y profesional',
-                'casual_tone': 'Usa un tono amigable y cercano',
-                'persuasive_tone': 'Usa un tono persuasivo y convincente',
-                'educational_tone': 'Usa un tono educativo y claro',
-                'emotional_tone': 'Usa un tono emocional y conmovedor',
-                'cta_phrases': ['Saber Más', 'Empezar', 'Reservar', 'No Te Pierdas', 'Únete']
-            },
-            'de': {
-                'formal_tone': 'Verwenden Sie einen formellen und professionellen Ton',
-                'casual_tone': 'Verwenden Sie einen freundlichen und zugänglichen Ton',
-                'persuasive_tone': 'Verwenden Sie einen überzeugenden Ton',
-                'educational_tone': 'Verwenden Sie einen lehrreichen und klaren Ton',
-                'emotional_tone': 'Verwenden Sie einen emotionalen und berührenden Ton',
-                'cta_phrases': ['Mehr Erfahren', 'Jetzt Starten', 'Buchen', 'Verpassen Sie Nicht', 'Mitmachen']
-            }
-        }
+        # Shared read-only marketing strategies database
+        self.marketing_strategies = _MARKETING_STRATEGIES
+        
+        # Content prompt skeletons per (language, strategy focus, tone)
+        self._prompt_template_cache: Dict[Tuple[str, str, str], str] = {}
+        
+        # Shared read-only language-specific prompts and styles
+        self.language_styles = _LANGUAGE_STYLES
     
     async def generate_marketing_content(self, task_data: Dict) -> Dict:
         """Generate marketing content based on strategy and requirements"""
@@ -139,6 +255,28 @@ class AIContentGenerator:
             product_service = task_data.get('product_service', '')
             tone = task_data.get('tone', 'casual_tone')
             platform = task_data.get('platform', 'facebook')
+            include_image = task_data.get('include_image', True)
+            
+            slot_values = {
+                'product_service': product_service,
+                'target_audience': target_audience,
+                'business_type': business_type
+            }
+            structure = {
+                'strategy': strategy,
+                'content_type': content_type,
+                'language': language,
+                'tone': tone,
+                'platform': platform
+            }
+            cache_key = _content_cache_key({**structure, **slot_values, 'include_image': include_image})
+            template_key = _content_cache_key(structure)
+            
+            with _CONTENT_CACHE_LOCK:
+                cached = _CONTENT_CACHE.get(cache_key)
+                text_template = _CONTENT_TEMPLATE_CACHE.get(template_key)
+            if cached is not None:
+                return copy.deepcopy(cached)
             
             # Get strategy configuration
             strategy_config = self.marketing_strategies.get(strategy, self.marketing_strategies['content_marketing'])
@@ -150,23 +288,38 @@ class AIContentGenerator:
                 business_type, target_audience, product_service, tone, platform
             )
             
-            # Generate content using Gemini
-            content = await self.generate_text_content(prompt, language)
+            # Text, hashtags and image are independent requests, run them concurrently;
+            # text generated for the same kind of task is reused with this task's values
+            if text_template is None:
+                text_task = asyncio.create_task(self.generate_text_content(prompt, language))
+            hashtags_task = asyncio.create_task(
+                self.generate_hashtags(product_service, target_audience, language, platform)
+            )
+            image_task = None
+            if include_image:
+                # The image prompt is built from the product alone, not the generated text
+                image_task = asyncio.create_task(self.generate_content_image('', product_service, language))
+            
+            if text_template is None:
+                content = await text_task
+            else:
+                content = _from_text_template(text_template, slot_values)
             
             if not content:
+                hashtags_task.cancel()
+                if image_task:
+                    image_task.cancel()
                 return {'success': False, 'error': 'Failed to generate content'}
             
-            # Generate hashtags
-            hashtags = await self.generate_hashtags(product_service, target_audience, language, platform)
+            hashtags = await hashtags_task
             
-            # Generate image if needed
             image_url = None
-            if task_data.get('include_image', True):
-                image_result = await self.generate_content_image(content, product_service, language)
+            if image_task:
+                image_result = await image_task
                 if image_result['success']:
                     image_url = image_result['image_url']
             
-            return {
+            result = {
                 'success': True,
                 'content': {
                     'text': content,
@@ -179,31 +332,65 @@ class AIContentGenerator:
                 }
             }
             
+            with _CONTENT_CACHE_LOCK:
+                _CONTENT_CACHE[cache_key] = copy.deepcopy(result)
+                if text_template is None:
+                    new_template = _to_text_template(content, slot_values)
+                    if new_template is not None:
+                        _CONTENT_TEMPLATE_CACHE[template_key] = new_template
+            
+            return result
+            
         except Exception as e:
             logger.error(f"Error generating marketing content: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    async def generate_marketing_content_batch(self, tasks_data: List[Dict]) -> List[Dict]:
+        """Generate marketing content for many tasks concurrently, results in task order"""
+        
+        # Bound in-flight generations to respect the provider's rate limits
+        semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+        
+        async def generate(task_data: Dict) -> Dict:
+            async with semaphore:
+                return await self.generate_marketing_content(task_data)
+        
+        return await asyncio.gather(*(generate(task_data) for task_data in tasks_data))
+    
     def build_content_prompt(self, strategy_config, language_config, content_type, language,
                            business_type, target_audience, product_service, tone, platform):
         """Build comprehensive content generation prompt"""
         
+        template = self._get_prompt_template(strategy_config, language_config, language, tone)
+        return template.format(
+            content_type=content_type,
+            business_type=business_type,
+            product_service=product_service,
+            target_audience=target_audience,
+            platform=platform
+        )
+    
+    def _get_prompt_template(self, strategy_config, language_config, language, tone) -> str:
+        """Get the content prompt skeleton for a strategy and tone, built once
+        
+        Instructions come first and request details last, so prompts for the
+        same strategy share a stable prefix the provider can cache.
+        """
+        key = (language, strategy_config['focus'], tone)
+        template = self._prompt_template_cache.get(key)
+        if template is not None:
+            return template
+        
         if language == 'ar':
-            base_prompt = f"""أنت خبير تسويق محترف متخصص في استراتيجية {strategy_config['focus']}.
-
-مهمتك: إنشاء {content_type} تسويقي احترافي
+            template = f"""أنت خبير تسويق محترف متخصص في استراتيجية {strategy_config['focus']}.
 
-معلومات المشروع:
-- نوع العمل: {business_type}
-- المنتج/الخدمة: {product_service}
-- الجمهور المستهدف: {target_audience}
-- المنصة: {platform}
-- الاستراتيجية: {strategy_config['focus']}
+مهمتك: إنشاء محتوى تسويقي احترافي
 
 متطلبات المحتوى:
 - {language_config[tone]}
 - ركز على {strategy_config['focus']}
 - استخدم أسلوب {strategy_config['cta_style']}
-- اجعل المحتوى مناسب لـ {platform}
+- اجعل المحتوى مناسباً للمنصة المحددة
 
 إرشادات إضافية:
 - استخدم كلمات مفتاحية قوية
@@ -211,25 +398,26 @@ class AIContentGenerator:
 - أضف دعوة واضحة للعمل
 - تأكد من أن المحتوى يحفز التفاعل
 
+معلومات المشروع:
+- الاستراتيجية: {strategy_config['focus']}
+- نوع المحتوى: {{content_type}}
+- نوع العمل: {{business_type}}
+- المنتج/الخدمة: {{product_service}}
+- الجمهور المستهدف: {{target_audience}}
+- المنصة: {{platform}}
+
 اكتب المحتوى الآن:"""
 
         else:  # English
-            base_prompt = f"""You are a professional marketing expert specializing in {strategy_config['focus']} strategy.
-
-Task: Create professional {content_type} marketing content
+            template = f"""You are a professional marketing expert specializing in {strategy_config['focus']} strategy.
 
-Project Information:
-- Business Type: {business_type}
-- Product/Service: {product_service}
-- Target Audience: {target_audience}
-- Platform: {platform}
-- Strategy: {strategy_config['focus']}
+Task: Create professional marketing content
 
 Content Requirements:
 - {language_config[tone]}
 - Focus on {strategy_config['focus']}
 - Use {strategy_config['cta_style']} approach
-- Make content suitable for {platform}
+- Make content suitable for the specified platform
 
 Additional Guidelines:
 - Use powerful keywords
@@ -237,9 +425,18 @@ Additional Guidelines:
 - Include clear call-to-action
 - Ensure content encourages interaction
 
+Project Information:
+- Strategy: {strategy_config['focus']}
+- Content Type: {{content_type}}
+- Business Type: {{business_type}}
+- Product/Service: {{product_service}}
+- Target Audience: {{target_audience}}
+- Platform: {{platform}}
+
 Write the content now:"""
         
-        return base_prompt
+        self._prompt_template_cache[key] = template
+        return template
     
     async def generate_text_content(self, prompt: str, language: str = 'ar') -> Optional[str]:
         """Generate text content using Google Gemini"""
@@ -316,6 +513,16 @@ Write only hashtags, one per line:"""
             logger.error(f"Error generating hashtags: {str(e)}")
             return ['#marketing', '#business', '#success']
     
+    def _save_png(self, image_b64: str) -> Tuple[str, str]:
+        """Decode a base64 image and save it, returning its path and URL"""
+        image_filename = f"generated_image_{secrets.token_hex(16)}.png"
+        image_path = os.path.join(self._image_dir, image_filename)
+        
+        with open(image_path, 'wb') as f:
+            f.write(base64.b64decode(image_b64))
+        
+        return image_path, f"/static/generated_images/{image_filename}"
+    
     async def generate_content_image(self, content: str, product_service: str, language: str = 'ar') -> Dict:
         """Generate image for content using Google Gemini or Hugging Face"""
         
@@ -339,20 +546,12 @@ suitable for social media, minimal design"""
             )
             
             if result['success']:
-                # Save image
-                image_data = base64.b64decode(result['data']['content'])
-                image_filename = f"generated_image_{uuid.uuid4().hex}.png"
-                image_path = os.path.join('src/static/generated_images', image_filename)
-                
-                # Create directory if it doesn't exist
-                os.makedirs(os.path.dirname(image_path), exist_ok=True)
-                
-                with open(image_path, 'wb') as f:
-                    f.write(image_data)
+                # Decode and write off the event loop, images can be megabytes
+                image_path, image_url = await asyncio.to_thread(self._save_png, result['data']['content'])
                 
                 return {
                     'success': True,
-                    'image_url': f"/static/generated_images/{image_filename}",
+                    'image_url': image_url,
                     'image_path': image_path
                 }
             
@@ -375,20 +574,12 @@ suitable for social media, minimal design"""
             )
             
             if result['success']:
-                # Save image
-                image_data = base64.b64decode(result['data']['content'])
-                image_filename = f"generated_image_{uuid.uuid4().hex}.png"
-                image_path = os.path.join('src/static/generated_images', image_filename)
-                
-                # Create directory if it doesn't exist
-                os.makedirs(os.path.dirname(image_path), exist_ok=True)
-                
-                with open(image_path, 'wb') as f:
-                    f.write(image_data)
+                # Decode and write off the event loop, images can be megabytes
+                image_path, image_url = await asyncio.to_thread(self._save_png, result['data']['content'])
                 
                 return {
                     'success': True,
-                    'image_url': f"/static/generated_images/{image_filename}",
+                    'image_url': image_url,
                     'image_path': image_path
                 }
             
@@ -416,54 +607,18 @@ suitable for social media, minimal design"""
     def optimize_content_for_platform(self, content: str, platform: str, language: str = 'ar') -> str:
         """Optimize content for specific platform"""
         
-        platform_limits = {
-            'twitter': 280,
-            'instagram': 2200,
-            'facebook': 63206,
-            'linkedin': 3000,
-            'tiktok': 150,
-            'youtube': 5000
-        }
+        max_length = _PLATFORM_LIMITS.get(platform, 1000)
         
-        max_length = platform_limits.get(platform, 1000)
+        if len(content) <= max_length:
+            return content
         
-        if len(content) > max_length:
-            # Truncate content while preserving meaning
-            sentences = content.split('.')
-            optimized_content = ""
-            
-            for sentence in sentences:
-                if len(optimized_content + sentence + '.') <= max_length - 50:  # Leave space for CTA
-                    optimized_content += sentence + '.'
-                else:
-                    break
-            
-            # Add platform-specific CTA
-            if language == 'ar':
-                cta_map = {
-                    'twitter': 'تابعنا للمزيد',
-                    'instagram': 'اكتشف المزيد في البايو',
-                    'facebook': 'شاركنا رأيك في التعليقات',
-                    'linkedin': 'تواصل معنا للمزيد من التفاصيل',
-                    'tiktok': 'تابع للمزيد',
-                    'youtube': 'اشترك في القناة'
-                }
-            else:
-                cta_map = {
-                    'twitter': 'Follow for more',
-                    'instagram': 'Link in bio for more',
-                    'facebook': 'Share your thoughts in comments',
-                    'linkedin': 'Connect for more details',
-                    'tiktok': 'Follow for more',
-                    'youtube': 'Subscribe to our channel'
-                }
-            
-            cta = cta_map.get(platform, 'Learn more')
-            optimized_content += f"\n\n{cta}"
-            
-            return optimized_content
+        # Keep the whole sentences that fit, leaving space for the CTA
+        optimized_content = content[:content.rfind('.', 0, max_length - 50) + 1]
         
-        return content
+        # Add platform-specific CTA
+        cta_map = _PLATFORM_CTAS['ar'] if language == 'ar' else _PLATFORM_CTAS['en']
+        cta = cta_map.get(platform, 'Learn more')
+        return f"{optimized_content}\n\n{cta}"
     
     def analyze_content_performance(self, content_data: Dict) -> Dict:
         """Analyze content performance metrics"""
@@ -473,11 +628,14 @@ suitable for social media, minimal design"""
             text = content_data.get('text', '')
             hashtags = content_data.get('hashtags', [])
             
+            # Tokenize once and share the result between all scorers
+            features = self._featurize(text)
+            
             analysis = {
-                'readability_score': self.calculate_readability(text),
-                'engagement_potential': self.predict_engagement(text, hashtags),
-                'seo_score': self.calculate_seo_score(text, hashtags),
-                'sentiment_score': self.analyze_sentiment(text),
+                'readability_score': self.calculate_readability(text, features),
+                'engagement_potential': self.predict_engagement(text, hashtags, features),
+                'seo_score': self.calculate_seo_score(text, hashtags, features),
+                'sentiment_score': self.analyze_sentiment(text, features),
                 'recommendations': []
             }
             
@@ -497,12 +655,25 @@ suitable for social media, minimal design"""
             logger.error(f"Error analyzing content performance: {str(e)}")
             return {'error': str(e)}
     
-    def calculate_readability(self, text: str) -> float:
+    def _featurize(self, text: str) -> Dict[str, Any]:
+        """Lowercase and tokenize text once for the content scorers"""
+        lower = text.lower()
+        words = lower.split()
+        return {
+            'lower': lower,
+            'words': words,
+            'word_count': len(words),
+            'sentence_count': sum(1 for sentence in text.split('.') if sentence.strip()),
+            'word_freq': Counter(words)
+        }
+    
+    def calculate_readability(self, text: str, features: Optional[Dict[str, Any]] = None) -> float:
         """Calculate readability score (simplified)"""
         
         try:
-            words = len(text.split())
-            sentences = len([s for s in text.split('.') if s.strip()])
+            features = features or self._featurize(text)
+            words = features['word_count']
+            sentences = features['sentence_count']
             
             if sentences == 0:
                 return 0
@@ -516,23 +687,16 @@ suitable for social media, minimal design"""
         except:
             return 50  # Default score
     
-    def predict_engagement(self, text: str, hashtags: List[str]) -> float:
+    def predict_engagement(self, text: str, hashtags: List[str],
+                           features: Optional[Dict[str, Any]] = None) -> float:
         """Predict engagement potential (simplified)"""
         
         try:
-            engagement_keywords = [
-                'اكتشف', 'تعلم', 'شارك', 'احجز', 'انضم', 'ابدأ',
-                'discover', 'learn', 'share', 'book', 'join', 'start',
-                'new', 'free', 'exclusive', 'limited', 'now', 'today'
-            ]
-            
+            features = features or self._featurize(text)
             score = 50  # Base score
             
             # Check for engagement keywords
-            text_lower = text.lower()
-            for keyword in engagement_keywords:
-                if keyword in text_lower:
-                    score += 5
+            score += 5 * _count_keywords(_ENGAGEMENT_SCANNER, features['lower'])
             
             # Check hashtag count
             if len(hashtags) >= 5:
@@ -543,24 +707,23 @@ suitable for social media, minimal design"""
                 score += 15
             
             # Check for emojis (simplified check)
-            emoji_indicators = ['😊', '🎉', '💡', '🔥', '❤️', '👍']
-            for emoji in emoji_indicators:
-                if emoji in text:
-                    score += 5
+            score += 5 * _count_keywords(_EMOJI_SCANNER, text)
             
             return min(100, score)
             
         except:
             return 50  # Default score
     
-    def calculate_seo_score(self, text: str, hashtags: List[str]) -> float:
+    def calculate_seo_score(self, text: str, hashtags: List[str],
+                            features: Optional[Dict[str, Any]] = None) -> float:
         """Calculate SEO score (simplified)"""
         
         try:
+            features = features or self._featurize(text)
             score = 50  # Base score
             
             # Check text length
-            word_count = len(text.split())
+            word_count = features['word_count']
             if 50 <= word_count <= 300:
                 score += 20
             
@@ -569,14 +732,11 @@ suitable for social media, minimal design"""
                 score += 15
             
             # Check for keywords repetition (avoid over-optimization)
-            words = text.lower().split()
-            word_freq = {}
-            for word in words:
-                word_freq[word] = word_freq.get(word, 0) + 1
+            word_freq = features['word_freq']
             
             # Penalize over-repetition
-            max_freq = max(word_freq.values()) if word_freq else 0
-            if max_freq > len(words) * 0.1:  # More than 10% repetition
+            max_freq = word_freq.most_common(1)[0][1] if word_freq else 0
+            if max_freq > features['word_count'] * 0.1:  # More than 10% repetition
                 score -= 10
             
             return min(100, max(0, score))
@@ -584,27 +744,15 @@ suitable for social media, minimal design"""
         except:
             return 50  # Default score
     
-    def analyze_sentiment(self, text: str) -> float:
+    def analyze_sentiment(self, text: str, features: Optional[Dict[str, Any]] = None) -> float:
         """Analyze sentiment (simplified)"""
         
         try:
-            positive_words = [
-                'رائع', 'ممتاز', 'جيد', 'مفيد', 'مذهل', 'أحب',
-                'great', 'excellent', 'good', 'useful', 'amazing', 'love',
-                'best', 'perfect', 'wonderful', 'fantastic', 'awesome'
-            ]
-            
-            negative_words = [
-                'سيء', 'فظيع', 'مشكلة', 'صعب', 'مستحيل',
-                'bad', 'terrible', 'problem', 'difficult', 'impossible',
-                'hate', 'worst', 'awful', 'horrible', 'disappointing'
-            ]
-            
-            text_lower = text.lower()
-            positive_count = sum(1 for word in positive_words if word in text_lower)
-            negative_count = sum(1 for word in negative_words if word in text_lower)
-            
-            total_words = len(text.split())
+            features = features or self._featurize(text)
+            positive_count = _count_keywords(_POSITIVE_SCANNER, features['lower'])
+            negative_count = _count_keywords(_NEGATIVE_SCANNER, features['lower'])
+            
+            total_words = features['word_count']
             
             if total_words == 0:
                 return 0.5  # Neutral
@@ -142,14 +142,20 @@ class AnalyticsEngine:
             logger.error(f"Error generating comprehensive report: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    def parse_date_value(self, value) -> datetime:
+        """Parse a date range bound given as epoch seconds or an ISO string"""
+        if isinstance(value, (int, float)):
+            return datetime.utcfromtimestamp(value)
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    
     def get_user_analytics_data(self, user_id: int, date_range: Dict) -> Dict:
         """Get user analytics data from database"""
         try:
             # In a real implementation, this would query the database
             # For now, we'll simulate realistic data
             
-            start_date = datetime.fromisoformat(date_range['start_date'].replace('Z', '+00:00'))
-            end_date = datetime.fromisoformat(date_range['end_date'].replace('Z', '+00:00'))
+            start_date = self.parse_date_value(date_range['start_date'])
+            end_date = self.parse_date_value(date_range['end_date'])
             days_count = (end_date - start_date).days
             
             # Simulate content data
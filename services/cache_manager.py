@@ -15,6 +15,8 @@ import logging
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List, Union
 from pathlib import Path
+from functools import wraps
+from flask import request, jsonify, make_response
 import base64
 
 try:
@@ -437,3 +439,48 @@ cache_manager = CacheManager(
     default_ttl=int(os.getenv('CACHE_TTL', '3600'))
 )
 
+
+
+
+def cached_response(ttl: int, namespace: str = 'route', stale_ttl: Optional[int] = None):
+    """
+    Decorator for caching successful JSON responses of Flask routes
+    
+    Args:
+        ttl: Seconds a cached response is served as fresh
+        namespace: Cache namespace for the route's responses
+        stale_ttl: Seconds a response is kept to be served as a fallback
+            when the route fails (defaults to 10x ttl)
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            params = {'args': sorted(request.args.items())}
+            cached = cache_manager.get_cached_api_response(namespace, request.path, params)
+            now = time.time()
+            
+            if cached and cached['stale_at'] > now:
+                return jsonify(cached['body'])
+            
+            try:
+                response = make_response(f(*args, **kwargs))
+            except Exception as e:
+                if not cached:
+                    raise
+                logger.warning(f"Serving stale response for {request.path}: {e}")
+                return jsonify(cached['body'])
+            
+            if response.status_code == 200:
+                cache_manager.cache_api_response(namespace, request.path, params, {
+                    'body': response.get_json(),
+                    'generated_at': now,
+                    'stale_at': now + ttl
+                }, stale_ttl or ttl * 10)
+            elif cached and response.status_code >= 500:
+                logger.warning(f"Serving stale response for {request.path} after status {response.status_code}")
+                return jsonify(cached['body'])
+            
+            return response
+        
+        return decorated_function
+    return decorator
@@ -0,0 +1,478 @@
+"""
+Celery Tasks
+مهام Celery
+
+This module defines the Celery application and the background tasks that
+publish content to social media platforms outside the request thread.
+"""
+
+import os
+import json
+import asyncio
+import uuid
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import msgspec
+from celery import Celery, chord
+from sqlalchemy import insert, update
+
+from src.models.base import db
+from src.models.task import Task
+from src.models.content import Content
+from src.services.social_media_publisher import social_media_publisher
+from src.services.free_ai_generator import free_ai_generator
+from src.services.credit_manager import credit_manager
+from src.services.cache_manager import cache_manager
+
+logger = logging.getLogger(__name__)
+
+# Furthest ahead a post can be scheduled. The Redis broker redelivers an
+# unacknowledged eta job once the visibility timeout passes, so the timeout
+# has to outlast the schedule horizon.
+MAX_SCHEDULE_AHEAD = timedelta(days=int(os.getenv('MAX_SCHEDULE_DAYS', '7')))
+
+# Celery application
+celery_app = Celery(
+    'marketing_automation',
+    broker=os.getenv('CELERY_BROKER_URL', os.getenv('REDIS_URL', 'redis://localhost:6379/0')),
+    backend=os.getenv('CELERY_RESULT_BACKEND', os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+)
+
+celery_app.conf.update(
+    task_serializer='json',
+    result_serializer='json',
+    accept_content=['json'],
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+    result_expires=86400,
+    timezone='UTC',
+    enable_utc=True,
+    broker_transport_options={
+        'visibility_timeout': int(MAX_SCHEDULE_AHEAD.total_seconds()) + 3600
+    },
+    # Keep heavy LLM work from starving lightweight platform posts
+    task_routes={
+        'src.services.celery_tasks.publish_task': {'queue': 'publishing_queue'},
+        'src.services.celery_tasks.generate_and_publish_task': {'queue': 'generation_queue'},
+        'src.services.celery_tasks.generate_content_task': {'queue': 'generation_queue'},
+        'src.services.celery_tasks.publish_campaign_task': {'queue': 'publishing_queue'}
+    }
+)
+
+# Popular posts are counted in Redis by the web workers, without it the
+# refresher would have nothing to read
+if cache_manager.cache_type == 'redis':
+    celery_app.conf.beat_schedule = {
+        'refresh-popular-post-analytics': {
+            'task': 'src.services.celery_tasks.refresh_popular_analytics_task',
+            'schedule': 60.0
+        }
+    }
+
+_flask_app = None
+
+def get_flask_app():
+    """Get the Flask application used for database access in workers"""
+    global _flask_app
+    if _flask_app is None:
+        from src.main import create_app
+        _flask_app = create_app()
+    return _flask_app
+
+@contextmanager
+def write_pipeline():
+    """Send the enclosed statements in one network flight when the driver supports it
+
+    psycopg 3 connections expose pipeline mode; other drivers run the
+    statements one by one as usual.
+    """
+    dbapi_connection = db.session.connection().connection.driver_connection
+    if hasattr(dbapi_connection, 'pipeline'):
+        with dbapi_connection.pipeline():
+            yield
+    else:
+        yield
+
+def content_title(content: Dict, default: str) -> str:
+    """Title a record after the first line of its post text"""
+    text = (content.get('text') or '').strip()
+    return text.split('\n', 1)[0][:100] or default
+
+def build_content_rows(user_id: str, task_id: str, content_type: str,
+                       content_data: Dict, publish_result: Dict) -> List[Dict]:
+    """Build one content row per successful post
+    
+    The platform and post id are kept in the MessagePack metadata next to
+    the published payload, the same layout Content.set_metadata writes.
+    """
+    title = content_title(content_data, 'Social media post')
+    hashtags = json.dumps(content_data.get('hashtags', []))
+    
+    return [
+        {
+            'user_id': user_id,
+            'task_id': task_id,
+            'title': title,
+            'content_type': content_type,
+            'text_content': content_data.get('text', ''),
+            'content_metadata': msgspec.msgpack.encode({
+                'platform': platform,
+                'post_id': result.get('post_id'),
+                'content': content_data
+            }),
+            'platforms_used': json.dumps([platform]),
+            'hashtags': hashtags,
+            'status': 'published'
+        }
+        for platform, result in publish_result.get('results', {}).items()
+        if result['success']
+    ]
+
+def save_published_content(user_id: str, task_id: str, content_type: str,
+                           content_data: Dict, publish_result: Dict) -> List[str]:
+    """Insert one content record per successful post in a single statement
+
+    The caller is responsible for committing the session.
+    """
+    rows = build_content_rows(user_id, task_id, content_type, content_data, publish_result)
+
+    if not rows:
+        return []
+
+    return db.session.execute(insert(Content).returning(Content.id), rows).scalars().all()
+
+def create_queued_task(user_id: str, task_type: str, title: str, parameters: Dict,
+                       credits_cost: int, status: str = 'pending',
+                       result_data: Dict = None) -> Task:
+    """Persist a task owned by the user before its job is enqueued
+    
+    The Celery id is picked here and stored on the row, so the job can be
+    sent under that id and status lookups can be checked against the owner.
+    """
+    task = Task(
+        user_id=user_id,
+        task_type=task_type,
+        title=title,
+        status=status,
+        credits_cost=credits_cost,
+        celery_task_id=str(uuid.uuid4())
+    )
+    task.set_parameters(parameters)
+    if result_data:
+        task.set_result_data(result_data)
+    task.save()
+    return task
+
+def claim_task(task_id: str) -> bool:
+    """Move a queued task to running, False when it was cancelled or already picked up"""
+    claimed = db.session.execute(
+        update(Task)
+        .where(Task.id == task_id, Task.status.in_(('pending', 'scheduled')))
+        .values(status='running', started_at=datetime.utcnow())
+    ).rowcount
+    db.session.commit()
+    return claimed == 1
+
+def finish_task(task: Task, status: str, result_data: Dict, credits_cost: int) -> None:
+    """Store the outcome of a task, the caller commits"""
+    task.status = status
+    task.completed_at = datetime.utcnow()
+    task.credits_cost = credits_cost
+    task.set_result_data(result_data)
+
+def fail_task(task_id: str, user_id: str, refund: int, error: str) -> None:
+    """Mark a task failed and refund its credits in one transaction"""
+    db.session.rollback()
+    task = Task.get_by_id(task_id)
+    task.mark_failed(error)
+    credit_manager.refund_credits(user_id, refund, commit=False)
+    db.session.commit()
+
+def record_publish_results(user_id: str, refund: int, task: Task, content_type: str,
+                           content_data: Dict, publish_result: Dict) -> None:
+    """Write the credit refund, task record and content records in one transaction"""
+    try:
+        with write_pipeline():
+            credit_manager.refund_credits(user_id, refund, commit=False)
+            db.session.add(task)
+            db.session.flush()
+            save_published_content(user_id, task.id, content_type, content_data, publish_result)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+@celery_app.task(bind=True, acks_late=True)
+def publish_task(self, task_id: str, user_id: str, content: Dict, platforms: List[str],
+                 platform_configs: Dict = None) -> Dict:
+    """Publish content to platforms, refund failed posts and record the results"""
+    with get_flask_app().app_context():
+        if not claim_task(task_id):
+            logger.info("Skipping publish task %s, it is no longer queued", task_id)
+            return {'success': False, 'task_id': task_id, 'error': 'Task is no longer queued'}
+        
+        publish_result = None
+        try:
+            # Make sure no connection is checked out while waiting on the platforms
+            db.session.close()
+            publish_result = social_media_publisher.publish_to_multiple_platforms(
+                content, platforms, platform_configs or {}
+            )
+            
+            task = Task.get_by_id(task_id)
+            finish_task(
+                task,
+                'completed' if publish_result['success'] else 'failed',
+                publish_result,
+                publish_result.get('successful_posts', 0)
+            )
+            
+            # Credits were charged per platform up front, refund the failed posts
+            record_publish_results(
+                user_id,
+                len(platforms) - publish_result['successful_posts'],
+                task,
+                'social_media_post',
+                {
+                    'text': content.get('text', ''),
+                    'hashtags': content.get('hashtags', []),
+                    'image_url': content.get('image_url'),
+                    'video_url': content.get('video_url')
+                },
+                publish_result
+            )
+        except Exception as e:
+            # Posts that went out keep their credit, everything else is refunded
+            successful_posts = publish_result['successful_posts'] if publish_result else 0
+            logger.error("Publish task %s failed: %s", task_id, e)
+            fail_task(task_id, user_id, len(platforms) - successful_posts, str(e))
+            raise
+        
+        return {
+            'success': True,
+            'data': publish_result,
+            'task_id': task.id,
+            'credits_used': publish_result.get('successful_posts', 0),
+            'message': f'Published to {publish_result["successful_posts"]}/{len(platforms)} platforms'
+        }
+
+@celery_app.task(bind=True, acks_late=True)
+def generate_and_publish_task(self, task_id: str, user_id: str, task_data: Dict, platforms: List[str],
+                              platform_configs: Dict = None, generation_cost: int = 2) -> Dict:
+    """Generate content with AI, publish it and record the results"""
+    with get_flask_app().app_context():
+        if not claim_task(task_id):
+            logger.info("Skipping generation task %s, it is no longer queued", task_id)
+            return {'success': False, 'task_id': task_id, 'error': 'Task is no longer queued'}
+        
+        generated_content = None
+        publish_result = None
+        try:
+            generation_result = asyncio.run(
+                free_ai_generator.generate_complete_marketing_content(task_data)
+            )
+            
+            if not generation_result['success']:
+                error = f'Content generation failed: {generation_result["error"]}'
+                fail_task(task_id, user_id, generation_cost + len(platforms), error)
+                return {
+                    'success': False,
+                    'task_id': task_id,
+                    'error': error
+                }
+            
+            generated_content = generation_result['content']
+            
+            # Publish to platforms without holding a database connection
+            db.session.close()
+            publish_result = social_media_publisher.publish_to_multiple_platforms(
+                generated_content, platforms, platform_configs or {}
+            )
+            
+            credits_used = generation_cost + publish_result['successful_posts']
+            
+            task = Task.get_by_id(task_id)
+            finish_task(
+                task,
+                'completed' if publish_result['success'] else 'partial',
+                {
+                    'generated_content': generated_content,
+                    'publish_result': publish_result
+                },
+                credits_used
+            )
+            
+            # Generation is always charged, failed posts are refunded
+            record_publish_results(
+                user_id,
+                len(platforms) - publish_result['successful_posts'],
+                task,
+                'ai_generated_social_media_post',
+                generated_content,
+                publish_result
+            )
+        except Exception as e:
+            # Keep what was already spent on generation and published posts
+            if generated_content is None:
+                refund = generation_cost + len(platforms)
+            else:
+                refund = len(platforms) - (publish_result['successful_posts'] if publish_result else 0)
+            logger.error("Generate and publish task %s failed: %s", task_id, e)
+            fail_task(task_id, user_id, refund, str(e))
+            raise
+        
+        return {
+            'success': True,
+            'data': {
+                'generated_content': generated_content,
+                'publish_result': publish_result,
+                'task_id': task_id,
+                'credits_used': credits_used
+            },
+            'message': f'Generated content and published to {publish_result["successful_posts"]}/{len(platforms)} platforms'
+        }
+
+@celery_app.task(bind=True, acks_late=True)
+def generate_content_task(self, task_data: Dict) -> Dict:
+    """Generate marketing content for one campaign item
+    
+    Failures are returned instead of raised so the chord callback still
+    runs and refunds the item.
+    """
+    try:
+        return asyncio.run(free_ai_generator.generate_complete_marketing_content(task_data))
+    except Exception as e:
+        logger.error("Campaign item generation failed: %s", e)
+        return {'success': False, 'error': str(e)}
+
+@celery_app.task(bind=True, acks_late=True)
+def publish_campaign_task(self, generation_results: List[Dict], task_id: str, user_id: str,
+                          items: List[Dict]) -> Dict:
+    """Publish every generated campaign item and record all results in one transaction"""
+    with get_flask_app().app_context():
+        if not claim_task(task_id):
+            logger.info("Skipping campaign task %s, it is no longer queued", task_id)
+            return {'success': False, 'task_id': task_id, 'error': 'Task is no longer queued'}
+
+        db.session.close()
+
+        reserved = sum(item['generation_cost'] + len(item['platforms']) for item in items)
+        refund = 0
+        credits_used = 0
+        task_rows = []
+        content_rows = []
+        item_results = []
+
+        try:
+            for item, generation_result in zip(items, generation_results):
+                platforms = item['platforms']
+                product_service = item['task_data']['product_service']
+
+                if not generation_result['success']:
+                    refund += item['generation_cost'] + len(platforms)
+                    item_results.append({
+                        'success': False,
+                        'error': f'Content generation failed: {generation_result["error"]}'
+                    })
+                    continue
+
+                generated_content = generation_result['content']
+                publish_result = social_media_publisher.publish_to_multiple_platforms(
+                    generated_content, platforms, item.get('platform_configs') or {}
+                )
+
+                item_credits = item['generation_cost'] + publish_result['successful_posts']
+                credits_used += item_credits
+                refund += len(platforms) - publish_result['successful_posts']
+
+                item_task_id = str(uuid.uuid4())
+                now = datetime.utcnow()
+                task_rows.append({
+                    'id': item_task_id,
+                    'user_id': user_id,
+                    'task_type': 'ai_content_generation_and_publishing',
+                    'title': f'AI content for {product_service}'[:200],
+                    'status': 'completed' if publish_result['success'] else 'partial',
+                    'task_parameters': json.dumps({
+                        'product_service': product_service,
+                        'strategy': item['task_data']['strategy'],
+                        'language': item['task_data']['language'],
+                        'platforms': platforms,
+                        'include_video': item['task_data']['include_video']
+                    }),
+                    'result_data': json.dumps({
+                        'generated_content': generated_content,
+                        'publish_result': publish_result
+                    }),
+                    'credits_cost': item_credits,
+                    'started_at': now,
+                    'completed_at': now
+                })
+                content_rows.extend(build_content_rows(
+                    user_id, item_task_id, 'ai_generated_social_media_post', generated_content, publish_result
+                ))
+                item_results.append({
+                    'success': True,
+                    'task_id': item_task_id,
+                    'publish_result': publish_result,
+                    'credits_used': item_credits
+                })
+
+            summary = {
+                'items': item_results,
+                'credits_used': credits_used,
+                'credits_refunded': refund
+            }
+            campaign_task = Task.get_by_id(task_id)
+            finish_task(campaign_task, 'completed', summary, credits_used)
+
+            with write_pipeline():
+                credit_manager.refund_credits(user_id, refund, commit=False)
+                if task_rows:
+                    db.session.execute(insert(Task), task_rows)
+                if content_rows:
+                    db.session.execute(insert(Content), content_rows)
+            db.session.commit()
+        except Exception as e:
+            # Keep what was already spent on published posts, refund the rest
+            logger.error("Campaign task %s failed: %s", task_id, e)
+            fail_task(task_id, user_id, reserved - credits_used, str(e))
+            raise
+
+        return {
+            'success': True,
+            'task_id': task_id,
+            **summary,
+            'message': f'Processed {len(task_rows)}/{len(items)} campaign items'
+        }
+
+def enqueue_campaign(task: Task, items: List[Dict]):
+    """Generate all campaign items in parallel, then publish them in one batch
+    
+    The publishing callback runs under the Celery id recorded on the task.
+    """
+    return chord(
+        generate_content_task.s(item['task_data']) for item in items
+    )(publish_campaign_task.s(task.id, task.user_id, items).set(task_id=task.celery_task_id))
+
+@celery_app.task(bind=True)
+def refresh_popular_analytics_task(self, limit: int = 50) -> Dict:
+    """Keep the analytics of the most queried posts warm in the cache"""
+    refreshed = 0
+    failed = 0
+
+    for platform, post_id in social_media_publisher.get_popular_analytics_queries(limit):
+        try:
+            result = social_media_publisher.refresh_posting_analytics(platform, post_id)
+            if result.get('success'):
+                refreshed += 1
+            else:
+                failed += 1
+        except Exception as e:
+            logger.warning("Failed to refresh analytics for %s:%s: %s", platform, post_id, e)
+            failed += 1
+
+    return {'refreshed': refreshed, 'failed': failed}
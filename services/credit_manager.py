@@ -1,6 +1,7 @@
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 import logging
+from sqlalchemy import select, update
 from src.models.user import User
 from src.models.credit_transaction import CreditTransaction, TaskCreditCost, CreditPackage
 from src.models.subscription import UserSubscription
@@ -47,20 +48,26 @@ class CreditManager:
         
         return default_costs.get(task_type, 1)
     
+    def get_credits_balance(self, user_id: str) -> Optional[int]:
+        """Get a user's credit balance without loading the user, None if not found"""
+        return db.session.execute(
+            select(User.credits_balance).where(User.id == user_id)
+        ).scalar_one_or_none()
+    
     def check_user_credits(self, user_id: str, required_credits: int) -> Dict[str, Any]:
         """Check if user has enough credits"""
-        user = User.get_by_id(user_id)
-        if not user:
+        credits_balance = self.get_credits_balance(user_id)
+        if credits_balance is None:
             return {'success': False, 'error': 'User not found'}
         
-        has_enough = user.credits_balance >= required_credits
+        has_enough = credits_balance >= required_credits
         
         return {
             'success': True,
             'has_enough_credits': has_enough,
-            'current_balance': user.credits_balance,
+            'current_balance': credits_balance,
             'required_credits': required_credits,
-            'shortage': max(0, required_credits - user.credits_balance)
+            'shortage': max(0, required_credits - credits_balance)
         }
     
     def deduct_credits(self, user_id: str, amount: int, description: str, 
@@ -107,6 +114,68 @@ class CreditManager:
             logger.error(f"Error deducting credits for user {user_id}: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    def charge_credits(self, user_id: str, amount: int,
+                       description: str = 'Credits reserved for a queued task',
+                       category: str = 'task_execution', task_id: str = None) -> Optional[int]:
+        """Atomically deduct credits if the balance covers them
+        
+        The debit is written to the credit ledger in the same transaction.
+        Returns the new balance, or None when the user does not exist
+        or does not have enough credits.
+        """
+        new_balance = db.session.execute(
+            update(User)
+            .where(User.id == user_id, User.credits_balance >= amount)
+            .values(credits_balance=User.credits_balance - amount)
+            .returning(User.credits_balance)
+        ).scalar()
+        if new_balance is None:
+            db.session.rollback()
+            return None
+        
+        db.session.add(CreditTransaction(
+            user_id=user_id,
+            transaction_type='debit',
+            amount=-amount,
+            balance_before=new_balance + amount,
+            balance_after=new_balance,
+            description=description,
+            category=category,
+            related_task_id=task_id
+        ))
+        db.session.commit()
+        return new_balance
+    
+    def refund_credits(self, user_id: str, amount: int, commit: bool = True,
+                       description: str = 'Refund of unused task credits',
+                       category: str = 'task_execution', task_id: str = None) -> None:
+        """Atomically return previously charged credits to the user
+        
+        The refund is written to the credit ledger in the same transaction.
+        """
+        if amount <= 0:
+            return
+        
+        new_balance = db.session.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(credits_balance=User.credits_balance + amount)
+            .returning(User.credits_balance)
+        ).scalar()
+        if new_balance is not None:
+            db.session.add(CreditTransaction(
+                user_id=user_id,
+                transaction_type='refund',
+                amount=amount,
+                balance_before=new_balance - amount,
+                balance_after=new_balance,
+                description=description,
+                category=category,
+                related_task_id=task_id
+            ))
+        if commit:
+            db.session.commit()
+    
     def add_credits(self, user_id: str, amount: int, description: str,
                    category: str = 'purchase', admin_user_id: str = None,
                    metadata: Dict = None) -> Dict[str, Any]:
@@ -45,7 +45,8 @@ class ExternalAPIIntegration:
     """Main class for handling external API integrations"""
     
     def __init__(self):
-        self.session = None
+        # Event loop -> (session, closer generator), see get_session
+        self._sessions = {}
         self.rate_limits = {}  # Track rate limits per service
         
         # Supported services configuration
@@ -101,20 +102,50 @@ class ExternalAPIIntegration:
         }
     
     async def get_session(self) -> aiohttp.ClientSession:
-        """Get or create async HTTP session"""
-        if self.session is None or self.session.closed:
+        """Get or create the async HTTP session of the running event loop
+        
+        A session is bound to the loop that created it, and async Flask views
+        and asyncio.run() each run on a fresh loop. Every loop gets its own
+        session, closed by the loop's async generator shutdown right before
+        the loop itself is closed.
+        """
+        loop = asyncio.get_running_loop()
+        entry = self._sessions.get(loop)
+        if entry is None or entry[0].closed:
+            if entry is not None:
+                await entry[1].aclose()
             timeout = aiohttp.ClientTimeout(total=300)  # 5 minutes timeout
-            self.session = aiohttp.ClientSession(timeout=timeout)
-        return self.session
+            # Keep connections and DNS lookups alive across calls on this loop
+            connector = aiohttp.TCPConnector(limit=64, ttl_dns_cache=300, keepalive_timeout=60)
+            session = aiohttp.ClientSession(timeout=timeout, connector=connector)
+            closer = self._close_on_shutdown(loop, session)
+            await closer.__anext__()
+            entry = self._sessions[loop] = (session, closer)
+        return entry[0]
+    
+    async def _close_on_shutdown(self, loop: asyncio.AbstractEventLoop,
+                                 session: aiohttp.ClientSession):
+        """Keep a session open until its loop finalizes this generator"""
+        try:
+            yield
+        finally:
+            self._sessions.pop(loop, None)
+            await session.close()
     
     async def close_session(self):
-        """Close async HTTP session"""
-        if self.session and not self.session.closed:
-            await self.session.close()
+        """Close the async HTTP session of the running event loop"""
+        entry = self._sessions.get(asyncio.get_running_loop())
+        if entry is not None:
+            await entry[1].aclose()
     
-    def check_rate_limit(self, service_name: str, operation: str) -> bool:
-        """Check if rate limit allows the request"""
+    def check_rate_limit(self, service_name: str, operation: str, api_key: Optional[str] = None) -> bool:
+        """Check if rate limit allows the request
+        
+        Requests made with an explicit API key count against that key's own limit.
+        """
         key = f"{service_name}_{operation}"
+        if api_key:
+            key = f"{key}_{api_key[-8:]}"
         current_time = time.time()
         
         if key not in self.rate_limits:
@@ -156,17 +187,20 @@ class ExternalAPIIntegration:
     
     async def make_api_request(self, service_name: str, operation: str, 
                               payload: Dict, user_id: Optional[int] = None,
-                              **kwargs) -> Dict:
-        """Make async API request with error handling"""
+                              api_key: Optional[str] = None, **kwargs) -> Dict:
+        """Make async API request with error handling
+        
+        api_key overrides the stored credentials of the service for this request.
+        """
         start_time = time.time()
         
         try:
             # Check rate limit
-            if not self.check_rate_limit(service_name, operation):
+            if not self.check_rate_limit(service_name, operation, api_key):
                 raise RateLimitExceeded(f"Rate limit exceeded for {service_name} {operation}")
             
             # Get API credentials
-            credentials = self.get_api_credentials(service_name)
+            credentials = {'api_key': api_key} if api_key else self.get_api_credentials(service_name)
             if not credentials:
                 raise APIIntegrationError(f"No API credentials found for {service_name}")
             
@@ -296,8 +330,8 @@ class ExternalAPIIntegration:
     
     async def generate_text(self, prompt: str, user_id: Optional[int] = None,
                            max_tokens: int = 1000, temperature: float = 0.7,
-                           service: str = "auto") -> Dict:
-        """Generate text using external API"""
+                           service: str = "auto", api_key: Optional[str] = None) -> Dict:
+        """Generate text using external API, optionally with a specific API key"""
         
         # Service selection logic
         if service == "auto":
@@ -329,7 +363,8 @@ class ExternalAPIIntegration:
                     service_name=service_name,
                     operation='text_generation',
                     payload=payload,
-                    user_id=user_id
+                    user_id=user_id,
+                    api_key=api_key
                 )
                 
                 if result['success']:
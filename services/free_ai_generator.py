@@ -9,9 +9,9 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime
 from PIL import Image
 import io
-import requests
 import google.generativeai as genai
 from src.services.external_api_integration import api_integration
+from src.services.social_media_publisher import create_http_session
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +26,8 @@ class FreeAIGenerator:
         
         # Hugging Face Free Models
         self.hf_api_url = 'https://api-inference.huggingface.co/models'
+        # Pooled keep-alive connections reused across model calls
+        self.http = create_http_session()
         self.hf_api_key = os.getenv('HUGGINGFACE_API_KEY', '')
         
         # Free Text Generation Models (Hugging Face)
@@ -144,7 +146,7 @@ class FreeAIGenerator:
                         }
                     }
                     
-                    response = requests.post(
+                    response = self.http.post(
                         f"{self.hf_api_url}/{model}",
                         headers=headers,
                         json=payload,
@@ -242,7 +244,7 @@ class FreeAIGenerator:
                         }
                     }
                     
-                    response = requests.post(
+                    response = self.http.post(
                         f"{self.hf_api_url}/{model}",
                         headers=headers,
                         json=payload,
@@ -342,7 +344,7 @@ class FreeAIGenerator:
                         }
                     }
                     
-                    response = requests.post(
+                    response = self.http.post(
                         f"{self.hf_api_url}/{model}",
                         headers=headers,
                         json=payload,
@@ -10,6 +10,9 @@ logger = logging.getLogger(__name__)
 class IntelligentPromptAnalyzer:
     """Advanced AI-powered prompt analyzer for automatic video specification detection"""
     
+    # Specifications the user may set explicitly when generating a video
+    OVERRIDABLE_SPECS = ('duration', 'orientation', 'style', 'quality', 'platform')
+    
     def __init__(self):
         # Video orientation patterns
         self.orientation_patterns = {
@@ -203,6 +206,71 @@ class IntelligentPromptAnalyzer:
                 'specifications': self._get_default_specs()
             }
     
+    async def analyze_and_optimize(self, prompt: str, overrides: Optional[Dict] = None,
+                                   language: str = 'auto') -> Dict[str, Any]:
+        """Analyze a prompt, apply manual overrides and build the optimized prompt
+        
+        Specifications and the optimized prompt come from a single AI call.
+        Overrides may set duration, orientation, style, quality and platform.
+        """
+        overrides = {
+            key: value for key, value in (overrides or {}).items()
+            if key in self.OVERRIDABLE_SPECS and value
+        }
+        
+        try:
+            if language == 'auto':
+                language = self._detect_language(prompt)
+            
+            basic_analysis = self._analyze_patterns(prompt)
+            ai_analysis = await self._ai_enhanced_analysis(
+                prompt, language, overrides=overrides, include_optimized_prompt=True
+            )
+            optimized_prompt = ai_analysis.pop('optimized_prompt', None)
+            
+            specs = self._apply_platform_optimizations(
+                self._merge_and_validate(basic_analysis, ai_analysis)
+            )
+            
+            # Manual overrides win over the analysis, derived fields are recomputed once
+            for key in ('duration', 'orientation', 'style', 'quality'):
+                if key in overrides:
+                    specs[key] = overrides[key]
+            if 'orientation' in overrides or 'quality' in overrides:
+                specs['aspect_ratio'] = self._get_aspect_ratio(specs['orientation'])
+                specs['resolution'] = self._get_resolution(specs['orientation'], specs['quality'])
+            if 'platform' in overrides:
+                specs['platform'] = overrides['platform']
+                specs = self._apply_platform_optimizations(specs)
+            
+            if not isinstance(optimized_prompt, str) or not optimized_prompt.strip():
+                # Only spend a second call when the AI answered without the prompt
+                if ai_analysis:
+                    optimized_prompt = await self.get_optimized_prompt(prompt, specs)
+                else:
+                    optimized_prompt = prompt
+            
+            return {
+                'success': True,
+                'specifications': specs,
+                'optimized_prompt': optimized_prompt,
+                'analysis': {
+                    'confidence_score': self._calculate_confidence(basic_analysis, ai_analysis),
+                    'language_detected': language,
+                    'analysis_method': 'hybrid_ai_pattern',
+                    'recommendations': self._generate_recommendations(specs)
+                }
+            }
+        
+        except Exception as e:
+            logger.error(f"Prompt analysis error: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'specifications': self._get_default_specs(),
+                'optimized_prompt': prompt
+            }
+    
     def _detect_language(self, text: str) -> str:
         """Detect text language"""
         # Simple Arabic detection
@@ -335,14 +403,36 @@ class IntelligentPromptAnalyzer:
         
         return max(scores, key=scores.get) if scores else 'promotional'
     
-    async def _ai_enhanced_analysis(self, prompt: str, language: str) -> Dict[str, Any]:
-        """AI-powered prompt analysis"""
+    async def _ai_enhanced_analysis(self, prompt: str, language: str,
+                                    overrides: Optional[Dict] = None,
+                                    include_optimized_prompt: bool = False) -> Dict[str, Any]:
+        """AI-powered prompt analysis
+        
+        With include_optimized_prompt the same call also writes the enhanced
+        generation prompt, returned under the 'optimized_prompt' key.
+        """
         try:
+            fixed_specs = ''
+            if overrides:
+                fixed_specs = 'These specifications are fixed by the user, use them as given:\n' + '\n'.join(
+                    f'- {key}: {value}' for key, value in overrides.items()
+                )
+            
+            optimized_prompt_field = ''
+            if include_optimized_prompt:
+                optimized_prompt_field = (
+                    ',\n"optimized_prompt": "the original prompt enhanced with all technical '
+                    'details above while keeping its creative intent, detailed and specific '
+                    'for AI video generation"'
+                )
+            
             analysis_prompt = f"""
             Analyze this video creation prompt and extract specifications:
             
             Prompt: "{prompt}"
             
+            {fixed_specs}
+            
             Extract and return in JSON format:
             {{
                 "orientation": "vertical/horizontal/square",
@@ -359,7 +449,7 @@ class IntelligentPromptAnalyzer:
                 "color_scheme": "description",
                 "music_style": "upbeat/calm/dramatic/corporate",
                 "text_overlay": true/false,
-                "branding": true/false
+                "branding": true/false{optimized_prompt_field}
             }}
             
             Be specific and accurate based on the prompt content.
@@ -369,7 +459,7 @@ class IntelligentPromptAnalyzer:
                 prompt=analysis_prompt,
                 language=language,
                 style='analytical',
-                max_length=500
+                max_length=800 if include_optimized_prompt else 500
             )
             
             if result['success']:
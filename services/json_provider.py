@@ -0,0 +1,123 @@
+"""
+JSON Provider
+مزود JSON
+
+This module provides an orjson-backed JSON provider for Flask so that
+jsonify and request.get_json use a fast C serializer. Request bodies reach
+loads() as raw bytes, which orjson parses without decoding them first.
+It also provides the json_endpoint decorator for uniform route errors.
+"""
+
+import inspect
+import logging
+from functools import wraps
+from collections.abc import Mapping
+from typing import Any, Callable, Union
+
+import msgspec
+import orjson
+from flask import Response, g
+from flask.json.provider import JSONProvider, DefaultJSONProvider
+from werkzeug.exceptions import HTTPException
+
+
+def _default(obj: Any) -> Any:
+    """Serialize types orjson does not handle natively"""
+    # Models expose their API representation through to_dict()
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    # Core result rows (RowMapping) serialize as plain objects
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    return DefaultJSONProvider.default(obj)
+
+
+class ORJSONProvider(JSONProvider):
+    """Flask JSON provider that serializes with orjson"""
+    
+    # Naive datetimes are stored in UTC, emit them as ISO 8601 with a Z suffix;
+    # NumPy scalars and arrays from analytics serialize without conversion
+    option = (orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+              | orjson.OPT_SERIALIZE_NUMPY)
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Serialize data as JSON"""
+        return orjson.dumps(obj, default=_default, option=self.option).decode()
+    
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        """Build a compact, unsorted JSON response straight from orjson bytes"""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=_default, option=self.option),
+            mimetype='application/json'
+        )
+    
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        """Deserialize data as JSON
+
+        Used by request.get_json; orjson.JSONDecodeError is a ValueError, so
+        malformed bodies still become Flask's 400 Bad Request.
+        """
+        return orjson.loads(s)
+
+
+# Body of every unexpected route error, encoded once
+_ERROR_500_BYTES = orjson.dumps({'success': False, 'error': 'Internal server error'})
+
+
+def _error_response() -> Response:
+    """Build the response for an unexpected route error"""
+    return Response(_ERROR_500_BYTES, status=500, mimetype='application/json')
+
+
+def _log_unhandled(logger: logging.Logger, fn: Callable) -> None:
+    """Log the current exception with the request's correlation id when it has one"""
+    rid = g.get('rid')
+    logger.exception(f"Unhandled error in {fn.__name__}" + (f" rid={rid}" if rid else ""))
+
+
+def _invalid_request_response(error: msgspec.DecodeError) -> Response:
+    """Build the response for a request body that failed to decode or validate"""
+    return Response(
+        orjson.dumps({'success': False, 'error': str(error)}),
+        status=400,
+        mimetype='application/json'
+    )
+
+
+def json_endpoint(fn: Callable) -> Callable:
+    """Log unexpected errors raised by a route and answer them with a JSON 500
+
+    Request bodies decoded with msgspec into a Struct that fail to parse or
+    validate become a JSON 400 with msgspec's error message. HTTP exceptions
+    pass through to Flask. Sync views stay sync, so they are not run through
+    the async adapter.
+    """
+    logger = logging.getLogger(fn.__module__)
+    
+    if inspect.iscoroutinefunction(fn):
+        @wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                return await fn(*args, **kwargs)
+            except msgspec.DecodeError as e:
+                return _invalid_request_response(e)
+            except HTTPException:
+                raise
+            except Exception:
+                _log_unhandled(logger, fn)
+                return _error_response()
+        return async_wrapper
+    
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        except msgspec.DecodeError as e:
+            return _invalid_request_response(e)
+        except HTTPException:
+            raise
+        except Exception:
+            _log_unhandled(logger, fn)
+            return _error_response()
+    return wrapper
@@ -1,6 +1,7 @@
 import logging
 import requests
 import json
+import orjson
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import hmac
@@ -373,8 +374,8 @@ class OdooCompleteIntegration:
             logger.error(f"Error sending notification to Odoo: {str(e)}")
             return {'success': False, 'error': str(e)}
     
-    def verify_webhook_signature(self, headers: Dict, body: str) -> bool:
-        """Verify Odoo webhook signature"""
+    def verify_webhook_signature(self, headers: Dict, body: bytes) -> bool:
+        """Verify Odoo webhook signature over the raw request body"""
         try:
             signature = headers.get('X-Odoo-Signature')
             if not signature:
@@ -383,7 +384,7 @@ class OdooCompleteIntegration:
             # Calculate expected signature
             expected_signature = hmac.new(
                 self.webhook_secret.encode(),
-                body.encode(),
+                body,
                 hashlib.sha256
             ).hexdigest()
             
@@ -393,7 +394,7 @@ class OdooCompleteIntegration:
             logger.error(f"Error verifying Odoo webhook signature: {str(e)}")
             return False
     
-    def process_odoo_webhook(self, headers: Dict, body: str) -> Dict:
+    def process_odoo_webhook(self, headers: Dict, body: bytes) -> Dict:
         """Process Odoo webhook"""
         try:
             # Verify signature
@@ -405,7 +406,7 @@ class OdooCompleteIntegration:
                 }
             
             # Parse webhook data
-            webhook_data = json.loads(body)
+            webhook_data = orjson.loads(body)
             event_type = webhook_data.get('event_type')
             model = webhook_data.get('model')
             record_id = webhook_data.get('record_id')
@@ -2,12 +2,14 @@ import logging
 import hmac
 import hashlib
 import json
+import orjson
 from datetime import datetime
 from typing import Dict, Optional, Any
 import requests
 from src.models.user import User
 from src.models.credit_transaction import CreditTransaction
 from src.services.credit_manager import credit_manager
+from src.services.subscription_checker import subscription_checker
 
 logger = logging.getLogger(__name__)
 
@@ -49,7 +51,7 @@ class PayPalWebhookHandler:
             'BILLING.SUBSCRIPTION.SUSPENDED'
         ]
     
-    def verify_webhook_signature(self, headers: Dict, body: str) -> bool:
+    def verify_webhook_signature(self, headers: Dict, webhook_event: Dict) -> bool:
         """Verify PayPal webhook signature"""
         try:
             # Get signature headers
@@ -69,7 +71,7 @@ class PayPalWebhookHandler:
                 "transmission_sig": transmission_sig,
                 "transmission_time": transmission_time,
                 "webhook_id": self.webhook_id,
-                "webhook_event": json.loads(body)
+                "webhook_event": webhook_event
             }
             
             access_token = self.get_access_token()
@@ -124,19 +126,20 @@ class PayPalWebhookHandler:
             logger.error(f"Error getting PayPal access token: {str(e)}")
             return None
     
-    def process_webhook_event(self, headers: Dict, body: str) -> Dict:
+    def process_webhook_event(self, headers: Dict, body: bytes) -> Dict:
         """Process PayPal webhook event"""
         try:
+            # Parse webhook data once, PayPal verifies the parsed event
+            webhook_data = orjson.loads(body)
+            
             # Verify webhook signature
-            if not self.verify_webhook_signature(headers, body):
+            if not self.verify_webhook_signature(headers, webhook_data):
                 return {
                     'success': False,
                     'error': 'Invalid webhook signature',
                     'status': 'signature_verification_failed'
                 }
             
-            # Parse webhook data
-            webhook_data = json.loads(body)
             event_type = webhook_data.get('event_type')
             
             if event_type not in self.supported_events:
@@ -234,6 +237,8 @@ class PayPalWebhookHandler:
             )
             
             if result['success']:
+                subscription_checker.invalidate_user_cache(user.id)
+                
                 # Log successful transaction
                 logger.info(f"PayPal payment processed: User {user.id}, Amount ${amount}, Credits {credits_to_add}")
                 
@@ -338,6 +343,7 @@ class PayPalWebhookHandler:
             if user:
                 # Update user subscription status
                 # This would update the user's subscription in the database
+                subscription_checker.invalidate_user_cache(user.id)
                 logger.info(f"PayPal subscription activated for user {user.id}: {subscription_id}")
             
             return {
@@ -0,0 +1,324 @@
+"""
+Semantic Response Cache
+ذاكرة التخزين المؤقت الدلالية للردود
+
+This module caches generated responses by message meaning so that
+requests already answered with different wording skip generation.
+"""
+
+import os
+import re
+import copy
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable, Awaitable, Hashable, Tuple
+
+try:
+    import numpy as np
+    import faiss
+    from sentence_transformers import SentenceTransformer
+    SEMANTIC_SEARCH_AVAILABLE = True
+except ImportError:
+    SEMANTIC_SEARCH_AVAILABLE = False
+
+from src.services.cache_manager import cache_manager
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Embedding models are shared by every cache that uses the same model name
+_MODELS: Dict[str, Any] = {}
+_MODELS_LOCK = threading.Lock()
+
+
+def _load_model(model_name: str):
+    """Load an embedding model once per process"""
+    with _MODELS_LOCK:
+        if model_name not in _MODELS:
+            _MODELS[model_name] = SentenceTransformer(model_name)
+        return _MODELS[model_name]
+
+
+class _ScopeCache:
+    """Entries and vector index for one cache scope"""
+
+    def __init__(self, dimension: Optional[int]):
+        # entry id -> [normalized message, response, expires_at, hits], oldest first
+        self.entries: "OrderedDict[int, list]" = OrderedDict()
+        # normalized message -> entry id, used for exact hits and without embeddings
+        self.exact: Dict[str, int] = {}
+        self.index = faiss.IndexIDMap(faiss.IndexFlatIP(dimension)) if dimension else None
+
+
+class SemanticResponseCache:
+    """LRU cache with TTL that matches messages by embedding similarity"""
+
+    def __init__(self, model_name: str = None, threshold: float = 0.90,
+                 max_entries: int = 10000, ttl: int = 600, name: str = 'default',
+                 shared_cache=None, promote_after: int = 3, shared_ttl: int = 86400,
+                 max_scopes: int = 1000):
+        """
+        Initialize semantic cache
+
+        Args:
+            model_name: Sentence-transformers model used for embeddings
+            threshold: Minimum cosine similarity for a cache hit
+            max_entries: Maximum entries kept across all scopes
+            ttl: Time-to-live of an entry in seconds
+            name: Namespace of the entries promoted to the shared cache
+            shared_cache: Optional CacheManager keeping frequently hit entries longer
+            promote_after: Hits after which an entry is copied to the shared cache
+            shared_ttl: Time-to-live of promoted entries in seconds
+            max_scopes: Maximum scopes kept, the least recently used is dropped first
+        """
+        self.model_name = model_name or os.getenv(
+            'SEMANTIC_CACHE_MODEL', 'paraphrase-multilingual-MiniLM-L12-v2'
+        )
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_scopes = max_scopes
+        self.ttl = ttl
+        self.name = name
+        self.shared_cache = shared_cache
+        self.promote_after = promote_after
+        self.shared_ttl = shared_ttl
+        self.enabled = os.getenv('SEMANTIC_CACHE_ENABLED', 'true').lower() == 'true'
+
+        self._model = None
+        self._model_failed = not SEMANTIC_SEARCH_AVAILABLE
+        # scope -> entries of that scope, least recently used first
+        self._scopes: "OrderedDict[Hashable, _ScopeCache]" = OrderedDict()
+        self._size = 0
+        self._next_id = 0
+        # Expired entries that are never looked up again are swept on set
+        self._sweep_interval = min(ttl, 60)
+        self._next_sweep = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    @staticmethod
+    def normalize(message: str) -> str:
+        """Normalize a message for exact matching"""
+        return _WHITESPACE_RE.sub(' ', message).strip().casefold()
+
+    def _get_model(self):
+        """Load the embedding model once, on first use"""
+        if self._model is None and not self._model_failed:
+            try:
+                self._model = _load_model(self.model_name)
+            except Exception as e:
+                logger.warning("Semantic cache falling back to exact matching: %s", e)
+                self._model_failed = True
+        return self._model
+
+    def _embed(self, message: str):
+        """Compute a normalized embedding, or None without a model"""
+        model = self._get_model()
+        if model is None:
+            return None
+        embedding = model.encode([message], normalize_embeddings=True)
+        return np.asarray(embedding, dtype='float32')
+
+    def _get_scope(self, scope: Hashable, embedding) -> _ScopeCache:
+        """Get or create the cache for a scope and mark it most recently used"""
+        cache = self._scopes.get(scope)
+        if cache is not None:
+            self._scopes.move_to_end(scope)
+            return cache
+
+        dimension = embedding.shape[1] if embedding is not None else None
+        cache = self._scopes[scope] = _ScopeCache(dimension)
+        while len(self._scopes) > self.max_scopes:
+            self._drop_scope(next(iter(self._scopes)))
+        return cache
+
+    def _drop_scope(self, scope: Hashable) -> None:
+        """Drop a scope with all its entries and its index"""
+        self._size -= len(self._scopes.pop(scope).entries)
+
+    def _remove(self, cache: _ScopeCache, entry_id: int) -> None:
+        """Drop an entry from a scope"""
+        self._remove_many(cache, [entry_id])
+
+    def _remove_many(self, cache: _ScopeCache, entry_ids: list) -> None:
+        """Drop several entries from a scope with a single index update"""
+        for entry_id in entry_ids:
+            normalized = cache.entries.pop(entry_id)[0]
+            if cache.exact.get(normalized) == entry_id:
+                del cache.exact[normalized]
+        self._size -= len(entry_ids)
+        if cache.index is not None:
+            cache.index.remove_ids(np.array(entry_ids, dtype='int64'))
+
+    def _sweep_expired(self, now: float) -> None:
+        """Drop expired entries of every scope, and scopes left empty"""
+        for scope, cache in list(self._scopes.items()):
+            expired = [entry_id for entry_id, entry in cache.entries.items() if entry[2] <= now]
+            if len(expired) == len(cache.entries):
+                self._drop_scope(scope)
+            elif expired:
+                self._remove_many(cache, expired)
+
+    def _lookup(self, cache: _ScopeCache, normalized: str, embedding) -> Optional[int]:
+        """Find the id of a matching entry"""
+        entry_id = cache.exact.get(normalized)
+        if entry_id is not None:
+            return entry_id
+
+        if cache.index is None or embedding is None or cache.index.ntotal == 0:
+            return None
+
+        scores, ids = cache.index.search(embedding, 1)
+        if ids[0][0] != -1 and scores[0][0] >= self.threshold:
+            return int(ids[0][0])
+        return None
+
+    def _get(self, normalized: str, scope: Hashable, embedding) -> Tuple[Optional[Dict[str, Any]], int]:
+        """Get a cached response and its hit count"""
+        with self._lock:
+            cache = self._scopes.get(scope)
+            if cache is None:
+                return None, 0
+            self._scopes.move_to_end(scope)
+
+            entry_id = self._lookup(cache, normalized, embedding)
+            if entry_id is None:
+                return None, 0
+
+            entry = cache.entries[entry_id]
+            if entry[2] <= time.time():
+                if len(cache.entries) == 1:
+                    self._drop_scope(scope)
+                else:
+                    self._remove(cache, entry_id)
+                return None, 0
+
+            entry[3] += 1
+            cache.entries.move_to_end(entry_id)
+            return copy.deepcopy(entry[1]), entry[3]
+
+    def get(self, message: str, scope: Hashable = None, embedding=None) -> Optional[Dict[str, Any]]:
+        """Get a cached response for a message similar to this one"""
+        return self._get(self.normalize(message), scope, embedding)[0]
+
+    def _shared_params(self, normalized: str, scope: Hashable) -> Dict[str, str]:
+        """Key parameters of an entry in the shared cache"""
+        return {'message': normalized, 'scope': repr(scope)}
+
+    def _lookup_cached(self, message: str, scope: Hashable):
+        """Embed a message and look it up locally, then in the shared cache"""
+        try:
+            embedding = self._embed(message)
+        except Exception as e:
+            logger.warning("Failed to embed message for semantic cache: %s", e)
+            embedding = None
+
+        normalized = self.normalize(message)
+        cached, hits = self._get(normalized, scope, embedding)
+
+        if cached is not None:
+            # Frequently hit entries outlive the local TTL and are shared across workers
+            if self.shared_cache is not None and hits == self.promote_after:
+                self.shared_cache.cache_api_response(
+                    'semantic_cache', self.name, self._shared_params(normalized, scope),
+                    cached, self.shared_ttl
+                )
+        elif self.shared_cache is not None:
+            cached = self.shared_cache.get_cached_api_response(
+                'semantic_cache', self.name, self._shared_params(normalized, scope)
+            )
+            if cached is not None:
+                self.set(message, cached, scope, embedding)
+
+        if cached is not None:
+            self.stats['hits'] += 1
+            cached['cached'] = True
+        else:
+            self.stats['misses'] += 1
+
+        return embedding, cached
+
+    def set(self, message: str, response: Dict[str, Any], scope: Hashable = None,
+            embedding=None) -> None:
+        """Store a response for a message"""
+        normalized = self.normalize(message)
+
+        with self._lock:
+            cache = self._get_scope(scope, embedding)
+
+            if normalized in cache.exact:
+                self._remove(cache, cache.exact[normalized])
+
+            entry_id = self._next_id
+            self._next_id += 1
+
+            now = time.time()
+            cache.entries[entry_id] = [normalized, copy.deepcopy(response), now + self.ttl, 0]
+            cache.exact[normalized] = entry_id
+            self._size += 1
+            if cache.index is not None and embedding is not None:
+                cache.index.add_with_ids(embedding, np.array([entry_id], dtype='int64'))
+
+            if now >= self._next_sweep:
+                self._sweep_expired(now)
+                self._next_sweep = now + self._sweep_interval
+
+            # Evict from the least recently used scopes first
+            while self._size > self.max_entries:
+                oldest_scope, oldest = next(iter(self._scopes.items()))
+                if len(oldest.entries) > 1:
+                    self._remove(oldest, next(iter(oldest.entries)))
+                else:
+                    self._drop_scope(oldest_scope)
+
+    def get_or_generate(self, message: str, generate: Callable[[], Dict[str, Any]],
+                        scope: Hashable = None) -> Dict[str, Any]:
+        """Return a cached response or generate, cache and return a new one"""
+        if not self.enabled:
+            return generate()
+
+        embedding, cached = self._lookup_cached(message, scope)
+        if cached is not None:
+            return cached
+
+        response = generate()
+        if response.get('success', False):
+            self.set(message, response, scope, embedding)
+        return response
+
+    async def aget_or_generate(self, message: str, generate: Callable[[], Awaitable[Dict[str, Any]]],
+                               scope: Hashable = None) -> Dict[str, Any]:
+        """Async variant of get_or_generate for coroutine generators"""
+        if not self.enabled:
+            return await generate()
+
+        embedding, cached = self._lookup_cached(message, scope)
+        if cached is not None:
+            return cached
+
+        response = await generate()
+        if response.get('success', False):
+            self.set(message, response, scope, embedding)
+        return response
+
+    def clear(self) -> None:
+        """Remove all cached responses"""
+        with self._lock:
+            self._scopes.clear()
+            self._size = 0
+
+
+# Global semantic cache instance for support bot responses
+support_response_cache = SemanticResponseCache()
+
+# Global semantic cache instance for video prompt analysis, with one scope
+# per user and override combination; idle scopes are evicted first
+video_prompt_cache = SemanticResponseCache(
+    threshold=0.87,
+    max_scopes=2000,
+    name='video_prompt',
+    shared_cache=cache_manager if cache_manager.cache_type == 'redis' else None
+)
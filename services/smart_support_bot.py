@@ -10,6 +10,22 @@ from src.models.base import db
 
 logger = logging.getLogger(__name__)
 
+# Common actions are static, built once and shared by every response
+COMMON_ACTIONS = {
+    'ar': [
+        {'type': 'view_pricing', 'label': 'الأسعار والباقات'},
+        {'type': 'features', 'label': 'ميزات النظام'},
+        {'type': 'contact_support', 'label': 'التواصل مع الدعم'},
+        {'type': 'free_trial', 'label': 'تجربة مجانية'}
+    ],
+    'en': [
+        {'type': 'view_pricing', 'label': 'Pricing & Plans'},
+        {'type': 'features', 'label': 'System Features'},
+        {'type': 'contact_support', 'label': 'Contact Support'},
+        {'type': 'free_trial', 'label': 'Free Trial'}
+    ]
+}
+
 class SmartSupportBot:
     """Smart AI support bot for customer service"""
     
@@ -212,9 +228,8 @@ class SmartSupportBot:
                         best_match = entry
             
             if best_match and best_score > 0:
-                # Update usage statistics
+                # Update usage statistics, committed with the caller's chat messages
                 best_match.usage_count += 1
-                db.session.commit()
                 return best_match.answer
                 
         except Exception as e:
@@ -336,20 +351,7 @@ class SmartSupportBot:
 
     def get_common_actions(self, language: str) -> List[Dict]:
         """Get common actions for unknown intents"""
-        if language == 'ar':
-            return [
-                {'type': 'view_pricing', 'label': 'الأسعار والباقات'},
-                {'type': 'features', 'label': 'ميزات النظام'},
-                {'type': 'contact_support', 'label': 'التواصل مع الدعم'},
-                {'type': 'free_trial', 'label': 'تجربة مجانية'}
-            ]
-        else:
-            return [
-                {'type': 'view_pricing', 'label': 'Pricing & Plans'},
-                {'type': 'features', 'label': 'System Features'},
-                {'type': 'contact_support', 'label': 'Contact Support'},
-                {'type': 'free_trial', 'label': 'Free Trial'}
-            ]
+        return COMMON_ACTIONS['ar'] if language == 'ar' else COMMON_ACTIONS['en']
 
     def should_transfer_to_human(self, intent: str, confidence: float, 
                                 conversation_length: int) -> bool:
@@ -1,19 +1,38 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import os
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 import base64
 from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
 import time
+from src.services.cache_manager import cache_manager
 
 logger = logging.getLogger(__name__)
 
+def create_http_session() -> requests.Session:
+    """Create a keep-alive session shared by all outbound platform calls
+
+    Retries only apply to idempotent methods so a post is never sent twice.
+    """
+    retry = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
 class SocialMediaPublisher:
     """Free Social Media Publishing System using free APIs only"""
     
-    def __init__(self):
+    def __init__(self, session: requests.Session = None):
+        # Pooled HTTP connections reused across posts and worker threads
+        self.session = session or create_http_session()
+        
         # Facebook/Instagram (Free APIs)
         self.facebook_app_id = os.getenv('FACEBOOK_APP_ID', '')
         self.facebook_app_secret = os.getenv('FACEBOOK_APP_SECRET', '')
@@ -101,6 +120,10 @@ class SocialMediaPublisher:
             }
         }
         
+        # Post analytics cache (fresh for 5 minutes, served stale for an hour on upstream errors)
+        self.analytics_cache_ttl = 300
+        self.analytics_stale_ttl = 3600
+        
         # Publishing templates for different content types
         self.publishing_templates = {
             'product_showcase': {
@@ -169,6 +192,31 @@ class SocialMediaPublisher:
         
         return {'valid': True, 'platform_config': platform_config}
     
+    def validate_content_for_platforms(self, content: str, platforms: List[str]) -> Dict:
+        """Validate content against the limits of several platforms in one pass"""
+        content_length = len(content)
+        validation_results = {}
+        
+        for platform in platforms:
+            platform_config = self.platform_configs.get(platform)
+            
+            if not platform_config:
+                validation_results[platform] = {'valid': False, 'error': 'Platform not supported'}
+                continue
+            
+            max_length = platform_config.get('max_text_length', 1000)
+            
+            if content_length > max_length:
+                validation_results[platform] = {
+                    'valid': False,
+                    'error': f'Content too long. Max {max_length} characters, got {content_length}',
+                    'suggested_content': content[:max_length-3] + '...'
+                }
+            else:
+                validation_results[platform] = {'valid': True, 'platform_config': platform_config}
+        
+        return validation_results
+    
     def format_content_for_platform(self, content: Dict, platform: str) -> str:
         """Format content specifically for each platform"""
         
@@ -237,7 +285,7 @@ class SocialMediaPublisher:
             endpoint = f"{page_id}/feed" if page_id else "me/feed"
             url = f"{self.platform_configs['facebook']['api_url']}/{endpoint}"
             
-            response = requests.post(url, data=post_data)
+            response = self.session.post(url, data=post_data)
             
             if response.status_code == 200:
                 result = response.json()
@@ -291,7 +339,7 @@ class SocialMediaPublisher:
                 media_data['media_type'] = 'VIDEO'
             
             container_url = f"{self.platform_configs['instagram']['api_url']}/{instagram_account_id}/media"
-            container_response = requests.post(container_url, data=media_data)
+            container_response = self.session.post(container_url, data=media_data)
             
             if container_response.status_code != 200:
                 error_data = container_response.json()
@@ -309,7 +357,7 @@ class SocialMediaPublisher:
             }
             
             publish_url = f"{self.platform_configs['instagram']['api_url']}/{instagram_account_id}/media_publish"
-            publish_response = requests.post(publish_url, data=publish_data)
+            publish_response = self.session.post(publish_url, data=publish_data)
             
             if publish_response.status_code == 200:
                 result = publish_response.json()
@@ -359,7 +407,7 @@ class SocialMediaPublisher:
                 pass
             
             url = f"{self.platform_configs['twitter']['api_url']}/tweets"
-            response = requests.post(url, headers=headers, json=tweet_data)
+            response = self.session.post(url, headers=headers, json=tweet_data)
             
             if response.status_code == 201:
                 result = response.json()
@@ -451,6 +499,25 @@ class SocialMediaPublisher:
             logger.error(f"Error publishing to YouTube: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    def publish_to_platform(self, content: Dict, platform: str, config: Dict = None) -> Dict:
+        """Publish content to a single platform"""
+        config = config or {}
+        
+        if platform == 'facebook':
+            return self.publish_to_facebook(content, config.get('page_id'))
+        elif platform == 'instagram':
+            return self.publish_to_instagram(content, config.get('account_id'))
+        elif platform == 'twitter':
+            return self.publish_to_twitter(content)
+        elif platform == 'linkedin':
+            return self.publish_to_linkedin(content, config.get('person_id'))
+        elif platform == 'tiktok':
+            return self.publish_to_tiktok(content)
+        elif platform == 'youtube':
+            return self.publish_to_youtube(content)
+        else:
+            return {'success': False, 'error': f'Platform {platform} not supported'}
+    
     def publish_to_multiple_platforms(self, content: Dict, platforms: List[str], 
                                     platform_configs: Dict = None) -> Dict:
         """Publish content to multiple platforms simultaneously"""
@@ -459,37 +526,31 @@ class SocialMediaPublisher:
         successful_posts = 0
         failed_posts = 0
         
-        for platform in platforms:
-            try:
-                # Get platform-specific configuration
-                config = platform_configs.get(platform, {}) if platform_configs else {}
-                
-                # Publish to platform
-                if platform == 'facebook':
-                    result = self.publish_to_facebook(content, config.get('page_id'))
-                elif platform == 'instagram':
-                    result = self.publish_to_instagram(content, config.get('account_id'))
-                elif platform == 'twitter':
-                    result = self.publish_to_twitter(content)
-                elif platform == 'linkedin':
-                    result = self.publish_to_linkedin(content, config.get('person_id'))
-                elif platform == 'tiktok':
-                    result = self.publish_to_tiktok(content)
-                elif platform == 'youtube':
-                    result = self.publish_to_youtube(content)
-                else:
-                    result = {'success': False, 'error': f'Platform {platform} not supported'}
-                
-                results[platform] = result
+        if platforms:
+            # Posting is network-bound, so each platform gets its own thread
+            with ThreadPoolExecutor(max_workers=len(platforms)) as executor:
+                futures = {
+                    platform: executor.submit(
+                        self.publish_to_platform,
+                        content,
+                        platform,
+                        platform_configs.get(platform, {}) if platform_configs else {}
+                    )
+                    for platform in platforms
+                }
                 
-                if result['success']:
-                    successful_posts += 1
-                else:
-                    failed_posts += 1
+                for platform, future in futures.items():
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {'success': False, 'error': str(e)}
                     
-            except Exception as e:
-                results[platform] = {'success': False, 'error': str(e)}
-                failed_posts += 1
+                    results[platform] = result
+                    
+                    if result['success']:
+                        successful_posts += 1
+                    else:
+                        failed_posts += 1
         
         return {
             'success': successful_posts > 0,
@@ -578,6 +639,81 @@ class SocialMediaPublisher:
             logger.error(f"Error getting analytics: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    def record_analytics_query(self, platform: str, post_id: str) -> None:
+        """Count a post analytics lookup towards the current hour's popular posts
+        
+        The counts are read by the Celery beat refresher in another process,
+        so they are only kept in Redis; without it nothing is recorded.
+        """
+        if cache_manager.cache_type != "redis" or not cache_manager.redis_client:
+            return
+        
+        hour_bucket = int(time.time()) // 3600
+        try:
+            popular_key = f"analytics:popular:{hour_bucket}"
+            pipe = cache_manager.redis_client.pipeline()
+            pipe.zincrby(popular_key, 1, f"{platform}:{post_id}")
+            pipe.expire(popular_key, 7200)
+            pipe.execute()
+        except Exception as e:
+            logger.warning("Failed to record analytics query in Redis: %s", e)
+    
+    def get_popular_analytics_queries(self, limit: int = 50) -> List[Tuple[str, str]]:
+        """Get the most queried (platform, post_id) pairs of the current hour from Redis"""
+        if cache_manager.cache_type != "redis" or not cache_manager.redis_client:
+            return []
+        
+        hour_bucket = int(time.time()) // 3600
+        try:
+            members = cache_manager.redis_client.zrevrange(
+                f"analytics:popular:{hour_bucket}", 0, limit - 1
+            )
+        except Exception as e:
+            logger.warning("Failed to read popular analytics queries from Redis: %s", e)
+            return []
+        
+        pairs = []
+        for member in members:
+            if isinstance(member, bytes):
+                member = member.decode()
+            platform, post_id = member.split(':', 1)
+            pairs.append((platform, post_id))
+        return pairs
+    
+    def refresh_posting_analytics(self, platform: str, post_id: str) -> Dict:
+        """Fetch post analytics from the platform and store them in the cache"""
+        result = self.get_posting_analytics(platform, post_id)
+        
+        if result.get('success'):
+            cache_manager.cache_api_response('post_analytics', platform, {'post_id': post_id}, {
+                'result': result,
+                'stale_at': time.time() + self.analytics_cache_ttl
+            }, self.analytics_stale_ttl)
+        
+        return result
+    
+    def get_cached_posting_analytics(self, platform: str, post_id: str) -> Dict:
+        """Get post analytics from the cache, falling back to the platform API"""
+        self.record_analytics_query(platform, post_id)
+        
+        cached = cache_manager.get_cached_api_response('post_analytics', platform, {'post_id': post_id})
+        if cached and cached['stale_at'] > time.time():
+            return cached['result']
+        
+        try:
+            result = self.refresh_posting_analytics(platform, post_id)
+        except Exception as e:
+            if not cached:
+                raise
+            logger.warning(f"Serving stale analytics for {platform}:{post_id}: {e}")
+            return cached['result']
+        
+        # Serve the last good analytics while the platform API is failing
+        if not result.get('success') and cached:
+            return cached['result']
+        
+        return result
+    
     def get_optimal_posting_times(self, platform: str, audience_timezone: str = 'UTC') -> Dict:
         """Get optimal posting times for each platform (based on general best practices)"""
         
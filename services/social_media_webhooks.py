@@ -1,5 +1,7 @@
+import os
 import logging
 import json
+import orjson
 import requests
 import hmac
 import hashlib
@@ -24,6 +26,9 @@ class SocialMediaWebhooks:
             'twitter': 'YOUR_TWITTER_WEBHOOK_SECRET'
         }
         
+        # Facebook subscription verify token, read once
+        self.facebook_verify_token = os.getenv('FB_VERIFY_TOKEN', '').encode()
+        
         # Supported webhook events
         self.supported_events = {
             'facebook': [
@@ -64,12 +69,18 @@ class SocialMediaWebhooks:
             'weekly': 604800    # 7 days
         }
     
-    def verify_facebook_signature(self, payload: str, signature: str) -> bool:
-        """Verify Facebook webhook signature"""
+    def check_facebook_verify_token(self, token: Optional[str]) -> bool:
+        """Compare a subscription verify token in constant time, rejecting all when unset"""
+        if not self.facebook_verify_token or not token:
+            return False
+        return hmac.compare_digest(token.encode(), self.facebook_verify_token)
+    
+    def verify_facebook_signature(self, payload: bytes, signature: str) -> bool:
+        """Verify Facebook webhook signature over the raw request body"""
         try:
             expected_signature = hmac.new(
                 self.webhook_secrets['facebook'].encode(),
-                payload.encode(),
+                payload,
                 hashlib.sha256
             ).hexdigest()
             
@@ -83,14 +94,14 @@ class SocialMediaWebhooks:
             logger.error(f"Error verifying Facebook signature: {str(e)}")
             return False
     
-    def verify_tiktok_signature(self, payload: str, signature: str, timestamp: str) -> bool:
-        """Verify TikTok webhook signature"""
+    def verify_tiktok_signature(self, payload: bytes, signature: str, timestamp: str) -> bool:
+        """Verify TikTok webhook signature over the raw request body"""
         try:
             # TikTok signature verification
-            message = f"{timestamp}{payload}"
+            message = timestamp.encode() + payload
             expected_signature = hmac.new(
                 self.webhook_secrets['tiktok'].encode(),
-                message.encode(),
+                message,
                 hashlib.sha256
             ).hexdigest()
             
@@ -115,7 +126,7 @@ class SocialMediaWebhooks:
             logger.error(f"Error verifying YouTube signature: {str(e)}")
             return False
     
-    def process_facebook_webhook(self, headers: Dict, body: str) -> Dict:
+    def process_facebook_webhook(self, headers: Dict, body: bytes) -> Dict:
         """Process Facebook webhook"""
         try:
             # Verify signature
@@ -127,14 +138,14 @@ class SocialMediaWebhooks:
                     'status': 'signature_verification_failed'
                 }
             
-            webhook_data = json.loads(body)
+            webhook_data = orjson.loads(body)
             
             # Handle verification challenge
             if webhook_data.get('hub.mode') == 'subscribe':
                 challenge = webhook_data.get('hub.challenge')
                 verify_token = webhook_data.get('hub.verify_token')
                 
-                if verify_token == 'YOUR_VERIFY_TOKEN':
+                if self.check_facebook_verify_token(verify_token):
                     return {'success': True, 'challenge': challenge}
                 else:
                     return {'success': False, 'error': 'Invalid verify token'}
@@ -201,7 +212,7 @@ class SocialMediaWebhooks:
             logger.error(f"Error handling Instagram update: {str(e)}")
             return {'success': False, 'error': str(e)}
     
-    def process_tiktok_webhook(self, headers: Dict, body: str) -> Dict:
+    def process_tiktok_webhook(self, headers: Dict, body: bytes) -> Dict:
         """Process TikTok webhook"""
         try:
             # Verify signature
@@ -215,7 +226,7 @@ class SocialMediaWebhooks:
                     'status': 'signature_verification_failed'
                 }
             
-            webhook_data = json.loads(body)
+            webhook_data = orjson.loads(body)
             event_type = webhook_data.get('event')
             
             if event_type == 'video.publish':
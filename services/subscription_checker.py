@@ -1,13 +1,24 @@
 
 import logging
+import threading
 from datetime import datetime, timedelta
 from typing import Dict, Optional, List, Any
+from cachetools import TTLCache
+from src.models.base import db
 from src.models.user import User
 from src.models.subscription import SubscriptionPlan as Subscription
 from src.services.odoo_complete_integration import odoo_integration
 from src.services.credit_manager import credit_manager
 logger = logging.getLogger(__name__)
 
+# Read-only lookups per user for polling clients. The caches live in each
+# process and are only dropped here when this process changes a plan or
+# credits through the subscription services; credits spent by routes or
+# Celery workers show up once the 30 second TTL runs out.
+_STATUS_CACHE = TTLCache(maxsize=10000, ttl=30)
+_UPGRADE_OPTIONS_CACHE = TTLCache(maxsize=10000, ttl=30)
+_CACHE_LOCK = threading.Lock()
+
 class SubscriptionChecker:
     """Comprehensive Subscription Checker and Manager"""
     
@@ -78,7 +89,26 @@ class SubscriptionChecker:
         # Grace period for expired subscriptions (days)
         self.grace_period_days = 7
     
+    def invalidate_user_cache(self, user_id: int) -> None:
+        """Drop the cached status and upgrade options of a user"""
+        with _CACHE_LOCK:
+            _STATUS_CACHE.pop(user_id, None)
+            _UPGRADE_OPTIONS_CACHE.pop(user_id, None)
+    
     def check_user_subscription_status(self, user_id: int) -> Dict:
+        """Check comprehensive subscription status for user, cached for a short time"""
+        with _CACHE_LOCK:
+            cached = _STATUS_CACHE.get(user_id)
+        if cached is not None:
+            return cached
+        
+        status = self._load_subscription_status(user_id)
+        if status['success']:
+            with _CACHE_LOCK:
+                _STATUS_CACHE[user_id] = status
+        return status
+    
+    def _load_subscription_status(self, user_id: int) -> Dict:
         """Check comprehensive subscription status for user"""
         try:
             user = User.query.get(user_id)
@@ -118,7 +148,6 @@ class SubscriptionChecker:
                         
                         # Update subscription status
                         active_subscription.status = 'expired'
-                        from src.models.base import db
                         db.session.commit()
             
             # Get plan details
@@ -438,7 +467,6 @@ class SubscriptionChecker:
                 return status
             
             subscription_status = status['subscription_status']
-            credits_status = status['credits_status']
             usage_status = status['usage_status']
             plan_details = status['plan_details']
             
@@ -452,9 +480,9 @@ class SubscriptionChecker:
                     'required_action': 'subscribe'
                 }
             
-            # Check credits
+            # Check credits against the live balance, the status may be cached
             action_cost = cost or self.credit_costs.get(action_type, 1)
-            current_balance = credits_status['current_balance']
+            current_balance = db.session.query(User.credits_balance).filter_by(id=user_id).scalar() or 0
             
             if current_balance < action_cost:
                 return {
@@ -540,8 +568,8 @@ class SubscriptionChecker:
                     if result['success']:
                         # Update next billing date
                         subscription.next_billing_date = subscription.next_billing_date + timedelta(days=30)
-                        from src.models.base import db
                         db.session.commit()
+                        self.invalidate_user_cache(user_id)
                         
                         return {
                             'success': True,
@@ -559,6 +587,19 @@ class SubscriptionChecker:
             return {'success': False, 'error': str(e)}
     
     def get_upgrade_options(self, user_id: int) -> Dict:
+        """Get available upgrade options for user, cached for a short time"""
+        with _CACHE_LOCK:
+            cached = _UPGRADE_OPTIONS_CACHE.get(user_id)
+        if cached is not None:
+            return cached
+        
+        options = self._load_upgrade_options(user_id)
+        if options['success']:
+            with _CACHE_LOCK:
+                _UPGRADE_OPTIONS_CACHE[user_id] = options
+        return options
+    
+    def _load_upgrade_options(self, user_id: int) -> Dict:
         """Get available upgrade options for user"""
         try:
             status = self.check_user_subscription_status(user_id)
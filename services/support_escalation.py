@@ -1,5 +1,8 @@
+import re
+import atexit
 import smtplib
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
@@ -10,6 +13,19 @@ from src.models.base import db
 
 logger = logging.getLogger(__name__)
 
+# SMTP delivery runs in the background so escalations do not wait on the mail server
+_EMAIL_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix='escalation-email')
+atexit.register(_EMAIL_EXECUTOR.shutdown, wait=True)
+
+# Messages asking for a person or about billing always escalate, whatever the bot's confidence
+HUMAN_REQUEST_KEYWORDS = ['بشري', 'موظف', 'مدير', 'human', 'agent', 'person', 'manager']
+BILLING_KEYWORDS = ['فاتورة', 'دفع', 'مال', 'billing', 'payment', 'money', 'charge']
+
+
+def _compile_keywords(keywords: List[str]) -> re.Pattern:
+    """Compile keywords into one case-insensitive alternation"""
+    return re.compile('|'.join(re.escape(keyword.lower()) for keyword in keywords))
+
 class SupportEscalationManager:
     """Manages escalation of support tickets to human agents"""
     
@@ -34,6 +50,11 @@ class SupportEscalationManager:
             'conversation_length': 8,
             'keywords': ['مشكلة كبيرة', 'عاجل', 'urgent', 'مدير', 'manager', 'شكوى', 'complaint']
         }
+        
+        # Each keyword group is scanned in one pass over the message
+        self._urgent_pattern = _compile_keywords(self.escalation_triggers['keywords'])
+        self._human_request_pattern = _compile_keywords(HUMAN_REQUEST_KEYWORDS)
+        self._billing_pattern = _compile_keywords(BILLING_KEYWORDS)
 
     def should_escalate(self, chat: SupportChat, latest_message: str, 
                        bot_confidence: float) -> Dict:
@@ -58,27 +79,20 @@ class SupportEscalationManager:
         
         # Check for escalation keywords
         message_lower = latest_message.lower()
-        for keyword in self.escalation_triggers['keywords']:
-            if keyword.lower() in message_lower:
-                escalation_reasons.append(f'كلمة مفتاحية: {keyword}')
-                priority = 'urgent'
-                break
+        urgent_match = self._urgent_pattern.search(message_lower)
+        if urgent_match:
+            escalation_reasons.append(f'كلمة مفتاحية: {urgent_match.group(0)}')
+            priority = 'urgent'
         
         # Check for direct human request
-        human_request_keywords = ['بشري', 'موظف', 'مدير', 'human', 'agent', 'person', 'manager']
-        for keyword in human_request_keywords:
-            if keyword.lower() in message_lower:
-                escalation_reasons.append('طلب مباشر للدعم البشري')
-                priority = 'high'
-                break
+        if self._human_request_pattern.search(message_lower):
+            escalation_reasons.append('طلب مباشر للدعم البشري')
+            priority = 'high'
         
         # Check for billing/payment issues
-        billing_keywords = ['فاتورة', 'دفع', 'مال', 'billing', 'payment', 'money', 'charge']
-        for keyword in billing_keywords:
-            if keyword.lower() in message_lower:
-                escalation_reasons.append('مشكلة في الفواتير أو الدفع')
-                priority = 'high'
-                break
+        if self._billing_pattern.search(message_lower):
+            escalation_reasons.append('مشكلة في الفواتير أو الدفع')
+            priority = 'high'
         
         should_escalate = len(escalation_reasons) > 0
         
@@ -90,8 +104,11 @@ class SupportEscalationManager:
         }
 
     def escalate_to_human(self, chat_id: int, escalation_reason: str, 
-                         priority: str = 'normal') -> Dict:
-        """Escalate chat to human support"""
+                         priority: str = 'normal', commit: bool = True) -> Dict:
+        """Escalate chat to human support
+
+        With commit=False the changes are left for the caller's transaction.
+        """
         try:
             chat = SupportChat.query.get(chat_id)
             if not chat:
@@ -139,7 +156,8 @@ class SupportEscalationManager:
                 )
                 db.session.add(agent_message)
             
-            db.session.commit()
+            if commit:
+                db.session.commit()
             
             return {
                 'success': True,
@@ -151,7 +169,8 @@ class SupportEscalationManager:
             
         except Exception as e:
             logger.error(f"Error escalating to human: {str(e)}")
-            db.session.rollback()
+            if commit:
+                db.session.rollback()
             return {'success': False, 'error': str(e)}
 
     def get_user_info(self, chat: SupportChat) -> Dict:
@@ -194,7 +213,7 @@ class SupportEscalationManager:
     def get_conversation_history(self, chat_id: int) -> List[Dict]:
         """Get formatted conversation history"""
         try:
-            messages = SupportMessage.query.filter_by(chat_id=chat_id).order_by(SupportMessage.sent_at).all()
+            messages = SupportMessage.query.filter_by(chat_id=chat_id).order_by(SupportMessage.sent_at, SupportMessage.id).all()
             
             history = []
             for msg in messages:
@@ -338,16 +357,24 @@ class SupportEscalationManager:
             html_part = MIMEText(html_content, 'html', 'utf-8')
             msg.attach(html_part)
             
-            # Send email
+            # Send to admin and CC recipients without blocking the request
+            recipients = [self.admin_email] + self.notification_emails
+            _EMAIL_EXECUTOR.submit(self.deliver_email, msg, recipients, chat.id)
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error sending escalation email: {str(e)}")
+            return False
+
+    def deliver_email(self, msg: MIMEMultipart, recipients: List[str], chat_id: int) -> bool:
+        """Deliver a prepared email over SMTP"""
+        try:
             with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
                 server.starttls()
                 server.login(self.admin_email, self.admin_password)
-                
-                # Send to admin and CC recipients
-                recipients = [self.admin_email] + self.notification_emails
                 server.send_message(msg, to_addrs=recipients)
             
-            logger.info(f"Escalation email sent successfully for chat {chat.id}")
+            logger.info(f"Escalation email sent successfully for chat {chat_id}")
             return True
             
         except Exception as e:
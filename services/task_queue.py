@@ -110,34 +110,55 @@ class TaskQueueManager:
         self.processors[task_type] = processor_func
         logger.info(f"Registered processor for task type: {task_type}")
     
+    def _serialize_task(self, task: QueueTask) -> Dict[str, Any]:
+        """Task fields as stored in Redis"""
+        task_data = asdict(task)
+        task_data['created_at'] = task.created_at.isoformat()
+        return task_data
+    
+    def _queue_task_commands(self, pipe, task: QueueTask, task_data: Dict[str, Any]) -> int:
+        """Queue the Redis writes that enqueue a task on a pipeline, returns the command count"""
+        # Add to Redis queue
+        pipe.lpush(self.queues[task.priority], json.dumps(task_data))
+        
+        # Store task details
+        pipe.hset(f"task:{task.id}", mapping=task_data)
+        
+        # Add to user's task list
+        pipe.sadd(f"user_tasks:{task.user_id}", task.id)
+        
+        # Keep a per-family timeline so history reads are ordered server-side
+        pipe.zadd(
+            self._timeline_key(task.user_id, task.task_type),
+            {task.id: task.created_at.timestamp()}
+        )
+        return 4
+    
+    def _build_db_task(self, task: QueueTask) -> Task:
+        """Database fallback record for a task"""
+        return Task(
+            id=task.id,
+            user_id=task.user_id,
+            title=f"Queue Task: {task.task_type}",
+            description=json.dumps(task.data),
+            task_type=task.task_type,
+            status=task.status,
+            priority=task.priority
+        )
+    
     async def add_task(self, task: QueueTask) -> bool:
         """Add task to appropriate priority queue"""
         try:
-            task_data = asdict(task)
-            task_data['created_at'] = task.created_at.isoformat()
+            task_data = self._serialize_task(task)
             
             if self.redis_client:
-                # Add to Redis queue
-                queue_name = self.queues[task.priority]
-                self.redis_client.lpush(queue_name, json.dumps(task_data))
-                
-                # Store task details
-                self.redis_client.hset(f"task:{task.id}", mapping=task_data)
-                
-                # Add to user's task list
-                self.redis_client.sadd(f"user_tasks:{task.user_id}", task.id)
+                # All writes for the task go out in one round trip
+                pipe = self.redis_client.pipeline()
+                self._queue_task_commands(pipe, task, task_data)
+                pipe.execute()
             else:
                 # Fallback to database
-                db_task = Task(
-                    id=task.id,
-                    user_id=task.user_id,
-                    title=f"Queue Task: {task.task_type}",
-                    description=json.dumps(task.data),
-                    task_type=task.task_type,
-                    status=task.status,
-                    priority=task.priority
-                )
-                db_task.save()
+                self._build_db_task(task).save()
             
             logger.info(f"Task {task.id} added to queue with priority {task.priority}")
             return True
@@ -146,6 +167,44 @@ class TaskQueueManager:
             logger.error(f"Failed to add task to queue: {str(e)}")
             return False
     
+    async def add_tasks(self, tasks: List[QueueTask]) -> List[bool]:
+        """Add several tasks in one Redis round trip or one database commit
+        
+        Returns whether each task was queued, in order.
+        """
+        if not tasks:
+            return []
+        
+        try:
+            if self.redis_client:
+                pipe = self.redis_client.pipeline(transaction=False)
+                command_counts = [
+                    self._queue_task_commands(pipe, task, self._serialize_task(task))
+                    for task in tasks
+                ]
+                replies = pipe.execute(raise_on_error=False)
+                
+                added = []
+                position = 0
+                for count in command_counts:
+                    task_replies = replies[position:position + count]
+                    added.append(not any(isinstance(reply, Exception) for reply in task_replies))
+                    position += count
+            else:
+                # Fallback to database
+                db.session.add_all([self._build_db_task(task) for task in tasks])
+                db.session.commit()
+                added = [True] * len(tasks)
+            
+            logger.info(f"{sum(added)}/{len(tasks)} tasks added to queue")
+            return added
+        
+        except Exception as e:
+            logger.error(f"Failed to add tasks to queue: {str(e)}")
+            if not self.redis_client:
+                db.session.rollback()
+            return [False] * len(tasks)
+    
     async def get_next_task(self) -> Optional[QueueTask]:
         """Get next task from highest priority queue"""
         try:
@@ -396,9 +455,24 @@ class TaskQueueManager:
             logger.error(f"Failed to get queue stats: {str(e)}")
             return {'error': str(e)}
     
-    def get_user_tasks(self, user_id: str, status: Optional[str] = None) -> List[Dict]:
-        """Get tasks for a specific user"""
+    @staticmethod
+    def _timeline_key(user_id: str, task_type: str) -> str:
+        """Sorted set of a user's task ids of one family (e.g. video_*), scored by creation time"""
+        family = task_type.split('_', 1)[0]
+        return f"user:{user_id}:{family}_tasks"
+    
+    def get_user_tasks(self, user_id: str, status: Optional[str] = None,
+                       type_prefix: Optional[str] = None, offset: int = 0,
+                       limit: Optional[int] = None) -> List[Dict]:
+        """Get tasks for a specific user
+        
+        With type_prefix (e.g. 'video_') tasks come newest first from the
+        family's timeline, paginated by offset and limit.
+        """
         try:
+            if type_prefix:
+                return self._get_user_task_timeline(user_id, type_prefix, status, offset, limit)
+            
             if self.redis_client:
                 task_ids = self.redis_client.smembers(f"user_tasks:{user_id}")
                 tasks = []
@@ -422,6 +496,66 @@ class TaskQueueManager:
             logger.error(f"Failed to get user tasks: {str(e)}")
             return []
     
+    def _get_user_task_timeline(self, user_id: str, type_prefix: str, status: Optional[str],
+                                offset: int, limit: Optional[int]) -> List[Dict]:
+        """Get a page of a user's tasks of one type family, newest first"""
+        if self.redis_client:
+            end = offset + limit - 1 if limit else -1
+            task_ids = self.redis_client.zrevrange(self._timeline_key(user_id, type_prefix), offset, end)
+            
+            pipe = self.redis_client.pipeline(transaction=False)
+            for task_id in task_ids:
+                pipe.hgetall(f"task:{task_id}")
+            
+            return [
+                task_data for task_data in pipe.execute()
+                if task_data and (not status or task_data.get('status') == status)
+            ]
+        
+        # Fallback to database
+        query = Task.query.filter(
+            Task.user_id == user_id,
+            Task.task_type.like(f"{type_prefix}%")
+        )
+        if status:
+            query = query.filter_by(status=status)
+        
+        query = query.order_by(Task.created_at.desc()).offset(offset)
+        if limit:
+            query = query.limit(limit)
+        
+        return [task.to_dict() for task in query.all()]
+    
+    def count_user_tasks(self, user_id: str, type_prefix: str) -> int:
+        """Count a user's tasks of one type family"""
+        try:
+            if self.redis_client:
+                return self.redis_client.zcard(self._timeline_key(user_id, type_prefix))
+            
+            return Task.query.filter(
+                Task.user_id == user_id,
+                Task.task_type.like(f"{type_prefix}%")
+            ).count()
+        
+        except Exception as e:
+            logger.error(f"Failed to count user tasks: {str(e)}")
+            return 0
+    
+    def get_task(self, task_id: str) -> Optional[Dict]:
+        """Get a single task by id"""
+        try:
+            if self.redis_client:
+                task_data = self.redis_client.hgetall(f"task:{task_id}")
+                return task_data or None
+            else:
+                # Fallback to database
+                db_task = db.session.get(Task, task_id)
+                return db_task.to_dict() if db_task else None
+        
+        except Exception as e:
+            logger.error(f"Failed to get task: {str(e)}")
+            return None
+    
     async def cancel_task(self, task_id: str, user_id: str) -> bool:
         """Cancel a pending task"""
         try:
@@ -483,6 +617,10 @@ class TaskQueueManager:
                                 self.redis_client.delete(key)
                                 if user_id:
                                     self.redis_client.srem(f"user_tasks:{user_id}", task_id)
+                                    if task_data.get('task_type'):
+                                        self.redis_client.zrem(
+                                            self._timeline_key(user_id, task_data['task_type']), task_id
+                                        )
             
             # Clean up database
             Task.query.filter(
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Smart Marketing Automation System
+نظام التسويق الآلي الذكي
+
+WSGI entrypoint for gunicorn gevent workers
+نقطة دخول WSGI لعمال gevent
+
+Patches the standard library for cooperative I/O before anything else is
+imported, so database, HTTP and bot calls yield to other requests instead
+of blocking the worker. Blocking C extensions (for example native LLM
+clients) are not patched; run them through gevent's threadpool.
+
+    gunicorn -k gevent -w 2 --worker-connections 1000 -b 0.0.0.0:5000 wsgi:app
+"""
+
+from gevent import monkey
+monkey.patch_all()
+
+try:
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+except ImportError:
+    pass
+
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import logging_config
+from src.main import create_app
+
+# run.py execs gunicorn, which loses its logging, so configure it again here
+logging_config.setup()
+
+app = create_app()